@@ -0,0 +1,66 @@
+"""
+Throughput benchmark of the /predict batch scorer in rows/sec, CSV vs Parquet uploads.
+
+Usage: python benchmarks/bench_batch_predict.py [--rows 200000] [--chunk-sizes 1000 10000 50000]
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import tracemalloc
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_model_load import build_model, N_FEATURES
+from sensor.ml.model.bundle import ModelBundle
+from sensor.serving.model_cache import LoadedModel
+from sensor.serving.batch_prediction import BatchPredictor
+
+
+def write_upload(tmp_dir:str, n_rows:int)->dict:
+    rng = np.random.default_rng(2)
+    feature_columns = [f"f_{i:03d}" for i in range(N_FEATURES)]
+    df = pd.DataFrame(rng.normal(size=(n_rows, N_FEATURES)), columns=feature_columns)
+    df = df.mask(rng.random(df.shape)<0.05)
+    uploads = {"csv":os.path.join(tmp_dir, "upload.csv"), "parquet":os.path.join(tmp_dir, "upload.parquet")}
+    df.to_csv(uploads["csv"], index=False, na_rep="na")
+    df.to_parquet(uploads["parquet"], index=False)
+    return {"feature_columns":feature_columns, "uploads":uploads}
+
+
+def main()->None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--rounds", type=int, default=300)
+    parser.add_argument("--chunk-sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        bundle_dir = ModelBundle.save(sensor_model=build_model(n_rounds=args.rounds)
+                                      , bundle_dir=os.path.join(tmp_dir, "bundle"))
+        loaded_model = LoadedModel(version="bench", model=ModelBundle.load(bundle_dir=bundle_dir)
+                                   , load_latency=0.0, loaded_at=time.time())
+        upload = write_upload(tmp_dir=tmp_dir, n_rows=args.rows)
+
+        for file_format, file_path in upload["uploads"].items():
+            print(f"{file_format}: {os.path.getsize(file_path)/2**20:.1f} MiB, {args.rows} rows")
+            for chunk_size in args.chunk_sizes:
+                batch_predictor = BatchPredictor(loaded_model=loaded_model, chunk_size=chunk_size
+                                                 , feature_columns=upload["feature_columns"])
+                tracemalloc.start()
+                start = time.perf_counter()
+                with open(file_path, "rb") as file:
+                    n_bytes = sum(len(part) for part in batch_predictor.iter_predictions(
+                        file=file, file_format=file_format))
+                elapsed = time.perf_counter()-start
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                print(f"  chunk {chunk_size:>6}: {batch_predictor.rows_scored/elapsed:>10,.0f} rows/s"
+                      f"  peak {peak/2**20:7.1f} MiB  output {n_bytes/2**20:.1f} MiB")
+
+
+if __name__=="__main__":
+    main()
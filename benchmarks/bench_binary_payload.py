@@ -0,0 +1,76 @@
+"""
+Request latency benchmark: JSON feature rows vs the binary float32 payload vs Arrow IPC,
+parse only and parse + predict.
+
+Usage: python benchmarks/bench_binary_payload.py [--rows 1 64 1024] [--repeat 50]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import numpy as np
+import pyarrow as pa
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_model_load import build_model, N_FEATURES
+from sensor.ml.model.bundle import ModelBundle
+from sensor.serving.micro_batcher import get_feature_row
+from sensor.serving.binary_payload import FeaturePayload
+
+
+def encode_arrow(X:np.array, feature_columns:list)->bytes:
+    table = pa.table({column:X[:, i] for i, column in enumerate(feature_columns)})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def timed(fn, repeat:int)->float:
+    timings = list()
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter()-start)
+    return float(np.median(timings))*1e3
+
+
+def main()->None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[1, 64, 1024])
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=300)
+    args = parser.parse_args()
+
+    feature_columns = [f"f_{i:03d}" for i in range(N_FEATURES)]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        model = ModelBundle.load(bundle_dir=ModelBundle.save(
+            sensor_model=build_model(n_rounds=args.rounds), bundle_dir=os.path.join(tmp_dir, "bundle")
+        ))
+        model.predict_proba(np.zeros((1, N_FEATURES)))
+
+        for n_rows in args.rows:
+            X = np.random.default_rng(4).normal(size=(n_rows, N_FEATURES)).astype(np.float32)
+            payloads = {
+                "json":json.dumps([dict(zip(feature_columns, map(float, row))) for row in X]).encode()
+                , "binary":FeaturePayload.encode(X=X, feature_columns=feature_columns)
+                , "arrow":encode_arrow(X=X, feature_columns=feature_columns)
+            }
+            parsers = {
+                "json":lambda: np.vstack([get_feature_row(features=row, feature_columns=feature_columns)
+                                          for row in json.loads(payloads["json"])])
+                , "binary":lambda: FeaturePayload.decode(payload=payloads["binary"], feature_columns=feature_columns)
+                , "arrow":lambda: FeaturePayload.decode_arrow(payload=payloads["arrow"], feature_columns=feature_columns)
+            }
+            print(f"rows={n_rows}")
+            for name, parse in parsers.items():
+                parse_ms = timed(parse, args.repeat)
+                total_ms = timed(lambda: model.predict_proba(parse()), args.repeat)
+                print(f"  {name:<7} {len(payloads[name]):>10,} B  parse {parse_ms:8.3f} ms  parse+predict {total_ms:8.3f} ms")
+
+
+if __name__=="__main__":
+    main()
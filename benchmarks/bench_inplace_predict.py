@@ -0,0 +1,61 @@
+"""
+Inference latency benchmark: SensorModel.predict through the DMatrix / sklearn wrapper
+vs the booster inplace_predict fast path, for the pickled model and the model bundle.
+
+Usage: python benchmarks/bench_inplace_predict.py [--rows 1 16 256 4096] [--repeat 200] [--nthread 1]
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_model_load import build_model, N_FEATURES
+from sensor.ml.model.bundle import ModelBundle
+
+
+def timed(fn, repeat:int)->np.array:
+    timings = list()
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter()-start)
+    return np.array(timings)*1e3
+
+
+def main()->None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[1, 16, 256, 4096])
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=300)
+    parser.add_argument("--nthread", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    pickled_model = build_model(n_rounds=args.rounds)
+    pickled_model.model.set_params(n_jobs=args.nthread)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        bundled_model = ModelBundle.load(bundle_dir=ModelBundle.save(
+            sensor_model=pickled_model, bundle_dir=os.path.join(tmp_dir, "bundle")
+        ))
+        for model in (pickled_model, bundled_model):
+            model.set_nthread(nthread=args.nthread)
+
+        print(f"rounds={args.rounds} nthread={args.nthread}")
+        for n_rows in args.rows:
+            X = np.random.default_rng(2).normal(size=(n_rows, N_FEATURES))
+            for name, model in (("pickle", pickled_model), ("bundle", bundled_model)):
+                if not np.array_equal(model.predict(X), model.inplace_predict(X)):
+                    raise Exception(f"inplace_predict disagrees with predict for the {name} model.")
+                for path, fn in (("predict", model.predict), ("inplace_predict", model.inplace_predict)):
+                    fn(X)
+                    timings = timed(lambda: fn(X), args.repeat)
+                    print(f"  rows={n_rows:<5} {name:<6} {path:<15} median {np.median(timings):8.3f} ms"
+                          f"  p95 {np.percentile(timings, 95):8.3f} ms"
+                          f"  {n_rows/np.median(timings)*1e3:12,.0f} rows/s")
+
+
+if __name__=="__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Single-row throughput benchmark: one predict per request vs the asyncio micro-batcher.
+
+Usage: python benchmarks/bench_micro_batching.py [--clients 64] [--requests 20]
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+import tempfile
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_model_load import build_model, N_FEATURES
+from sensor.ml.model.bundle import ModelBundle
+from sensor.serving.micro_batcher import MicroBatcher
+
+
+async def run_clients(score_row, rows:np.array, n_clients:int, n_requests:int)->dict:
+    latencies = list()
+
+    async def client(client_id:int)->None:
+        for i in range(n_requests):
+            row = rows[(client_id*n_requests+i)%len(rows)]
+            start = time.perf_counter()
+            await score_row(row)
+            latencies.append(time.perf_counter()-start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client(client_id) for client_id in range(n_clients)))
+    elapsed = time.perf_counter()-start
+    latencies = np.array(latencies)*1e3
+    return {"rows/s":len(latencies)/elapsed, "p50":np.percentile(latencies, 50), "p99":np.percentile(latencies, 99)}
+
+
+def main()->None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=64)
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--rounds", type=int, default=300)
+    args = parser.parse_args()
+
+    rows = np.random.default_rng(3).normal(size=(1000, N_FEATURES))
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        model = ModelBundle.load(bundle_dir=ModelBundle.save(
+            sensor_model=build_model(n_rounds=args.rounds), bundle_dir=os.path.join(tmp_dir, "bundle")
+        ))
+
+        def predict_fn(X:np.array)->tuple:
+            return model.predict_proba(X), model.threshold, "bench"
+
+        async def per_row(row:np.array)->float:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(None, predict_fn, row.reshape(1, -1))
+
+        async def benchmark()->dict:
+            await per_row(rows[0])
+            results = {"one predict per row":await run_clients(per_row, rows, args.clients, args.requests)}
+            for max_batch_size in (16, 64, 256):
+                micro_batcher = MicroBatcher(predict_fn=predict_fn, max_batch_size=max_batch_size)
+                results[f"micro-batch <= {max_batch_size}"] = await run_clients(
+                    micro_batcher.predict, rows, args.clients, args.requests)
+                results[f"micro-batch <= {max_batch_size}"]["mean batch"] = micro_batcher.stats()["batch_size"]["mean"]
+                await micro_batcher.stop()
+            return results
+
+        for name, result in asyncio.run(benchmark()).items():
+            print(f"{name:<22} {result['rows/s']:>9,.0f} rows/s  p50 {result['p50']:7.2f} ms  p99 {result['p99']:7.2f} ms"
+                  + (f"  mean batch {result['mean batch']:.1f}" if "mean batch" in result else ""))
+
+
+if __name__=="__main__":
+    main()
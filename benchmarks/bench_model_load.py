@@ -0,0 +1,71 @@
+"""
+Load-time benchmark: dill pickled SensorModel vs the native model bundle.
+
+Usage: python benchmarks/bench_model_load.py [--rounds 300] [--repeat 20]
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from xgboost import XGBClassifier
+from sensor.utils.main_utils import Utils
+from sensor.ml.model.bundle import ModelBundle
+from sensor.ml.model.estimator import SensorModel
+from sensor.components.data_transformation import DataTransformation
+
+N_FEATURES = 163
+
+
+def build_model(n_rounds:int)->SensorModel:
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(5000, N_FEATURES))
+    X[rng.random(X.shape)<0.05] = np.nan
+    y = (np.nan_to_num(X[:,:5]).sum(axis=1)+rng.normal(size=5000)>2).astype(int)
+    preprocessor = DataTransformation.get_data_transformer_object().fit(X)
+    model = XGBClassifier(n_estimators=n_rounds).fit(preprocessor.transform(X), y)
+    return SensorModel(preprocessor=preprocessor, model=model)
+
+
+def timed(fn, repeat:int)->np.array:
+    timings = list()
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter()-start)
+    return np.array(timings)*1e3
+
+
+def main()->None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rounds", type=int, default=300)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    sensor_model = build_model(n_rounds=args.rounds)
+    X_row = np.random.default_rng(1).normal(size=(1, N_FEATURES))
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        model_path = os.path.join(tmp_dir, "model.pkl")
+        Utils.save_object(file_path=model_path, obj=sensor_model)
+        bundle_dir = ModelBundle.save(sensor_model=sensor_model, bundle_dir=os.path.join(tmp_dir, "bundle"))
+
+        results = {
+            "dill load":timed(lambda: Utils.load_object(file_path=model_path), args.repeat)
+            , "bundle load (lazy)":timed(lambda: ModelBundle.load(bundle_dir=bundle_dir), args.repeat)
+            , "dill load + first predict":timed(
+                lambda: Utils.load_object(file_path=model_path).predict(X_row), args.repeat)
+            , "bundle load + first predict":timed(
+                lambda: ModelBundle.load(bundle_dir=bundle_dir).predict(X_row), args.repeat)
+        }
+        bundle_bytes = sum(os.path.getsize(os.path.join(bundle_dir, name)) for name in os.listdir(bundle_dir))
+        print(f"rounds={args.rounds} dill={os.path.getsize(model_path)}B bundle={bundle_bytes}B")
+        for name, timings in results.items():
+            print(f"{name:<30} median {np.median(timings):8.2f} ms  p95 {np.percentile(timings, 95):8.2f} ms")
+
+
+if __name__=="__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Consistency check: the datasets ingestion hands over in memory must match what reading
+its csv files gives, dtypes included. Runs ingestion on a Mongo-shaped frame, where columns
+that held "na" arrive as strings, once with an in-memory and once with a file-backed store.
+
+Usage: python benchmarks/check_artifact_store_dtypes.py [--rows 2000]
+"""
+import os
+import sys
+import argparse
+import tempfile
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sensor.utils.main_utils import Utils
+from sensor.utils.artifact_store import ArtifactStore
+from sensor.components.data_ingestion import DataIngestion
+from sensor.entity.config_entity import TrainingPipelineConfig, DataIngestionConfig
+from sensor.constant.training_pipeline import SCHEMA_FILE_PATH, TARGET_COLUMN
+
+
+class MongoShapedSensorData:
+    """
+    Description: Stand-in for SensorData giving what import_data_from_mongodb \
+        gives for documents uploaded from the raw csv.
+    """
+    def __init__(self, n_rows:int)->None:
+        schema = Utils.read_yaml_file(file_path=SCHEMA_FILE_PATH)
+        rng = np.random.default_rng(0)
+        documents = dict()
+        for index, column in enumerate(schema["numerical_columns"]):
+            values = rng.integers(0, 1000, size=n_rows).astype(object)
+            # most columns have gaps, stored as the "na" string; some have none
+            if index%3:
+                values[rng.random(n_rows)<0.1] = "na"
+            documents[column] = [value if value=="na" else str(value) for value in values] if index%2 else values
+        documents[TARGET_COLUMN] = np.where(rng.random(n_rows)<0.1, "pos", "neg")
+        self.df = pd.DataFrame(documents)
+
+    def import_data_from_mongodb(self, collection_name:str)->pd.DataFrame:
+        return self.df.replace({"na":np.nan})
+
+
+def ingest(sensor_data:MongoShapedSensorData, artifact_dir:str, in_memory:bool)->dict:
+    training_pipeline_config = TrainingPipelineConfig()
+    training_pipeline_config.artifact_dir = artifact_dir
+    data_ingestion_config = DataIngestionConfig(training_pipeline_config=training_pipeline_config)
+    artifact_store = ArtifactStore(in_memory=in_memory)
+    data_ingestion_artifact = DataIngestion(
+        data_ingestion_config=data_ingestion_config, sensor_data=sensor_data, artifact_store=artifact_store
+    ).initiate_data_ingestion()
+    artifact_store.flush()
+    datasets = {
+        name:artifact_store.read_dataframe(file_path=file_path) for name, file_path in (
+            ("train", data_ingestion_artifact.train_file_path), ("test", data_ingestion_artifact.test_file_path)
+        )
+    }
+    stats = artifact_store.get_stats()
+    artifact_store.close()
+    return {"datasets":datasets, "stats":stats}
+
+
+def main()->int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=2000)
+    args = parser.parse_args()
+
+    sensor_data = MongoShapedSensorData(n_rows=args.rows)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        in_memory = ingest(sensor_data=sensor_data, artifact_dir=os.path.join(tmp_dir, "memory"), in_memory=True)
+        from_file = ingest(sensor_data=sensor_data, artifact_dir=os.path.join(tmp_dir, "file"), in_memory=False)
+
+    print(f"in-memory loads: {in_memory['stats']['hits']} hits, {in_memory['stats']['misses']} misses")
+    failures = 0
+    for name, expected in from_file["datasets"].items():
+        actual = in_memory["datasets"][name]
+        mismatched = [column for column in expected.columns if actual[column].dtype!=expected[column].dtype]
+        try:
+            pd.testing.assert_frame_equal(actual, expected, check_exact=False)
+            status = "ok"
+        except AssertionError as e:
+            status = str(e).splitlines()[0]
+            failures += 1
+        print(f"{name:5s} {len(expected)} rows, {len(mismatched)} dtype mismatches {mismatched[:5]}: {status}")
+    return 1 if failures else 0
+
+
+if __name__=="__main__":
+    sys.exit(main())
@@ -0,0 +1,64 @@
+import os
+import shutil
+import hashlib
+import threading
+
+
+class LocalObjectStore:
+    """
+    Description:
+        This class is a filesystem-backed stand-in for the S3 client calls used \
+        by S3Sync, objects are stored as files under root_dir/bucket/key. It \
+        lets the sync be exercised without AWS credentials or network access.
+
+    Params:
+        root_dir: directory holding one folder per bucket
+        page_size: objects per list_objects_v2 page
+    """
+    def __init__(self, root_dir:str, page_size:int=1000)->None:
+        self.root_dir = root_dir
+        self.page_size = page_size
+        self.calls = {"upload_file":0, "download_file":0, "list_objects_v2":0}
+        self._lock = threading.Lock()
+
+    def _count(self, name:str)->None:
+        with self._lock:
+            self.calls[name] += 1
+
+    def get_object_path(self, bucket:str, key:str)->str:
+        return os.path.join(self.root_dir, bucket, *key.split("/"))
+
+    def upload_file(self, Filename:str, Bucket:str, Key:str, Config=None)->None:
+        self._count("upload_file")
+        object_path = self.get_object_path(bucket=Bucket, key=Key)
+        os.makedirs(os.path.dirname(object_path), exist_ok=True)
+        tmp_object_path = f"{object_path}.{threading.get_ident()}.tmp"
+        shutil.copyfile(Filename, tmp_object_path)
+        os.replace(tmp_object_path, object_path)
+
+    def download_file(self, Bucket:str, Key:str, Filename:str, Config=None)->None:
+        self._count("download_file")
+        shutil.copyfile(self.get_object_path(bucket=Bucket, key=Key), Filename)
+
+    def list_objects_v2(self, Bucket:str, Prefix:str="", ContinuationToken:str=None)->dict:
+        self._count("list_objects_v2")
+        bucket_dir = os.path.join(self.root_dir, Bucket)
+        keys = list()
+        for root, _, file_names in os.walk(bucket_dir):
+            for file_name in file_names:
+                key = os.path.relpath(os.path.join(root, file_name), bucket_dir).replace(os.sep, "/")
+                if key.startswith(Prefix) and not key.endswith(".tmp"):
+                    keys.append(key)
+        keys.sort()
+        start = int(ContinuationToken or 0)
+        page = keys[start:start+self.page_size]
+        contents = list()
+        for key in page:
+            object_path = self.get_object_path(bucket=Bucket, key=key)
+            with open(object_path, "rb") as object_file:
+                etag = hashlib.md5(object_file.read()).hexdigest()
+            contents.append({"Key":key, "Size":os.path.getsize(object_path), "ETag":f'"{etag}"'})
+        response = {"Contents":contents, "IsTruncated":start+self.page_size<len(keys), "KeyCount":len(contents)}
+        if response["IsTruncated"]:
+            response["NextContinuationToken"] = str(start+self.page_size)
+        return response
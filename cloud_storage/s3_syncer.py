@@ -1,13 +1,278 @@
-import os 
+import os
+import json
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from sensor.logger import logging
+from sensor.utils.main_utils import Utils
+from sensor.exceptions import SensorException
+from sensor.constant.cloud_storage import (S3_SYNC_MANIFEST_NAME, S3_SYNC_MAX_WORKERS, S3_SYNC_MULTIPART_THRESHOLD
+                                          , S3_SYNC_MULTIPART_CHUNKSIZE, S3_SYNC_MULTIPART_CONCURRENCY
+                                          , S3_SYNC_MAX_ATTEMPTS)
+
+
+@dataclass
+class SyncReport:
+    direction:str
+    aws_bucket_url:str
+    files_scanned:int = 0
+    files_transferred:int = 0
+    files_skipped:int = 0
+    bytes_transferred:int = 0
+    elapsed_seconds:float = 0.0
+    failed:List[str] = field(default_factory=list)
+
+    @property
+    def bytes_per_second(self,)->float:
+        return self.bytes_transferred/self.elapsed_seconds if self.elapsed_seconds>0 else 0.0
+
 
 class S3Sync:
+    """
+    Description:
+        This class syncs a local folder with an S3 prefix in-process. A manifest \
+        in the folder records the size, mtime and sha256 of every file already \
+        transferred per bucket url, so a sync only hashes files whose size or \
+        mtime changed and only transfers files whose content changed. Transfers \
+        run on a bounded thread pool, large files as concurrent multipart \
+        transfers, and failed requests are retried by the boto3 client in its \
+        adaptive mode.
+
+    Params:
+        client: boto3 S3 client or any object with upload_file, download_file \
+            and list_objects_v2, a boto3 client is created when omitted
+        max_workers: files transferred concurrently
+        max_attempts: attempts per request of the created boto3 client
+    """
+    def __init__(self, client=None, max_workers:int=S3_SYNC_MAX_WORKERS
+                , max_attempts:int=S3_SYNC_MAX_ATTEMPTS)->None:
+        try:
+            self.max_workers = max_workers
+            self.transfer_config = None
+            if client is None:
+                import boto3
+                from botocore.config import Config
+                from boto3.s3.transfer import TransferConfig
+                client = boto3.client("s3", config=Config(
+                    retries={"max_attempts":max_attempts, "mode":"adaptive"}
+                    , max_pool_connections=max_workers*S3_SYNC_MULTIPART_CONCURRENCY
+                ))
+                self.transfer_config = TransferConfig(
+                    multipart_threshold=S3_SYNC_MULTIPART_THRESHOLD
+                    , multipart_chunksize=S3_SYNC_MULTIPART_CHUNKSIZE
+                    , max_concurrency=S3_SYNC_MULTIPART_CONCURRENCY
+                )
+            self.client = client
+        except Exception as e:
+            logging.error(str(SensorException(error_message=e)))
+            raise SensorException(error_message=e)
+
+    @staticmethod
+    def parse_bucket_url(aws_bucket_url:str)->Tuple[str, str]:
+        """
+        Description: Split s3://bucket/prefix into bucket and key prefix.
+        """
+        if not aws_bucket_url.startswith("s3://"):
+            raise ValueError("Expected an s3:// url, got [{0}].".format(aws_bucket_url))
+        bucket, _, prefix = aws_bucket_url[len("s3://"):].partition("/")
+        prefix = prefix.strip("/")
+        return bucket, f"{prefix}/" if prefix else ""
+
+    @staticmethod
+    def read_manifest(folder:str)->dict:
+        manifest_path = os.path.join(folder, S3_SYNC_MANIFEST_NAME)
+        if not os.path.exists(manifest_path):
+            return {"uploads":dict(), "downloads":dict()}
+        with open(manifest_path, "r") as manifest_file:
+            return json.load(manifest_file)
+
+    @staticmethod
+    def write_manifest(folder:str, manifest:dict)->None:
+        manifest_path = os.path.join(folder, S3_SYNC_MANIFEST_NAME)
+        tmp_manifest_path = f"{manifest_path}.{os.getpid()}.tmp"
+        with open(tmp_manifest_path, "w") as manifest_file:
+            json.dump(manifest, manifest_file, indent=2, sort_keys=True)
+        os.replace(tmp_manifest_path, manifest_path)
+
+    @staticmethod
+    def get_file_state(file_path:str, previous:Optional[dict])->dict:
+        """
+        Description: Give size, mtime and sha256 of a file, the hash is reused \
+            from the previous state when size and mtime are unchanged.
+        """
+        stat = os.stat(file_path)
+        state = {"size":stat.st_size, "mtime_ns":stat.st_mtime_ns}
+        if previous is not None and all(previous.get(key)==state[key] for key in state):
+            state["sha256"] = previous["sha256"]
+        else:
+            state["sha256"] = Utils.get_file_fingerprint(file_path=file_path)
+        return state
+
+    def _transfer_kwargs(self,)->dict:
+        return dict() if self.transfer_config is None else {"Config":self.transfer_config}
+
+    def _run_transfers(self, transfers:Dict[str, tuple], report:SyncReport)->Dict[str, tuple]:
+        """
+        Description: Run the transfers on the worker pool.
+
+        Params:
+            transfers: name to (callable, byte count, result) of each transfer
+
+        Returns: the transfers that succeeded
+        """
+        succeeded = dict()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {
+                executor.submit(fn):name
+                for name, (fn, _, _) in transfers.items()
+            }
+            for future in as_completed(futures):
+                name = futures[future]
+                try:
+                    future.result()
+                except Exception as e:
+                    logging.error("Transfer of [{0}] failed: [{1}].".format(name, e))
+                    report.failed.append(name)
+                    continue
+                succeeded[name] = transfers[name]
+                report.files_transferred += 1
+                report.bytes_transferred += transfers[name][1]
+        return succeeded
+
+    def _finish(self, report:SyncReport, start:float)->SyncReport:
+        report.elapsed_seconds = time.perf_counter()-start
+        logging.info("Synced [{0}] [{1}]: [{2}] files, [{3}] bytes at [{4:.0f}] bytes/s, [{5}] skipped, [{6}] failed.".format(
+            report.direction, report.aws_bucket_url, report.files_transferred, report.bytes_transferred
+            , report.bytes_per_second, report.files_skipped, len(report.failed)
+        ))
+        if report.failed:
+            raise Exception("Failed to sync [{0}] files: {1}.".format(len(report.failed), sorted(report.failed)))
+        return report
+
+    def upload_folder(self, folder:str, aws_bucket_url:str)->SyncReport:
+        """
+        Description:
+            This function uploads the files of the folder that changed since \
+            they were last uploaded to this bucket url.
+
+        Params:
+        ----------
+        folder: str
+            local folder
+        aws_bucket_url: str
+            s3://bucket/prefix
+
+        Returns: SyncReport
+        """
+        try:
+            start = time.perf_counter()
+            bucket, prefix = self.parse_bucket_url(aws_bucket_url=aws_bucket_url)
+            report = SyncReport(direction="upload", aws_bucket_url=aws_bucket_url)
+            manifest = self.read_manifest(folder=folder)
+            uploaded = manifest["uploads"].setdefault(aws_bucket_url, dict())
+
+            transfers = dict()
+            for root, _, file_names in os.walk(folder):
+                for file_name in file_names:
+                    if file_name.startswith(S3_SYNC_MANIFEST_NAME):
+                        continue
+                    file_path = os.path.join(root, file_name)
+                    rel_path = os.path.relpath(file_path, folder).replace(os.sep, "/")
+                    report.files_scanned += 1
+                    state = self.get_file_state(file_path=file_path, previous=uploaded.get(rel_path))
+                    if uploaded.get(rel_path, dict()).get("sha256")==state["sha256"]:
+                        report.files_skipped += 1
+                        uploaded[rel_path] = state
+                        continue
+                    upload = (lambda file_path=file_path, key=prefix+rel_path: self.client.upload_file(
+                        Filename=file_path, Bucket=bucket, Key=key, **self._transfer_kwargs()
+                    ))
+                    transfers[rel_path] = (upload, state["size"], state)
+
+            for rel_path, (_, _, state) in self._run_transfers(transfers=transfers, report=report).items():
+                uploaded[rel_path] = state
+            self.write_manifest(folder=folder, manifest=manifest)
+            return self._finish(report=report, start=start)
+        except Exception as e:
+            logging.error(str(SensorException(error_message=e)))
+            raise SensorException(error_message=e)
+
+    def list_objects(self, bucket:str, prefix:str)->List[dict]:
+        objects, kwargs = list(), {"Bucket":bucket, "Prefix":prefix}
+        while True:
+            response = self.client.list_objects_v2(**kwargs)
+            objects.extend(response.get("Contents", list()))
+            if not response.get("IsTruncated"):
+                return objects
+            kwargs["ContinuationToken"] = response["NextContinuationToken"]
+
+    def download_folder(self, folder:str, aws_bucket_url:str)->SyncReport:
+        """
+        Description:
+            This function downloads the objects under the bucket url whose ETag \
+            changed since they were last downloaded, or whose local copy is \
+            missing or modified.
+
+        Params:
+        ----------
+        folder: str
+            local folder
+        aws_bucket_url: str
+            s3://bucket/prefix
+
+        Returns: SyncReport
+        """
+        try:
+            start = time.perf_counter()
+            bucket, prefix = self.parse_bucket_url(aws_bucket_url=aws_bucket_url)
+            report = SyncReport(direction="download", aws_bucket_url=aws_bucket_url)
+            os.makedirs(folder, exist_ok=True)
+            manifest = self.read_manifest(folder=folder)
+            downloaded = manifest["downloads"].setdefault(aws_bucket_url, dict())
+
+            transfers = dict()
+            for obj in self.list_objects(bucket=bucket, prefix=prefix):
+                rel_path = obj["Key"][len(prefix):]
+                if not rel_path or rel_path.endswith("/"):
+                    continue
+                report.files_scanned += 1
+                file_path = os.path.join(folder, *rel_path.split("/"))
+                previous = downloaded.get(rel_path)
+                if (previous is not None and previous["etag"]==obj["ETag"] and os.path.exists(file_path)):
+                    stat = os.stat(file_path)
+                    if stat.st_size==previous["size"] and stat.st_mtime_ns==previous["mtime_ns"]:
+                        report.files_skipped += 1
+                        continue
+
+                def download(file_path=file_path, key=obj["Key"])->None:
+                    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+                    tmp_file_path = f"{file_path}.{os.getpid()}.tmp"
+                    self.client.download_file(
+                        Bucket=bucket, Key=key, Filename=tmp_file_path, **self._transfer_kwargs()
+                    )
+                    os.replace(tmp_file_path, file_path)
+                transfers[rel_path] = (download, obj["Size"], {"etag":obj["ETag"], "file_path":file_path})
+
+            for rel_path, (_, _, state) in self._run_transfers(transfers=transfers, report=report).items():
+                stat = os.stat(state["file_path"])
+                downloaded[rel_path] = {"etag":state["etag"], "size":stat.st_size, "mtime_ns":stat.st_mtime_ns}
+            self.write_manifest(folder=folder, manifest=manifest)
+            return self._finish(report=report, start=start)
+        except Exception as e:
+            logging.error(str(SensorException(error_message=e)))
+            raise SensorException(error_message=e)
 
     @staticmethod
     def sync_folder_to_s3(folder:str, aws_bucket_url:str)->None:
-        command = f"aws s3 sync {folder} {aws_bucket_url}"
-        os.system(command=command)
-    
+        """
+        Description: Upload the folder with a default boto3 client.
+        """
+        S3Sync().upload_folder(folder=folder, aws_bucket_url=aws_bucket_url)
+
     @staticmethod
     def sync_folder_from_s3(folder:str, aws_bucket_url:str)->None:
-        command = f'aws s3 sync {aws_bucket_url} {folder}'
-        os.system(command=command)
\ No newline at end of file
+        """
+        Description: Download the bucket url into the folder with a default boto3 client.
+        """
+        S3Sync().download_folder(folder=folder, aws_bucket_url=aws_bucket_url)
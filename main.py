@@ -1,15 +1,30 @@
-from sensor.pipeline.training_pipeline import TrainingPipeline
-from fastapi import FastAPI
+import time
+from sensor.pipeline.training_jobs import TrainingJobManager, get_job_progress
+from sensor.serving.model_cache import ModelCache
+from sensor.serving.batch_prediction import BatchPredictor
+from sensor.serving.prediction_cache import PredictionCache
+from sensor.serving.micro_batcher import MicroBatcher, get_feature_row
+from sensor.serving.binary_payload import FeaturePayload, ARROW_STREAM_CONTENT_TYPE, FEATURE_PAYLOAD_DTYPE
+from sensor.utils.main_utils import Utils
+from sensor.ml.model.estimator import TargetValueMapping
+from sensor.constant.training_pipeline import SCHEMA_FILE_PATH
+from sensor.telemetry import (REGISTRY, PROMETHEUS_CONTENT_TYPE, HTTP_REQUESTS, HTTP_REQUEST_SECONDS
+                             , SERVING_ROWS, SERVING_STAGE_SECONDS)
+from fastapi import Body, FastAPI, File, Request, UploadFile
+from starlette.concurrency import run_in_threadpool
 from uvicorn import run as app_run
-from fastapi.responses import Response
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from sensor.constant.application import APP_HOST, APP_PORT
+from sensor.constant.application import APP_HOST, APP_PORT, APP_WORKERS
 from starlette.responses import RedirectResponse
 from fastapi.middleware.cors import CORSMiddleware
 
 
 app = FastAPI()
 origins = ["*"]
+micro_batcher = MicroBatcher()
+feature_columns = Utils.read_yaml_file(file_path=SCHEMA_FILE_PATH)["numerical_columns"]
+label_mapping = TargetValueMapping().reverse_mapping()
 
 
 app.add_middleware(
@@ -21,24 +36,165 @@ app.add_middleware(
 )
 
 
+@app.middleware("http")
+async def record_request_metrics(request:Request, call_next):
+    start = time.perf_counter()
+    response = await call_next(request)
+    # label by route template, raw paths would give every job id its own series
+    route = request.scope.get("route")
+    route = route.path if route is not None else "unmatched"
+    HTTP_REQUEST_SECONDS.observe(time.perf_counter()-start, method=request.method, route=route)
+    HTTP_REQUESTS.inc(method=request.method, route=route, status=response.status_code)
+    return response
+
+
+@app.on_event("startup")
+def load_model_cache():
+    ModelCache.get_instance().start()
+
+
+@app.on_event("shutdown")
+def stop_model_cache():
+    ModelCache.get_instance().stop()
+    TrainingJobManager.get_instance().shutdown()
+
+
+@app.on_event("shutdown")
+async def stop_micro_batcher():
+    await micro_batcher.stop()
+
+
 @app.get("/", tags=["authentication"])
 def index():
     return RedirectResponse(url="/docs")
 
 
 @app.get("/train")
-def train_route():
+def train_route(force:str=""):
     try:
-        train_pipeline = TrainingPipeline()
-        if train_pipeline.is_pipeline_running:
-            return Response("Training pipeline is already running.")
-        train_pipeline.run_pipeline()
+        # comma separated cached stages to recompute, e.g. ?force=model_trainer
+        force_stages = tuple(stage for stage in force.split(",") if stage)
+        submitted = TrainingJobManager.get_instance().submit(force_stages=force_stages)
+        if not submitted["created"]:
+            return JSONResponse({**submitted, "message":"Training pipeline is already running."})
 
-        return Response("Trining Success..!")
+        return JSONResponse({**submitted, "message":"Training job submitted."}, status_code=202)
     except Exception as e:
         return Response(f"Error: [{e}]")
-    
-    
+
+
+@app.get("/train/jobs")
+def train_jobs_route():
+    return [get_job_progress(job=job) for job in TrainingJobManager.get_instance().list_jobs()]
+
+
+@app.get("/train/runs")
+def train_runs_route():
+    return TrainingJobManager.get_instance().run_registry.list_runs()
+
+
+@app.get("/train/{job_id}")
+def train_status_route(job_id:str):
+    job_manager = TrainingJobManager.get_instance()
+    job = job_manager.get_job(job_id=job_id)
+    if job is None:
+        # runs started outside the job manager, e.g. from the command line, have no job record
+        run = job_manager.run_registry.get_run(run_id=job_id)
+        if run is None:
+            return Response(f"Error: [Unknown training job {job_id}]", status_code=404)
+        return run
+    return get_job_progress(job=job)
+
+
+@app.get("/train/{job_id}/result")
+def train_result_route(job_id:str):
+    job = TrainingJobManager.get_instance().get_job(job_id=job_id)
+    if job is None:
+        return Response(f"Error: [Unknown training job {job_id}]", status_code=404)
+    if job["status"]=="failed":
+        return JSONResponse({"job_id":job_id, "status":job["status"], "error":job["error"]}, status_code=500)
+    if job["status"]!="succeeded":
+        return JSONResponse({"job_id":job_id, "status":job["status"]}, status_code=409)
+    return {"job_id":job_id, "status":job["status"], "stages":job["stages"], "result":job["result"]}
+
+
+@app.post("/predict")
+def predict_route(file:UploadFile=File(...)):
+    try:
+        file_format = BatchPredictor.get_file_format(file_name=file.filename, content_type=file.content_type)
+        loaded_model = ModelCache.get_instance().get()
+        batch_predictor = BatchPredictor(loaded_model=loaded_model)
+        predictions = batch_predictor.iter_predictions(file=file.file, file_format=file_format)
+
+        return StreamingResponse(
+            predictions, media_type="text/csv"
+            , headers={"X-Model-Version":loaded_model.version}
+        )
+    except Exception as e:
+        return Response(f"Error: [{e}]", status_code=400)
+
+
+@app.post("/predict/row")
+async def predict_row_route(features:dict=Body(..., embed=True)):
+    try:
+        with SERVING_STAGE_SECONDS.time(endpoint="predict_row", stage="parse"):
+            row = get_feature_row(features=features, feature_columns=feature_columns)
+        row_prediction = await micro_batcher.predict(row=row)
+        SERVING_ROWS.inc(endpoint="predict_row")
+
+        return {
+            "prediction":label_mapping[row_prediction.prediction]
+            , "probability":row_prediction.probability
+            , "model_version":row_prediction.model_version
+        }
+    except Exception as e:
+        return Response(f"Error: [{e}]", status_code=400)
+
+
+@app.post("/predict/binary")
+async def predict_binary_route(request:Request):
+    try:
+        payload = await request.body()
+        with SERVING_STAGE_SECONDS.time(endpoint="predict_binary", stage="parse"):
+            if request.headers.get("content-type", "").startswith(ARROW_STREAM_CONTENT_TYPE):
+                X = FeaturePayload.decode_arrow(payload=payload, feature_columns=feature_columns)
+            else:
+                X = FeaturePayload.decode(payload=payload, feature_columns=feature_columns)
+        loaded_model = ModelCache.get_instance().get()
+        y_score = await run_in_threadpool(
+            PredictionCache.get_instance().predict_proba, loaded_model=loaded_model, X=X
+        )
+        with SERVING_STAGE_SECONDS.time(endpoint="predict_binary", stage="serialize"):
+            content = y_score.astype(FEATURE_PAYLOAD_DTYPE).tobytes()
+        SERVING_ROWS.inc(len(X), endpoint="predict_binary")
+
+        return Response(
+            content=content, media_type="application/octet-stream"
+            , headers={"X-Model-Version":loaded_model.version, "X-Threshold":str(loaded_model.model.threshold)}
+        )
+    except Exception as e:
+        return Response(f"Error: [{e}]", status_code=400)
+
+
+@app.get("/predict/stats")
+def predict_stats_route():
+    return {**micro_batcher.stats(), "cache":PredictionCache.get_instance().stats()}
+
+
+@app.get("/metrics")
+def metrics_route():
+    return Response(content=REGISTRY.expose(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+
+@app.get("/model")
+def model_route():
+    return ModelCache.get_instance().status()
+
+
 if __name__=="__main__":
-    app_run(app=app, host=APP_HOST, port=APP_PORT)
+    if APP_WORKERS>1:
+        from sensor.serving.launcher import ServingLauncher
+        ServingLauncher(app="main:app", n_workers=APP_WORKERS, host=APP_HOST, port=APP_PORT).run()
+    else:
+        app_run(app=app, host=APP_HOST, port=APP_PORT)
 
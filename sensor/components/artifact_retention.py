@@ -0,0 +1,318 @@
+import os
+import time
+import shutil
+from datetime import datetime
+from typing import Dict, List, Tuple
+from sensor.logger import logging
+from sensor.utils.main_utils import Utils
+from sensor.exceptions import SensorException
+from sensor.ml.model.registry import ModelRegistry
+from sensor.ml.model.blob_store import BlobStore
+from sensor.entity.config_entity import ArtifactRetentionConfig
+from sensor.entity.artifact_entity import ArtifactRetentionArtifact
+
+
+class ArtifactRetention:
+
+    def __init__(self, artifact_retention_config:ArtifactRetentionConfig
+                , run_artifacts:Dict[str, object])->None:
+        """
+        Description:
+            This class applies the retention policies to artifacts/ and saved_models/. \
+            Old runs are compacted down to their manifests and metrics, keeping the \
+            last N runs and the runs whose model was accepted while the remaining \
+            runs fit the size budget. Saved model versions beyond the last N or the \
+            size budget are removed from the registry together with the blobs no \
+            remaining version references. In dry-run mode only the report is written.
+        Params:
+            - artifact_retention_config: Essential configurations for retention.
+            - run_artifacts: Artifacts of the current run by stage name.
+        """
+        try:
+            logging.info("Artifact Retention initiated.")
+            self.artifact_retention_config = artifact_retention_config
+            self.run_artifacts = run_artifacts
+            self._planned_links:Dict[Tuple[int, int], int] = dict()
+            self._planned_bytes:Dict[Tuple[int, int], Tuple[int, int]] = dict()
+        except Exception as e:
+            logging.error(str(SensorException(error_message=e)))
+            raise SensorException(error_message=e)
+
+    def _plan_file_removal(self, file_path:str)->None:
+        """
+        Description: Count a planned unlink per inode, the bytes are reclaimed only \
+            when every hardlink of the file is removed.
+        """
+        stat = os.lstat(file_path)
+        inode = (stat.st_dev, stat.st_ino)
+        self._planned_links[inode] = self._planned_links.get(inode, 0)+1
+        self._planned_bytes[inode] = (stat.st_size, stat.st_nlink)
+
+    def get_reclaimed_bytes(self,)->int:
+        return sum(size for inode, (size, nlink) in self._planned_bytes.items()
+                   if self._planned_links[inode]>=nlink)
+
+    @staticmethod
+    def _iter_files(dir_path:str):
+        for root, _, file_names in os.walk(dir_path):
+            for file_name in file_names:
+                yield os.path.join(root, file_name)
+
+    @staticmethod
+    def get_dir_size(dir_path:str)->int:
+        return sum(os.lstat(file_path).st_size for file_path in ArtifactRetention._iter_files(dir_path))
+
+    def write_run_manifest(self,)->None:
+        """
+        Description: Record the metrics and artifacts of the current run, this \
+            is what remains of the run once it is compacted.
+        """
+        try:
+            run_manifest = {
+                "run_dir":self.artifact_retention_config.current_run_dir
+                , "compacted_at":None
+                , "artifacts":{stage:Utils.artifact_to_dict(artifact)
+                               for stage, artifact in self.run_artifacts.items()}
+            }
+            Utils.write_yaml_file(
+                file_path=self.artifact_retention_config.run_manifest_file_path
+                , content=run_manifest, replace=True
+            )
+        except Exception as e:
+            logging.error(str(SensorException(error_message=e)))
+            raise SensorException(error_message=e)
+
+    def read_run_manifest(self, run_dir:str)->dict:
+        run_manifest_path = os.path.join(run_dir, self.artifact_retention_config.run_manifest_file_name)
+        if not os.path.exists(run_manifest_path):
+            return dict()
+        return Utils.read_yaml_file(file_path=run_manifest_path) or dict()
+
+    def list_runs(self,)->List[str]:
+        """
+        Description: List the run directories, oldest first.
+        """
+        try:
+            artifact_root_dir = self.artifact_retention_config.artifact_root_dir
+            if not os.path.isdir(artifact_root_dir):
+                return list()
+            runs = list()
+            for run_name in os.listdir(artifact_root_dir):
+                try:
+                    run_time = datetime.strptime(run_name, self.artifact_retention_config.timestamp_format)
+                except ValueError:
+                    continue
+                runs.append((run_time, os.path.join(artifact_root_dir, run_name)))
+            return [run_dir for _, run_dir in sorted(runs)]
+        except Exception as e:
+            logging.error(str(SensorException(error_message=e)))
+            raise SensorException(error_message=e)
+
+    def plan_run_compaction(self,)->List[str]:
+        """
+        Description: Choose the runs to compact according to keep-last-N, \
+            keep-accepted and the size budget.
+
+        Returns: run directories to compact
+        """
+        try:
+            config = self.artifact_retention_config
+            current_run_dir = os.path.normpath(config.current_run_dir)
+            runs = [run_dir for run_dir in self.list_runs()
+                    if not self.read_run_manifest(run_dir=run_dir).get("compacted_at")]
+
+            kept_runs, compact_runs = list(), list()
+            last_runs = set(runs[-config.keep_last_runs:]) if config.keep_last_runs>0 else set()
+            for run_dir in runs:
+                run_manifest = self.read_run_manifest(run_dir=run_dir)
+                is_accepted = (run_manifest.get("artifacts", dict())
+                               .get("model_evaluation", dict()).get("is_model_accepted", False))
+                if (os.path.normpath(run_dir)==current_run_dir or run_dir in last_runs
+                        or (config.keep_accepted_runs and is_accepted)):
+                    kept_runs.append(run_dir)
+                else:
+                    compact_runs.append(run_dir)
+
+            # size budget, compacting the oldest kept runs first
+            run_sizes = {run_dir:self.get_dir_size(dir_path=run_dir) for run_dir in kept_runs}
+            kept_bytes = sum(run_sizes.values())
+            for run_dir in kept_runs:
+                if kept_bytes<=config.max_runs_bytes:
+                    break
+                if os.path.normpath(run_dir)==current_run_dir:
+                    continue
+                compact_runs.append(run_dir)
+                kept_bytes -= run_sizes[run_dir]
+
+            return compact_runs
+        except Exception as e:
+            logging.error(str(SensorException(error_message=e)))
+            raise SensorException(error_message=e)
+
+    def compact_run(self, run_dir:str)->None:
+        """
+        Description: Remove everything in the run except manifests and reports.
+        """
+        try:
+            keep_suffixes = self.artifact_retention_config.compact_keep_suffixes
+            remove_files = [file_path for file_path in self._iter_files(dir_path=run_dir)
+                            if not file_path.endswith(keep_suffixes)]
+            for file_path in remove_files:
+                self._plan_file_removal(file_path=file_path)
+            if self.artifact_retention_config.dry_run:
+                return
+
+            for file_path in remove_files:
+                os.remove(file_path)
+            for root, dir_names, _ in os.walk(run_dir, topdown=False):
+                for dir_name in dir_names:
+                    dir_path = os.path.join(root, dir_name)
+                    if not os.listdir(dir_path):
+                        os.rmdir(dir_path)
+
+            run_manifest = self.read_run_manifest(run_dir=run_dir)
+            run_manifest.update(run_dir=run_dir, compacted_at=time.time(), removed_files=len(remove_files))
+            Utils.write_yaml_file(
+                file_path=os.path.join(run_dir, self.artifact_retention_config.run_manifest_file_name)
+                , content=run_manifest, replace=True
+            )
+            logging.info("Compacted run [{0}], removed [{1}] files.".format(run_dir, len(remove_files)))
+        except Exception as e:
+            logging.error(str(SensorException(error_message=e)))
+            raise SensorException(error_message=e)
+
+    def plan_model_removal(self, model_registry:ModelRegistry)->List[dict]:
+        """
+        Description: Choose the saved model versions to remove according to \
+            keep-last-N and the size budget. The champion and the previous \
+            champion a rollback returns to are never removed, even outside the \
+            last N or over budget.
+
+        Returns: registry entries to remove
+        """
+        try:
+            config = self.artifact_retention_config
+            versions = model_registry.list_versions()
+            manifest = model_registry.read_manifest()
+            current_version = manifest["current"]
+            rollback_versions = [version for version in manifest["history"]
+                                 if version in manifest["versions"] and version!=current_version]
+            protected_versions = {current_version, *rollback_versions[-1:]}
+
+            kept, removed = list(), list()
+            last_versions = versions[-config.keep_last_models:] if config.keep_last_models>0 else list()
+            for entry in versions:
+                if entry["version"] in protected_versions or entry in last_versions:
+                    kept.append(entry)
+                else:
+                    removed.append(entry)
+
+            version_sizes = {
+                entry["version"]:self.get_dir_size(dir_path=os.path.dirname(entry["model_path"]))
+                for entry in kept if os.path.exists(entry["model_path"])
+            }
+            kept_bytes = sum(version_sizes.values())
+            for entry in kept:
+                if kept_bytes<=config.max_models_bytes:
+                    break
+                if entry["version"] in protected_versions:
+                    continue
+                removed.append(entry)
+                kept_bytes -= version_sizes.get(entry["version"], 0)
+
+            return removed
+        except Exception as e:
+            logging.error(str(SensorException(error_message=e)))
+            raise SensorException(error_message=e)
+
+    @staticmethod
+    def get_entry_digests(entry:dict)->set:
+        digests = set((entry.get("bundle_digests") or dict()).values())
+        if entry.get("model_digest"):
+            digests.add(entry["model_digest"])
+        return digests
+
+    def remove_model_versions(self, model_registry:ModelRegistry, removed:List[dict])->List[str]:
+        """
+        Description: Remove the versions and the blobs only they referenced.
+
+        Returns: removed blob digests
+        """
+        try:
+            removed_versions = {entry["version"] for entry in removed}
+            remaining_digests = set()
+            for entry in model_registry.list_versions():
+                if entry["version"] not in removed_versions:
+                    remaining_digests |= self.get_entry_digests(entry=entry)
+            removed_digests = set()
+            for entry in removed:
+                removed_digests |= self.get_entry_digests(entry=entry)
+            removed_digests -= remaining_digests
+
+            blob_store = BlobStore(blob_dir=self.artifact_retention_config.model_blob_dir)
+            version_dirs = [os.path.dirname(entry["model_path"]) for entry in removed]
+            for version_dir in version_dirs:
+                if os.path.isdir(version_dir):
+                    for file_path in self._iter_files(dir_path=version_dir):
+                        self._plan_file_removal(file_path=file_path)
+            blob_paths = [blob_store.get_blob_path(digest=digest) for digest in sorted(removed_digests)]
+            for blob_path in blob_paths:
+                if os.path.exists(blob_path):
+                    self._plan_file_removal(file_path=blob_path)
+            if self.artifact_retention_config.dry_run:
+                return sorted(removed_digests)
+
+            for entry, version_dir in zip(removed, version_dirs):
+                model_registry.remove(version=entry["version"])
+                shutil.rmtree(version_dir, ignore_errors=True)
+            for blob_path in blob_paths:
+                if os.path.exists(blob_path):
+                    os.remove(blob_path)
+            logging.info("Removed model versions [{0}] and [{1}] blobs.".format(
+                sorted(removed_versions), len(removed_digests)
+            ))
+            return sorted(removed_digests)
+        except Exception as e:
+            logging.error(str(SensorException(error_message=e)))
+            raise SensorException(error_message=e)
+
+    def initiate_artifact_retention(self,)->ArtifactRetentionArtifact:
+        """
+        Description:
+            This function initiates Artifact Retention.
+
+        Returns:
+            ArtifactRetentionArtifact.
+        """
+        try:
+            config = self.artifact_retention_config
+            self.write_run_manifest()
+
+            compact_runs = self.plan_run_compaction()
+            for run_dir in compact_runs:
+                self.compact_run(run_dir=run_dir)
+
+            model_registry = ModelRegistry(model_dir=config.saved_model_dir)
+            removed_models = self.plan_model_removal(model_registry=model_registry)
+            removed_blobs = self.remove_model_versions(model_registry=model_registry, removed=removed_models)
+
+            reclaimed_bytes = self.get_reclaimed_bytes()
+            artifact_retention_artifact = ArtifactRetentionArtifact(
+                dry_run=config.dry_run
+                , retention_report_path=config.retention_report_file_path
+                , compacted_runs=compact_runs
+                , removed_model_versions=[entry["version"] for entry in removed_models]
+                , removed_blobs=removed_blobs
+                , reclaimed_bytes=reclaimed_bytes
+            )
+            Utils.write_yaml_file(
+                file_path=config.retention_report_file_path
+                , content=Utils.artifact_to_dict(artifact_retention_artifact), replace=True
+            )
+            logging.info("Artifact Retention complete{0}, [{1}] bytes reclaimed.".format(
+                " (dry run)" if config.dry_run else "", reclaimed_bytes
+            ))
+            return artifact_retention_artifact
+        except Exception as e:
+            logging.error(str(SensorException(error_message=e)))
+            raise SensorException(error_message=e)
@@ -1,19 +1,25 @@
 # standard modules
 import os
+from typing import Optional
+import numpy as np
 import pandas as pd
 from sklearn.model_selection import train_test_split
 # user-defined modules
 from sensor.logger import logging
 from sensor.utils.main_utils import Utils
+from sensor.utils.artifact_store import ArtifactStore
 from sensor.exceptions import SensorException
 from sensor.data_access.sensor_data import SensorData
 from sensor.entity.config_entity import DataIngestionConfig
 from sensor.entity.artifact_entity import DataIngestionArtifact
-from sensor.constant.training_pipeline import SCHEMA_FILE_PATH
+from sensor.ml.model.estimator import TargetValueMapping
+from sensor.constant.training_pipeline import SCHEMA_FILE_PATH, TARGET_COLUMN
 from sensor.constant.database import COLLECTION_NAME
+from sensor.telemetry import TRAINING_ROWS
 
 class DataIngestion:
-    def __init__(self, data_ingestion_config:DataIngestionConfig,  sensor_data:SensorData)->None:
+    def __init__(self, data_ingestion_config:DataIngestionConfig,  sensor_data:SensorData
+                , artifact_store:Optional[ArtifactStore]=None)->None:
         """
         Description: This class performs several operations and, \
                         performs initial data pre-processing for \
@@ -21,11 +27,13 @@ class DataIngestion:
         Params:
             - data_ingestion_config: Essential configurations for performing Data Ingestion.
             - sensor_data: MongoDB connection object to import data.
+            - artifact_store: Run artifact store the datasets are saved to, files are written directly without one.
         """
         try:
             logging.info("Data Ingestion initiated.")
             self.data_ingestion_config = data_ingestion_config
             self.sensor_data = sensor_data
+            self.artifact_store = artifact_store if artifact_store is not None else ArtifactStore(in_memory=False)
             self._schema_config = Utils.read_yaml_file(file_path=SCHEMA_FILE_PATH)
         except Exception as e:
             logging.error(str(SensorException(error_message=e)))
@@ -44,7 +52,7 @@ class DataIngestion:
 
             feature_store_dir = os.path.dirname(feature_store_file_path)
             os.makedirs(name=feature_store_dir, exist_ok= True)
-            df.to_csv(feature_store_file_path, index=False, header=True)
+            self.artifact_store.save_dataframe(file_path=feature_store_file_path, df=df)
             logging.info("File got stored in feature_store as [{0}]".format(
                 os.path.basename(feature_store_file_path)
             ))
@@ -82,6 +90,32 @@ class DataIngestion:
             logging.error(str(SensorException(error_message=e)))
             raise SensorException(error_message=e)
         
+    def coerce_numerical_columns(self, df:pd.DataFrame)->pd.DataFrame:
+        """
+        Description: Mongo documents keep the "na" placeholders as strings, so \
+            a column that held one is left as a string column. Parse the schema's \
+            numerical columns the way reading the stored csv would, so stages \
+            handed the dataset in memory see the same dtypes as stages reading \
+            the file. A column that does not parse is left for validation to reject.
+
+        Params:
+        -------
+        df: pandas dataframe
+
+        Returns: pandas dataframe.
+        """
+        try:
+            for column in self._schema_config["numerical_columns"]:
+                if column in df.columns and not pd.api.types.is_numeric_dtype(df[column]):
+                    try:
+                        df[column] = pd.to_numeric(df[column])
+                    except (ValueError, TypeError):
+                        logging.info("Column [{0}] is not numeric, left as is.".format(column))
+            return df
+        except Exception as e:
+            logging.error(str(SensorException(error_message=e)))
+            raise SensorException(error_message=e)
+
     def data_split(self, df:pd.DataFrame)->None:
         """
         Description: Perform train test split on the data and.\
@@ -96,6 +130,7 @@ class DataIngestion:
         try:
             train_data, test_data = train_test_split(
                 df, test_size=self.data_ingestion_config.test_split_ratio
+                , random_state=self.data_ingestion_config.random_state
             )
             logging.info("Performed train test split on the given dataframe.")
             
@@ -105,12 +140,11 @@ class DataIngestion:
             train_file_dir = os.path.dirname(train_file_path)
             os.makedirs(train_file_dir, exist_ok=True)
             
-            train_data.to_csv(train_file_path, index=False, header=True)
+            self.artifact_store.save_dataframe(file_path=train_file_path, df=train_data)
             logging.info("Train file stored as [{0}]".format(
                 os.path.basename(train_file_path)
             ))
-            test_data.to_csv(test_file_path, index=False, header=True
-            )
+            self.artifact_store.save_dataframe(file_path=test_file_path, df=test_data)
             logging.info("Train file stored as [{0}]".format(
                 os.path.basename(test_file_path)
             ))
@@ -120,20 +154,52 @@ class DataIngestion:
             logging.error(str(SensorException(error_message=e)))
             raise SensorException(error_message=e)
 
+    def save_evaluation_dataset(self, df:pd.DataFrame)->None:
+        """
+        Description: Store the input features and encoded target of the whole dataset \
+                        as a single numpy array, so model evaluation can memory-map it \
+                        instead of parsing and concatenating the train and test files.
+        
+        Params:
+        --------
+        df: DataFrame
+            pandas dataframe to be stored
+
+        """
+        try:
+            input_feature = df.drop(TARGET_COLUMN, axis=1).to_numpy(dtype=np.float64)
+            target_feature = df[TARGET_COLUMN].replace(TargetValueMapping().to_dict()).to_numpy(dtype=np.float64)
+            self.artifact_store.save_numpy_array(
+                file_path=self.data_ingestion_config.evaluation_file_path
+                , array=np.c_[input_feature, target_feature]
+            )
+            logging.info("Evaluation dataset stored as [{0}]".format(
+                os.path.basename(self.data_ingestion_config.evaluation_file_path)
+            ))
+        except Exception as e:
+            logging.error(str(SensorException(error_message=e)))
+            raise SensorException(error_message=e)
+
     def initiate_data_ingestion(self,)->DataIngestionArtifact:
         try:
             df = self.import_data_as_feature_store()
 
             # drop the schema_drop_columns if present
-            df = self.drop_unnecessary_columns(df=df, name="Train data")
+            df = self.drop_unnecessary_columns(df=df)
+            df = self.coerce_numerical_columns(df=df)
 
             # train test split
             self.data_split(df=df)
+
+            # whole dataset for model evaluation
+            self.save_evaluation_dataset(df=df)
+            TRAINING_ROWS.inc(len(df), stage="data_ingestion")
             
             data_ingestion_artifact = DataIngestionArtifact(
                 feature_store_path=self.data_ingestion_config.feature_store_file_path
                 , train_file_path=self.data_ingestion_config.train_file_path
                 , test_file_path=self.data_ingestion_config.test_file_path
+                , evaluation_file_path=self.data_ingestion_config.evaluation_file_path
             )
             
             logging.info("Data Ingestion completed.")
@@ -1,6 +1,7 @@
 # standard modules
 import os
 import numpy as np
+from typing import Optional
 import pandas as pd
 from sklearn.pipeline import Pipeline
 from imblearn.combine import SMOTETomek
@@ -8,17 +9,19 @@ from sklearn.impute import SimpleImputer
 from sklearn.preprocessing import RobustScaler
 # user-defined modules
 from sensor.logger import logging
-from sensor.utils.main_utils import Utils
+from sensor.utils.artifact_store import ArtifactStore
 from sensor.exceptions import SensorException
 from sensor.ml.model.estimator import TargetValueMapping
 from sensor.constant.training_pipeline import TARGET_COLUMN
+from sensor.telemetry import TRAINING_ROWS
 from sensor.entity.config_entity import DataTransformationConfig
 from sensor.entity.artifact_entity import (DataIngestionArtifact, DataTransformationArtifact)
 
 class DataTransformation:
 
     def __init__(self, data_ingestion_artifact:DataIngestionArtifact
-                , data_transformation_config: DataTransformationConfig)->None:
+                , data_transformation_config: DataTransformationConfig
+                , artifact_store:Optional[ArtifactStore]=None)->None:
         """
         Desciption:
             This class helps in data transformation operations, \
@@ -26,11 +29,13 @@ class DataTransformation:
         Params:
             data_ingestion_artifact: Output reference of Data Ingestion pipeline.
             data_transformation_artifact: Necessary configurations for transforming the data.
+            artifact_store: Run artifact store the datasets are loaded from and saved to.
         """
         try:
             logging.info(msg="Data Transformation initiated.")
             self.data_ingestion_artifact = data_ingestion_artifact
             self.data_transformation_config = data_transformation_config
+            self.artifact_store = artifact_store if artifact_store is not None else ArtifactStore(in_memory=False)
         except Exception as e:
             raise SensorException(e)
     @classmethod
@@ -71,9 +76,9 @@ class DataTransformation:
             train_file_path = self.data_ingestion_artifact.train_file_path
             test_file_path = self.data_ingestion_artifact.test_file_path
             logging.info(msg="Reading train data for Data Transformation.")
-            train_df = Utils.read_csv(file_path=train_file_path)
+            train_df = self.artifact_store.read_dataframe(file_path=train_file_path)
             logging.info(msg="Reading test data for Data Transformation.")
-            test_df = Utils.read_csv(file_path=test_file_path)
+            test_df = self.artifact_store.read_dataframe(file_path=test_file_path)
 
             logging.info(msg="Seperating input feature from target feature.")
             input_feature_train_df = train_df.drop(TARGET_COLUMN, axis=1)
@@ -103,18 +108,19 @@ class DataTransformation:
 
             train_arr = np.c_[input_feature_train_final, target_feature_train_final]
             test_arr = np.c_[input_feature_test_final, target_feature_test_final]
+            TRAINING_ROWS.inc(len(train_arr)+len(test_arr), stage="data_transformation")
 
-            Utils.save_numpy_array(
+            self.artifact_store.save_numpy_array(
                 file_path=self.data_transformation_config.transformed_train_file_path
                 , array=train_arr
             )
             logging.info(msg="Transformed train data saved succesfully.")
-            Utils.save_numpy_array(
+            self.artifact_store.save_numpy_array(
                 file_path=self.data_transformation_config.transformed_test_file_path
                 , array=test_arr
             )
             logging.info(msg="Transformed test data saved succesfully.")
-            Utils.save_object(
+            self.artifact_store.save_object(
                 file_path=self.data_transformation_config.transformed_object_file_path
                 , obj=preprocessor_object
             )
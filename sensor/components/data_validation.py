@@ -1,10 +1,12 @@
 # standard modules
 import os
 import pandas as pd
+from typing import Optional
 from scipy.stats import ks_2samp
 # user-defined modules
 from sensor.logger import logging
 from sensor.utils.main_utils import Utils
+from sensor.utils.artifact_store import ArtifactStore
 from sensor.exceptions import SensorException
 from sensor.entity.config_entity import DataValidationConfig
 from sensor.constant.training_pipeline import SCHEMA_FILE_PATH
@@ -13,7 +15,8 @@ from sensor.entity.artifact_entity import DataIngestionArtifact, DataValidationA
 class DataValidation:
 
     def __init__(self,data_ingestion_artifact:DataIngestionArtifact
-                , data_validation_config:DataValidationConfig)->None:
+                , data_validation_config:DataValidationConfig
+                , artifact_store:Optional[ArtifactStore]=None)->None:
         """
         Description: 
         ------------------------
@@ -24,12 +27,14 @@ class DataValidation:
         -----------------------
             - data_ingestion_artifact: Output reference from Data Ingestion pipeline.
             - data_validation_config: Essential configurations for performing Data Validation.
+            - artifact_store: Run artifact store the datasets are loaded from.
 
         
         """
         try:
             self.data_ingestion_artifact = data_ingestion_artifact
             self.data_validation_config = data_validation_config
+            self.artifact_store = artifact_store if artifact_store is not None else ArtifactStore(in_memory=False)
             self._schema_config = Utils.read_yaml_file(file_path=SCHEMA_FILE_PATH)
         except Exception as e:
             logging.error(str(e))
@@ -164,8 +169,8 @@ class DataValidation:
             test_file_path = self.data_ingestion_artifact.test_file_path
 
             # read dataframe from path
-            train_df = Utils.read_data(file_path=train_file_path)
-            test_df = Utils.read_data(file_path=test_file_path)
+            train_df = self.artifact_store.read_dataframe(file_path=train_file_path)
+            test_df = self.artifact_store.read_dataframe(file_path=test_file_path)
 
             # validate number of columns
             status = self.validate_number_of_columns(df=train_df, name="Train data")
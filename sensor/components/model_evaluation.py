@@ -1,49 +1,114 @@
+import os
 import numpy as np
-import pandas as pd
+from typing import Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
 from sensor.logger import logging
 from sensor.utils.main_utils import Utils
+from sensor.utils.artifact_store import ArtifactStore
 from sensor.exceptions import SensorException
-from sensor.constant.training_pipeline import TARGET_COLUMN
 from sensor.entity.config_entity import ModelEvaluationConfig
 from sensor.ml.metric.classification_metric import ClassificationMetrics
-from sensor.ml.model.estimator import (TargetValueMapping, ModelResolver)
+from sensor.ml.model.estimator import ModelResolver
+from sensor.ml.model.bundle import ModelBundle
 from sensor.entity.artifact_entity import (DataIngestionArtifact, ModelTrainerArtifact, ModelEvaluationArtifact)
 
 class ModelEvaluation:
 
-    def __init__(self, model_evaluation_config:ModelEvaluationConfig 
+    def __init__(self, model_evaluation_config:ModelEvaluationConfig
                 , data_ingestion_artifact:DataIngestionArtifact
-                , model_trainer_artifact:ModelTrainerArtifact)->None:
+                , model_trainer_artifact:ModelTrainerArtifact
+                , artifact_store:Optional[ArtifactStore]=None)->None:
         try:
             logging.info("ModelEvaluation initiated.")
             self.model_evaluation_config = model_evaluation_config
             self.data_ingestion_artifact = data_ingestion_artifact
             self.model_trainer_artifact = model_trainer_artifact
+            self.artifact_store = artifact_store if artifact_store is not None else ArtifactStore(in_memory=False)
         except Exception as e:
             logging.info(str(SensorException(error_message=e)))
             raise SensorException(error_message=e)
-    
 
-    def initiate_model_evaluation(self)->ModelEvaluationArtifact:
+    def get_trained_model(self,)->object:
+        """
+        Description:
+            This function gives the current trained model, reusing the in-memory \
+            object handed over by the trainer and loading it from disk otherwise.
+
+        Returns: trained SensorModel
+        """
         try:
+            if self.model_trainer_artifact.trained_model is not None:
+                logging.info("Using in-memory current trained model.")
+                return self.model_trainer_artifact.trained_model
+            logging.info("Extracting current trained model.")
+            return Utils.load_object(file_path=self.model_trainer_artifact.trained_model_path)
+        except Exception as e:
+            logging.error(str(SensorException(error_message=e)))
+            raise SensorException(error_message=e)
 
-            train_file_path = self.data_ingestion_artifact.train_file_path
-            test_file_path = self.data_ingestion_artifact.test_file_path
-            logging.info("Extracting Train dataset for Model Evaluation.")
-            train_df = Utils.read_csv(file_path=train_file_path)
-            logging.info("Extracting Test dataset for Model Evaluation.")
-            test_df = Utils.read_csv(file_path=test_file_path)
+    def get_latest_model_prediction(self, latest_model_path:str
+                                    , dataset_fingerprint:str, X:np.array)->Tuple[np.array, float]:
+        """
+        Description:
+            This function predicts the positive class probability of the dataset with \
+            the latest previously saved model. Probabilities and the model decision \
+            threshold are cached next to the saved model keyed by the dataset \
+            fingerprint, so evaluating against the same model and data again skips \
+            loading and scoring the model.
 
-            df = pd.concat([train_df, test_df])
+        Params:
+        ----------
+        latest_model_path: str
+            saved model file path
+        dataset_fingerprint: str
+            content hash of the evaluation dataset
+        X: np.array
+            input features
+
+        Returns: positive class probabilities and decision threshold
+        """
+        try:
+            prediction_cache_path = os.path.join(
+                os.path.dirname(latest_model_path)
+                , self.model_evaluation_config.prediction_cache_dir_name
+                , f"{dataset_fingerprint}.npy"
+            )
+            threshold_cache_path = prediction_cache_path.replace(".npy", ".yaml")
+            if os.path.exists(prediction_cache_path):
+                logging.info("Using cached predictions of latest previously saved model.")
+                latest_threshold = Utils.read_yaml_file(file_path=threshold_cache_path)["threshold"]
+                return Utils.load_numpy_array(file_path=prediction_cache_path), latest_threshold
+
+            logging.info("Extracting lastes previous saved model")
+            latest_model = ModelBundle.load_saved_model(model_path=latest_model_path)
+            logging.info("Predicting feature store data with latest previously stored model.")
+            y_latest_model = latest_model.predict_proba(X)
+            latest_threshold = float(latest_model.threshold)
+
+            # threshold first, then the predictions via rename, so a concurrent
+            # evaluation never reads a partial cache entry
+            Utils.write_yaml_file(file_path=threshold_cache_path, content={"threshold":latest_threshold})
+            prediction_cache_tmp_path = f"{prediction_cache_path}.{os.getpid()}.tmp.npy"
+            Utils.save_numpy_array(file_path=prediction_cache_tmp_path, array=y_latest_model)
+            os.replace(prediction_cache_tmp_path, prediction_cache_path)
+            return y_latest_model, latest_threshold
+        except Exception as e:
+            logging.error(str(SensorException(error_message=e)))
+            raise SensorException(error_message=e)
+
+    def initiate_model_evaluation(self)->ModelEvaluationArtifact:
+        try:
+            evaluation_file_path = self.data_ingestion_artifact.evaluation_file_path
+            # held in memory since ingestion, memory-mapped when the run did not ingest it
+            logging.info("Loading evaluation dataset for Model Evaluation.")
+            evaluation_arr = self.artifact_store.load_numpy_array(file_path=evaluation_file_path, mmap_mode="r")
 
             logging.info("Split the data into input fetaure and target feature for prediction.")
-            X = df.drop(TARGET_COLUMN, axis=1)
-            y = df[TARGET_COLUMN]
-            logging.info("Encoding Target variables to standard form.")
-            y.replace(TargetValueMapping().to_dict(), inplace=True)
+            X, y = evaluation_arr[:,:-1], evaluation_arr[:,-1]
 
             trained_model_metric_artifact = self.model_trainer_artifact.test_metric_artifact
             trained_model_file_path = self.model_trainer_artifact.trained_model_path
+            dataset_fingerprint = Utils.get_file_fingerprint(file_path=evaluation_file_path)
             model_resolver = ModelResolver()
 
             if not model_resolver.is_model_exists():
@@ -51,61 +116,82 @@ class ModelEvaluation:
                 model_evaluation_artifact = ModelEvaluationArtifact(
                     is_model_accepted=True
                     , improved_accuracy=None
+                    , improved_accuracy_lower=None
+                    , improved_accuracy_upper=None
+                    , bootstrap_random_state=None
                     , latest_model_path=None
                     , trained_model_path=trained_model_file_path
                     , trained_model_metric_artifact=trained_model_metric_artifact
                     , latest_model_metric_artifact=None
+                    , data_fingerprint=dataset_fingerprint
                 )
                 return model_evaluation_artifact
-            
+
             latest_model_path = model_resolver.get_latest_model_path()
-            logging.info("Extracting lastes previous saved model")
-            latest_model = Utils.load_object(file_path=latest_model_path)
-            logging.info("Extracting current trained model.")
-            train_model = Utils.load_object(file_path=trained_model_file_path)
+            train_model = self.get_trained_model()
 
-            logging.info("Predicting feature store data with current trained model.")
-            y_trained_model = train_model.predict(X)
-            logging.info("Predicting feature store data with latest previously stored model.")
-            y_latest_model = latest_model.predict(X)
+            # score both models concurrently, xgboost and numpy release the GIL
+            logging.info("Predicting feature store data with current trained and latest saved model.")
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                trained_future = executor.submit(train_model.predict_proba, X)
+                latest_future = executor.submit(
+                    self.get_latest_model_prediction, latest_model_path, dataset_fingerprint, X
+                )
+                y_trained_model = trained_future.result()
+                y_latest_model, latest_threshold = latest_future.result()
 
             trained_model_metrics = ClassificationMetrics.get_classfication_metric(
-                y_true=y, y_pred=y_trained_model
+                y_true=y, y_score=y_trained_model, threshold=train_model.threshold
             )
             logging.info("Model scores for curretnt trained model [{0}]".format(
                 trained_model_metrics.__dict__
             ))
             latest_model_metrics = ClassificationMetrics.get_classfication_metric(
-                y_true=y, y_pred=y_latest_model
+                y_true=y, y_score=y_latest_model, threshold=latest_threshold
             )
             logging.info("Model scores for latest previously saved model [{0}]".format(
                 latest_model_metrics.__dict__
             ))
 
-            improved_accuracy = trained_model_metrics.f1_score-latest_model_metrics.f1_score
+            # paired bootstrap confidence interval of the f1 improvement
+            improved_accuracy, improved_accuracy_lower, improved_accuracy_upper = \
+                ClassificationMetrics.get_paired_bootstrap_interval(
+                    y_true=y
+                    , y_pred_a=y_trained_model>=trained_model_metrics.threshold
+                    , y_pred_b=y_latest_model>=latest_model_metrics.threshold
+                    , n_resamples=self.model_evaluation_config.bootstrap_resamples
+                    , confidence=self.model_evaluation_config.bootstrap_confidence
+                    , max_batch_bytes=self.model_evaluation_config.bootstrap_max_batch_bytes
+                    , random_state=self.model_evaluation_config.bootstrap_random_state
+                )
             expected_increase_accuracy = self.model_evaluation_config.change_threshold
-            
-            if expected_increase_accuracy < improved_accuracy:
+
+            # accept only when the whole interval clears the expected increase
+            if expected_increase_accuracy < improved_accuracy_lower:
                 is_model_accepted=True
             else:
                 is_model_accepted=False
-            
-            logging.info("The expected accuracy: [{0}], the improved accuracy: [{1}]".format(
-                expected_increase_accuracy, improved_accuracy
+
+            logging.info("The expected accuracy: [{0}], the improved accuracy: [{1}] CI [{2}, {3}]".format(
+                expected_increase_accuracy, improved_accuracy, improved_accuracy_lower, improved_accuracy_upper
             ))
             logging.info("is model accepted [{0}]".format(is_model_accepted))
-            
+
             model_evaluation_artifact = ModelEvaluationArtifact(
                 is_model_accepted=is_model_accepted
                 , improved_accuracy=improved_accuracy
+                , improved_accuracy_lower=improved_accuracy_lower
+                , improved_accuracy_upper=improved_accuracy_upper
+                , bootstrap_random_state=self.model_evaluation_config.bootstrap_random_state
                 , latest_model_path=latest_model_path
                 , latest_model_metric_artifact=latest_model_metrics
                 , trained_model_path=trained_model_file_path
                 , trained_model_metric_artifact=trained_model_metrics
+                , data_fingerprint=dataset_fingerprint
             )
             logging.info("Model Evaluation complete.")
 
             return model_evaluation_artifact
         except Exception as e:
             logging.error(str(SensorException(error_message=e)))
-            raise SensorException(error_message=e)
\ No newline at end of file
+            raise SensorException(error_message=e)
@@ -1,9 +1,11 @@
 import os
-import shutil
 from sensor.logger import logging
 from sensor.utils.main_utils import Utils
 from sensor.exceptions import SensorException
-from sensor.ml.metric.classification_metric import ClassificationMetrics
+from dataclasses import asdict
+from sensor.ml.model.registry import ModelRegistry
+from sensor.ml.model.blob_store import BlobStore
+from sensor.ml.model.bundle import (ModelBundle, BUNDLE_MANIFEST_NAME)
 from sensor.entity.config_entity import ModelPusherConfig
 from sensor.entity.artifact_entity import (ModelPusherArtifact, ModelEvaluationArtifact)
 
@@ -23,20 +25,48 @@ class ModelPusher:
             logging.info("Extracting trained model path.")
             trained_model_path = self.model_evaluation_artifact.trained_model_path
 
+            logging.info("Storing the trained model in the content-addressed blob store.")
+            blob_store = BlobStore(blob_dir=self.model_pusher_config.model_blob_dir)
+            model_digest = blob_store.put(file_path=trained_model_path)
+
             model_file_path = self.model_pusher_config.model_file_path
-            model_file_dir = os.path.dirname(model_file_path)
-            os.makedirs(model_file_dir, exist_ok=True)
-            logging.info("Saving the trained model in model pusher dir.")
-            shutil.copy(src=trained_model_path, dst=model_file_path)
+            logging.info("Linking the trained model in model pusher dir.")
+            blob_store.link(digest=model_digest, dst_path=model_file_path)
 
             saved_model_path = self.model_pusher_config.saved_model_path
-            saved_model_dir = os.path.dirname(saved_model_path)
-            os.makedirs(saved_model_dir, exist_ok=True)
-            logging.info("Saving the model in saved models dir.")
-            shutil.copy(src=trained_model_path, dst=saved_model_path)
+            logging.info("Linking the model in saved models dir.")
+            blob_store.link(digest=model_digest, dst_path=saved_model_path)
+
+            trained_bundle_dir = ModelBundle.get_bundle_dir(model_path=trained_model_path)
+            saved_bundle_dir = ModelBundle.get_bundle_dir(model_path=saved_model_path)
+            bundle_digests = dict()
+            if os.path.isdir(trained_bundle_dir):
+                logging.info("Linking the model bundle in saved models dir.")
+                # manifest last, a bundle with a manifest is complete
+                for file_name in sorted(os.listdir(trained_bundle_dir)
+                                        , key=lambda name: (name==BUNDLE_MANIFEST_NAME, name)):
+                    bundle_digests[file_name] = blob_store.put(
+                        file_path=os.path.join(trained_bundle_dir, file_name)
+                    )
+                    blob_store.link(
+                        digest=bundle_digests[file_name], dst_path=os.path.join(saved_bundle_dir, file_name)
+                    )
+
+            # promotion is the atomic rename of the registry manifest
+            logging.info("Registering the saved model as the current model version.")
+            ModelRegistry(model_dir=self.model_pusher_config.saved_model_dir).register(
+                version=self.model_pusher_config.model_version
+                , model_path=saved_model_path
+                , metrics=asdict(self.model_evaluation_artifact.trained_model_metric_artifact)
+                , data_fingerprint=self.model_evaluation_artifact.data_fingerprint
+                , model_digest=model_digest
+                , bundle_path=saved_bundle_dir if bundle_digests else None
+                , bundle_digests=bundle_digests
+            )
 
             model_pusher_artifact = ModelPusherArtifact(
-                saved_model_path=saved_model_path, model_file_path=model_file_path
+                model_version=self.model_pusher_config.model_version
+                , saved_model_path=saved_model_path, model_file_path=model_file_path
             )
             logging.info("Model Pusher complete.")
             return model_pusher_artifact
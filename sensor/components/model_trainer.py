@@ -1,50 +1,98 @@
 import os
+from typing import Optional, Tuple
 from xgboost import XGBClassifier
+from sklearn.model_selection import train_test_split
 from sensor.logger import logging
 from sensor.utils.main_utils import Utils
+from sensor.utils.artifact_store import ArtifactStore
 from sensor.ml.model.estimator import SensorModel
+from sensor.ml.model.bundle import ModelBundle
+from sensor.ml.model.cross_validation import StratifiedCrossValidator
 from sensor.exceptions import SensorException
 from sensor.entity.config_entity import ModelTrainerConfig
 from sensor.ml.metric.classification_metric import ClassificationMetrics
-from sensor.entity.artifact_entity import (DataTransformationArtifact, ModelTrainerArtifact)
+from sensor.entity.artifact_entity import (DataTransformationArtifact, ModelTrainerArtifact, EarlyStoppingArtifact)
 
 
 class ModelTrainer:
     
     def __init__(self, model_trainer_config:ModelTrainerConfig
-                ,data_transformation_artifact:DataTransformationArtifact)->None:
+                ,data_transformation_artifact:DataTransformationArtifact
+                , artifact_store:Optional[ArtifactStore]=None)->None:
         logging.info("ModelTrainer initiated.")
         try:
             self.model_trainer_config = model_trainer_config
             self.data_transformation_artifact = data_transformation_artifact
+            self.artifact_store = artifact_store if artifact_store is not None else ArtifactStore(in_memory=False)
         except Exception as e:
             logging.error(str(SensorException(error_message=e)))
             raise SensorException(error_message=e)
 
-    def train_model(self, X_train, y_train)->object:
+    def get_model_params(self,)->dict:
+        """
+        Description: XGBClassifier parameters of the trained model, shared with \
+            cross validation so the folds score the model that gets trained.
+        """
+        return {
+            "n_estimators":self.model_trainer_config.max_boosting_rounds
+            , "early_stopping_rounds":self.model_trainer_config.early_stopping_rounds
+            , "eval_metric":self.model_trainer_config.eval_metric
+        }
+
+    def train_model(self, X_train, y_train, X_val, y_val)->Tuple[object, EarlyStoppingArtifact]:
         """
         Description: 
-            This function train the dataset for model prediction.
+            This function train the dataset for model prediction. Boosting stops \
+            once the eval metric on the validation slice stops improving, keeping \
+            only the trees up to the best iteration.
         Params:
         ----------
         X_train: np.array
             input features dataset
         y_train: np.array
             target features dataset
+        X_val: np.array
+            held-out validation input features
+        y_val: np.array
+            held-out validation target features
         
-        Returns: object
-            trained model object
+        Returns: (object, EarlyStoppingArtifact)
+            trained model object and its early stopping summary
         """
         try:
+            eval_metric = self.model_trainer_config.eval_metric
+            max_boosting_rounds = self.model_trainer_config.max_boosting_rounds
+
             # initializing ml model
-            xgb_clf = XGBClassifier()
+            xgb_clf = XGBClassifier(**self.get_model_params())
             logging.info(msg="Model getting trained with the dataset.")
             
-            # fitting with train data
-            xgb_clf.fit(X_train, y_train)
+            # fitting with train data, monitoring the validation slice
+            xgb_clf.fit(X_train, y_train, eval_set=[(X_train, y_train), (X_val, y_val)], verbose=False)
+            evals_result = xgb_clf.evals_result()
+            best_iteration = int(xgb_clf.best_iteration)
+            best_score = float(xgb_clf.best_score)
+            rounds_trained = xgb_clf.get_booster().num_boosted_rounds()
+
+            # drop the trees boosted after the best iteration, loading the sliced booster back
+            booster = xgb_clf.get_booster()[:best_iteration+1]
+            booster.set_attr(best_iteration=str(best_iteration), best_score=str(best_score))
+            xgb_clf.load_model(bytearray(booster.save_raw(raw_format="json")))
+            logging.info("Model training stopped at round [{0}] of [{1}], best iteration [{2}] {3} [{4}].".format(
+                rounds_trained, max_boosting_rounds, best_iteration, eval_metric, best_score
+            ))
             logging.info("Model training complete and ready for prediction.")
 
-            return xgb_clf
+            early_stopping_artifact = EarlyStoppingArtifact(
+                eval_metric=eval_metric
+                , best_iteration=best_iteration
+                , best_score=best_score
+                , rounds_trained=rounds_trained
+                , rounds_saved=max_boosting_rounds-rounds_trained
+                , train_metric_curve=list(map(float, evals_result["validation_0"][eval_metric]))
+                , validation_metric_curve=list(map(float, evals_result["validation_1"][eval_metric]))
+            )
+            return xgb_clf, early_stopping_artifact
         except Exception as e:
             logging.error(str(SensorException(error_message=e)))
             raise SensorException(error_message=e)
@@ -63,8 +111,8 @@ class ModelTrainer:
             test_file_path = self.data_transformation_artifact.transformed_test_file_path
             
             # extract data from train file and trest file path
-            train_arr = Utils.load_numpy_array(train_file_path)
-            test_arr = Utils.load_numpy_array(test_file_path)
+            train_arr = self.artifact_store.load_numpy_array(file_path=train_file_path)
+            test_arr = self.artifact_store.load_numpy_array(file_path=test_file_path)
             
             # data split into Input feature and Target feature
             X_train, y_train, X_test, y_test = (
@@ -72,30 +120,57 @@ class ModelTrainer:
             )
             logging.info("Data split into input feature and target features")
 
+            # k-fold cross validation on train data
+            cross_validator = StratifiedCrossValidator(
+                n_folds=self.model_trainer_config.cv_folds
+                , max_workers=self.model_trainer_config.cv_max_workers
+                , model_params=self.get_model_params()
+                , validation_split_ratio=self.model_trainer_config.validation_split_ratio
+                , random_state=self.model_trainer_config.random_state
+            )
+            cv_metrics = cross_validator.cross_validate(arr=train_arr)
+            if cv_metrics.mean_metric_artifact.f1_score<=self.model_trainer_config.expected_accuracy:
+                raise Exception("Cross validated model is not meeting the standard accuracy.")
+            logging.info("Cross validated model has met with the standard accuracy.")
+
+            # hold out validation slice for eval-set monitoring and threshold selection
+            X_fit, X_val, y_fit, y_val = train_test_split(
+                X_train, y_train, test_size=self.model_trainer_config.validation_split_ratio
+                , stratify=y_train, random_state=self.model_trainer_config.random_state
+            )
+
             # ml model creation
-            clf_model = self.train_model(X_train=X_train, y_train=y_train)
+            clf_model, early_stopping_artifact = self.train_model(
+                X_train=X_fit, y_train=y_fit, X_val=X_val, y_val=y_val
+            )
+
+            # cost-optimal decision threshold on the validation slice
+            val_metrics = ClassificationMetrics.get_classfication_metric(
+                y_true=y_val, y_score=clf_model.predict_proba(X_val)[:,1]
+            )
+            decision_threshold = val_metrics.threshold
+            logging.info("Cost-optimal decision threshold [{0}] with validation cost [{1}].".format(
+                decision_threshold, val_metrics.cost_score
+            ))
             
             # prediction for X_train
             logging.info("Predicting y_train with X_train.")
-            y_train_pred = clf_model.predict(X_train)
+            y_train_score = clf_model.predict_proba(X_train)[:,1]
             
             # classfication metrics for predicted Train data
             train_metrics = ClassificationMetrics.get_classfication_metric(
-                y_true=y_train, y_pred=y_train_pred
+                y_true=y_train, y_score=y_train_score, threshold=decision_threshold
             )
             logging.info("Classification metrics for Train data [{0}]".format(
                 train_metrics.__dict__
             ))
-            if train_metrics.f1_score<=self.model_trainer_config.expected_accuracy:
-                raise Exception("Trained model is not meeting the standard accuracy.")
-            logging.info("Trained model has met with the standard accuracy.")
             
             # predicting test data
             logging.info("Predicting y_test with X_test.")
-            y_test_pred = clf_model.predict(X_test)
+            y_test_score = clf_model.predict_proba(X_test)[:,1]
             # get classification metric for test data
             test_metrics = ClassificationMetrics.get_classfication_metric(
-                y_true=y_test, y_pred=y_test_pred
+                y_true=y_test, y_score=y_test_score, threshold=decision_threshold
             )
             logging.info("Classification metrics for Test data [{0}]".format(
                 test_metrics.__dict__
@@ -109,7 +184,7 @@ class ModelTrainer:
             
             # get transformer object
             logging.info("Extracting transformer object from DataTransformationArtifact.")
-            preprocessor = Utils.load_object(
+            preprocessor = self.artifact_store.load_object(
                 file_path=self.data_transformation_artifact.transformed_object_file_path
             )
             # create model directory
@@ -117,18 +192,27 @@ class ModelTrainer:
             os.makedirs(model_dir, exist_ok=True)
 
             # save transformed object and fmodel object for future prediction
-            sensor_model = SensorModel(preprocessor=preprocessor, model=clf_model)
+            sensor_model = SensorModel(
+                preprocessor=preprocessor, model=clf_model, threshold=decision_threshold
+            )
             Utils.save_object(
                 file_path=self.model_trainer_config.trained_model_file_path
                 , obj=sensor_model
             )
             logging.info("Saved Transformation object and Model object for future prediction.")
+            ModelBundle.save(
+                sensor_model=sensor_model
+                , bundle_dir=ModelBundle.get_bundle_dir(model_path=self.model_trainer_config.trained_model_file_path)
+            )
 
             # model trainer artifact
             model_trainer_artifact = ModelTrainerArtifact(
                 trained_model_path=self.model_trainer_config.trained_model_file_path
                 , train_metric_artifact=train_metrics
                 , test_metric_artifact=test_metrics
+                , cv_metric_artifact=cv_metrics
+                , early_stopping_artifact=early_stopping_artifact
+                , trained_model=sensor_model
             )
             logging.info("Model Training complete.")
 
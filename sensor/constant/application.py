@@ -1,2 +1,31 @@
+import os
+from sensor.constant.training_pipeline import ARTIFACT_DIR
+
 APP_HOST = "0.0.0.0"
-APP_PORT = 80
\ No newline at end of file
+APP_PORT = 80
+APP_WORKERS:int = 1
+MODEL_CACHE_POLL_INTERVAL:float = 5.0
+MODEL_INFERENCE_NTHREAD:int = os.cpu_count() or 1
+PREDICTION_CHUNK_SIZE:int = 10000
+PREDICTION_NA_VALUES:list = ["na"]
+TRAINING_JOB_DIR:str = os.path.join(ARTIFACT_DIR, "training_jobs")
+TRAINING_JOB_MAX_WORKERS:int = 1
+TRAINING_JOB_START_METHOD:str = "spawn"
+TRAINING_RUN_DIR:str = os.path.join(ARTIFACT_DIR, "training_runs")
+TRAINING_RUN_REGISTRY_NAME:str = "runs.json"
+TRAINING_RUN_REGISTRY_LOCK_NAME:str = "runs.lock"
+TRAINING_RUN_LOCK_NAME:str = "run.lock"
+TRAINING_RUN_LEASE_SECONDS:float = 120.0
+TRAINING_RUN_HISTORY:int = 100
+MICRO_BATCH_MAX_SIZE:int = 64
+MICRO_BATCH_MAX_WAIT:float = 0.002
+MICRO_BATCH_STATS_WINDOW:int = 10000
+SERVING_WORKER_REPORT_INTERVAL:float = 60.0
+SERVING_WORKER_STATUS_FILE:str = os.path.join(ARTIFACT_DIR, "serving", "workers.json")
+SERVING_WORKER_SHUTDOWN_TIMEOUT:float = 30.0
+PREDICTION_CACHE_ENABLED:bool = True
+PREDICTION_CACHE_MAX_BYTES:int = 64*1024*1024
+BATCH_SCORING_CHUNK_SIZE:int = 5000
+BATCH_SCORING_MAX_WORKERS:int = os.cpu_count() or 1
+BATCH_SCORING_START_METHOD:str = "spawn"
+LOAD_TEST_DIR:str = os.path.join(ARTIFACT_DIR, "load_tests")
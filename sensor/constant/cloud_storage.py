@@ -0,0 +1,6 @@
+S3_SYNC_MANIFEST_NAME:str = ".s3_sync_manifest.json"
+S3_SYNC_MAX_WORKERS:int = 8
+S3_SYNC_MULTIPART_THRESHOLD:int = 8*1024*1024
+S3_SYNC_MULTIPART_CHUNKSIZE:int = 8*1024*1024
+S3_SYNC_MULTIPART_CONCURRENCY:int = 4
+S3_SYNC_MAX_ATTEMPTS:int = 5
@@ -1,2 +1,4 @@
 DATABASE_NAME = "live_sensor"
 COLLECTION_NAME = "readings"
+PREDICTION_COLLECTION_NAME = "predictions"
+BATCH_SCORING_CHECKPOINT_COLLECTION_NAME = "batch_scoring_checkpoints"
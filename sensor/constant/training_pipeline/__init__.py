@@ -5,17 +5,37 @@ Global constants:
 """
 PIPLEINE_NAME:str = "sensor"
 ARTIFACT_DIR:str = "artifacts"
+ARTIFACT_TIMESTAMP_FORMAT:str = "%d%m%Y_%H%M%S"
 SCHEMA_FILE_PATH:str = os.path.join("config","schema.yaml")
 SCHEMA_DROP_COLS:str = "drop_columns"
+TRAINING_PIPELINE_MAX_WORKERS:int = 2
+TRAINING_PIPELINE_EXECUTOR:str = "thread"
+STAGE_CACHE_ENABLED:bool = True
+STAGE_CACHE_DIR:str = os.path.join(ARTIFACT_DIR, "stage_cache")
+STAGE_CACHE_KEEP_ENTRIES:int = 3
+# bump to invalidate every cached stage, e.g. after a change outside the component modules
+STAGE_CACHE_VERSION:str = "1"
+STAGE_CACHE_ENTRY_NAME:str = "entry.pkl"
+STAGE_CACHE_RECORD_DIR_NAME:str = "stage_cache"
+STAGE_CACHE_SUMMARY_FILE_NAME:str = "stage_cache_summary.yaml"
+ARTIFACT_STORE_IN_MEMORY:bool = True
+ARTIFACT_STORE_MAX_WRITERS:int = 2
 
 MAIN_FILE_NAME:str = "sensor.csv"
 TRAIN_FILE_NAME:str = "train.csv"
 TEST_FILE_NAME:str = "test.csv"
+EVALUATION_FILE_NAME:str = "evaluation.npy"
 TARGET_COLUMN:str = "class"
+FALSE_POSITIVE_COST:int = 10
+FALSE_NEGATIVE_COST:int = 500
 
 
 MODEL_FILE_NAME = "model.pkl"
+MODEL_BUNDLE_DIR_NAME:str = "bundle"
 SAVED_MODEL_DIR = os.path.join("saved_models")
+MODEL_REGISTRY_MANIFEST_NAME:str = "manifest.json"
+MODEL_REGISTRY_LOCK_NAME:str = "manifest.lock"
+MODEL_BLOB_DIR:str = os.path.join(SAVED_MODEL_DIR, "blobs")
 
 """
 Data Ingestion constants:
@@ -24,6 +44,7 @@ DATA_INGESTION_DIR:str = "data_ingestion"
 DATA_INGESTION_FEATURE_STORE_DIR:str ="feature_store"
 DATA_INGESTION_DATASET_DIR:str = "dataset"
 DATA_INGESTION_TEST_SPLIT_RATIO:float = 0.2
+DATA_INGESTION_RANDOM_STATE:int = 42
 
 """
 Data Validation constants:
@@ -52,6 +73,13 @@ MODEL_TRAINER_TRAINED_MODEL_DIR:str = "trained_model"
 MODEL_TRAINER_TRAINED_MODEL_NAME:str = "model.pkl"
 MODEL_TRAINER_EXPECTED_SCORE:float = 0.9
 MODEL_TRAINER_OVER_FITTING_UNDER_FITTING_THRESHOLD:float = 0.05
+MODEL_TRAINER_CV_FOLDS:int = 5
+MODEL_TRAINER_CV_MAX_WORKERS:int = MODEL_TRAINER_CV_FOLDS
+MODEL_TRAINER_VALIDATION_SPLIT_RATIO:float = 0.1
+MODEL_TRAINER_MAX_BOOSTING_ROUNDS:int = 1000
+MODEL_TRAINER_EARLY_STOPPING_ROUNDS:int = 20
+MODEL_TRAINER_EVAL_METRIC:str = "logloss"
+MODEL_TRAINER_RANDOM_STATE:int = 42
 
 """
 Model Evaluation constants:
@@ -59,8 +87,27 @@ Model Evaluation constants:
 MODEL_EVALUATION_DIR_NAME:str = "model_evaluation"
 MODEL_EVALUATION_CHANGED_THRESHOLD:float = 0.02
 MODEL_EVALUATION_REPORT_NAME = "report.yaml"
+MODEL_EVALUATION_PREDICTION_CACHE_DIR:str = "predictions"
+MODEL_EVALUATION_BOOTSTRAP_RESAMPLES:int = 1000
+MODEL_EVALUATION_BOOTSTRAP_CONFIDENCE:float = 0.95
+MODEL_EVALUATION_BOOTSTRAP_MAX_BATCH_BYTES:int = 256*1024*1024
+MODEL_EVALUATION_BOOTSTRAP_RANDOM_STATE:int = 42
 
 """
 Model Pusher constants.
 """
-MODEL_PUSHER_DIR_NAME:str = "model_pusher"
\ No newline at end of file
+MODEL_PUSHER_DIR_NAME:str = "model_pusher"
+
+"""
+Artifact Retention constants.
+"""
+ARTIFACT_RETENTION_DIR_NAME:str = "artifact_retention"
+ARTIFACT_RETENTION_REPORT_NAME:str = "report.yaml"
+ARTIFACT_RETENTION_RUN_MANIFEST_NAME:str = "run_manifest.yaml"
+ARTIFACT_RETENTION_KEEP_LAST_RUNS:int = 5
+ARTIFACT_RETENTION_KEEP_ACCEPTED_RUNS:bool = True
+ARTIFACT_RETENTION_MAX_RUNS_BYTES:int = 5*1024*1024*1024
+ARTIFACT_RETENTION_KEEP_LAST_MODELS:int = 5
+ARTIFACT_RETENTION_MAX_MODELS_BYTES:int = 2*1024*1024*1024
+ARTIFACT_RETENTION_COMPACT_KEEP_SUFFIXES:tuple = (".yaml", ".json")
+ARTIFACT_RETENTION_DRY_RUN:bool = False
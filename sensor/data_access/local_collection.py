@@ -0,0 +1,118 @@
+import copy
+import threading
+from typing import Iterator, List, Optional
+from pymongo import ReplaceOne, UpdateOne
+
+
+class LocalBulkWriteResult:
+    def __init__(self, matched_count:int, upserted_count:int)->None:
+        self.matched_count = matched_count
+        self.modified_count = matched_count
+        self.upserted_count = upserted_count
+
+
+class LocalCollection:
+    """
+    Description:
+        This class is an in-memory stand-in for the pymongo collection calls \
+        used by batch scoring: find sorted by _id with an _id range filter and \
+        a projection, find_one, replace_one and bulk_write of UpdateOne / \
+        ReplaceOne requests. It lets the scoring job be exercised without a \
+        MongoDB server.
+
+    Params:
+        documents: initial documents, each with an _id
+    """
+    def __init__(self, documents:Optional[List[dict]]=None)->None:
+        self._documents = dict()
+        self._lock = threading.Lock()
+        self.calls = {"find":0, "bulk_write":0}
+        self.insert_many(documents=documents or list())
+
+    def insert_many(self, documents:List[dict])->None:
+        with self._lock:
+            for document in documents:
+                self._documents[document["_id"]] = copy.deepcopy(document)
+
+    def count_documents(self, filter:dict)->int:
+        return sum(1 for document in self._documents.values() if self._matches(document=document, filter=filter))
+
+    @staticmethod
+    def _matches(document:dict, filter:dict)->bool:
+        for field, condition in filter.items():
+            value = document.get(field)
+            if not isinstance(condition, dict):
+                if value!=condition:
+                    return False
+                continue
+            for operator, operand in condition.items():
+                if operator=="$gt" and not (value is not None and value>operand):
+                    return False
+                if operator=="$gte" and not (value is not None and value>=operand):
+                    return False
+                if operator not in ("$gt", "$gte"):
+                    raise NotImplementedError("LocalCollection does not support [{0}].".format(operator))
+        return True
+
+    @staticmethod
+    def _project(document:dict, projection:Optional[dict])->dict:
+        if not projection:
+            return copy.deepcopy(document)
+        fields = {field for field, included in projection.items() if included}
+        if projection.get("_id", 1):
+            fields.add("_id")
+        return {field:copy.deepcopy(value) for field, value in document.items() if field in fields}
+
+    def find(self, filter:Optional[dict]=None, projection:Optional[dict]=None, sort:Optional[list]=None
+            , batch_size:int=0)->Iterator[dict]:
+        self.calls["find"] += 1
+        with self._lock:
+            documents = list(self._documents.values())
+        for field, direction in reversed(sort or list()):
+            documents.sort(key=lambda document: document.get(field), reverse=direction<0)
+        for document in documents:
+            if self._matches(document=document, filter=filter or dict()):
+                yield self._project(document=document, projection=projection)
+
+    def find_one(self, filter:dict)->Optional[dict]:
+        return next(self.find(filter=filter), None)
+
+    def _apply(self, filter:dict, update:dict, upsert:bool, replace:bool)->str:
+        if set(filter)=={"_id"} and not isinstance(filter["_id"], dict):
+            # the _id index, scanning would make bulk upserts quadratic
+            matched = [filter["_id"]] if filter["_id"] in self._documents else list()
+        else:
+            matched = [key for key, document in self._documents.items()
+                       if self._matches(document=document, filter=filter)]
+        if matched:
+            document = self._documents[matched[0]]
+        elif upsert:
+            document = {field:value for field, value in filter.items() if not isinstance(value, dict)}
+        else:
+            return "none"
+        if replace:
+            document = {"_id":document.get("_id"), **copy.deepcopy(update)}
+        else:
+            for operator, fields in update.items():
+                if operator!="$set":
+                    raise NotImplementedError("LocalCollection does not support [{0}].".format(operator))
+                document.update(copy.deepcopy(fields))
+        self._documents[document["_id"]] = document
+        return "matched" if matched else "upserted"
+
+    def replace_one(self, filter:dict, replacement:dict, upsert:bool=False)->None:
+        with self._lock:
+            self._apply(filter=filter, update=replacement, upsert=upsert, replace=True)
+
+    def bulk_write(self, requests:list, ordered:bool=True)->LocalBulkWriteResult:
+        self.calls["bulk_write"] += 1
+        outcomes = list()
+        with self._lock:
+            for request in requests:
+                if not isinstance(request, (UpdateOne, ReplaceOne)):
+                    raise NotImplementedError("LocalCollection does not support [{0}].".format(type(request).__name__))
+                outcomes.append(self._apply(
+                    filter=request._filter, update=request._doc, upsert=request._upsert
+                    , replace=isinstance(request, ReplaceOne)
+                ))
+        return LocalBulkWriteResult(matched_count=outcomes.count("matched"), upserted_count=outcomes.count("upserted"))
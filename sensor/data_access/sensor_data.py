@@ -1,8 +1,9 @@
 import os, sys
 import json
+import itertools
 import numpy as np
 import pandas as pd
-from typing import Optional
+from typing import Iterator, List, Optional
 
 from sensor.connection.mongodb_connection import MongoDBClient
 from sensor.constant.database import DATABASE_NAME
@@ -98,3 +99,57 @@ class SensorData:
         except Exception as e:
             logging.ERROR(str(SensorException(error_message=e)))
             raise SensorException(error_message=e)
+
+    def get_collection(self, collection_name:str, database_name:Optional[str]=None):
+        """
+        Description: This function gives a mongoDB collection of the default or the given database.
+        """
+        if database_name is None:
+            return self.mongo_client.database_name[collection_name]
+        return self.mongo_client.client[database_name][collection_name]
+
+    @staticmethod
+    def iter_record_chunks(collection, columns:List[str], chunk_size:int
+                          , after_id:Optional[object]=None)->Iterator[List[dict]]:
+        """
+        Description: This function streams the collection in _id order as chunks of \
+            records, reading only _id and the given columns.
+
+        Params:
+        --------
+        collection: pymongo collection
+            collection to read
+        columns: list
+            fields to project
+        chunk_size: int
+            records per chunk, also the cursor batch size
+        after_id: object
+            only records with a greater _id are read
+
+        Returns: Iterator of record chunks
+        """
+        try:
+            cursor = collection.find(
+                {} if after_id is None else {"_id":{"$gt":after_id}}
+                , {column:1 for column in columns}
+                , sort=[("_id", 1)], batch_size=chunk_size
+            )
+            while True:
+                chunk = list(itertools.islice(cursor, chunk_size))
+                if not chunk:
+                    return
+                yield chunk
+        except Exception as e:
+            logging.error(str(SensorException(error_message=e)))
+            raise SensorException(error_message=e)
+
+    @staticmethod
+    def get_record_features(records:List[dict], columns:List[str])->np.array:
+        """
+        Description: This function converts mongoDB records into a float feature \
+            array, absent fields and "na" become NaN.
+
+        Returns: 2d feature array in the order of columns
+        """
+        df = pd.DataFrame.from_records(records, columns=columns)
+        return df.apply(pd.to_numeric, errors="coerce").to_numpy(dtype=np.float64)
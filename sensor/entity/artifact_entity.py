@@ -1,10 +1,12 @@
-from dataclasses import dataclass
+from typing import List, Optional
+from dataclasses import dataclass, field
 
 @dataclass
 class DataIngestionArtifact:
     feature_store_path:str
     train_file_path:str
     test_file_path:str
+    evaluation_file_path:str
 
 @dataclass
 class DataValidationArtifact:
@@ -23,22 +25,70 @@ class ClassificationMetricsArtifact:
     precision_score:float
     recall_score:float
     auroc_score:float
+    cost_score:float
+    threshold:float
+
+@dataclass
+class CrossValidationMetricsArtifact:
+    fold_metric_artifacts:List[ClassificationMetricsArtifact]
+    mean_metric_artifact:ClassificationMetricsArtifact
+    std_metric_artifact:ClassificationMetricsArtifact
+
+@dataclass
+class EarlyStoppingArtifact:
+    eval_metric:str
+    best_iteration:int
+    best_score:float
+    rounds_trained:int
+    rounds_saved:int
+    train_metric_curve:List[float]
+    validation_metric_curve:List[float]
+
 @dataclass
 class ModelTrainerArtifact:
     trained_model_path:str
     train_metric_artifact:ClassificationMetricsArtifact
     test_metric_artifact:ClassificationMetricsArtifact
+    cv_metric_artifact:CrossValidationMetricsArtifact
+    early_stopping_artifact:EarlyStoppingArtifact
+    trained_model:object = field(default=None, repr=False, compare=False)
     
 @dataclass
 class ModelEvaluationArtifact:
     is_model_accepted:bool
     improved_accuracy:float
+    improved_accuracy_lower:float
+    improved_accuracy_upper:float
+    bootstrap_random_state:int
     latest_model_path:str
     trained_model_path:str
     trained_model_metric_artifact:ClassificationMetricsArtifact
     latest_model_metric_artifact:ClassificationMetricsArtifact
+    data_fingerprint:str
 
 @dataclass
 class ModelPusherArtifact:
+    model_version:str
     saved_model_path:str
     model_file_path:str
+
+@dataclass
+class ArtifactRetentionArtifact:
+    dry_run:bool
+    retention_report_path:str
+    compacted_runs:List[str]
+    removed_model_versions:List[str]
+    removed_blobs:List[str]
+    reclaimed_bytes:int
+
+@dataclass
+class BatchScoringArtifact:
+    collection_name:str
+    prediction_collection_name:str
+    model_version:str
+    resumed_after_id:Optional[str]
+    last_id:Optional[str]
+    rows_scored:int
+    chunks_scored:int
+    elapsed_seconds:float
+    rows_per_second:float
@@ -9,7 +9,7 @@ class TrainingPipelineConfig:
 
     def __init__(self)->None:
         try:
-            self.timestamp = datetime.now().strftime("%d%m%Y_%H%M%S")
+            self.timestamp = datetime.now().strftime(training_pipeline.ARTIFACT_TIMESTAMP_FORMAT)
             self.pipeline_name:str = training_pipeline.PIPLEINE_NAME
             self.artifact_dir:str = os.path.join(
                 training_pipeline.ARTIFACT_DIR, self.timestamp
@@ -37,7 +37,12 @@ class DataIngestionConfig:
                 self.data_ingestion_dir, training_pipeline.DATA_INGESTION_DATASET_DIR
                 , training_pipeline.TEST_FILE_NAME
             )
+            self.evaluation_file_path = os.path.join(
+                self.data_ingestion_dir, training_pipeline.DATA_INGESTION_DATASET_DIR
+                , training_pipeline.EVALUATION_FILE_NAME
+            )
             self.test_split_ratio:float = training_pipeline.DATA_INGESTION_TEST_SPLIT_RATIO
+            self.random_state:int = training_pipeline.DATA_INGESTION_RANDOM_STATE
             self.collection_name = database.COLLECTION_NAME
 
         except Exception as e:
@@ -102,6 +107,15 @@ class ModelTrainerConfig:
             self.expected_accuracy:float = training_pipeline.MODEL_TRAINER_EXPECTED_SCORE
             self.over_fitting_under_fitting_threshold:float = \
                 training_pipeline.MODEL_TRAINER_OVER_FITTING_UNDER_FITTING_THRESHOLD
+            self.cv_folds:int = training_pipeline.MODEL_TRAINER_CV_FOLDS
+            self.cv_max_workers:int = min(
+                training_pipeline.MODEL_TRAINER_CV_MAX_WORKERS, os.cpu_count() or 1
+            )
+            self.validation_split_ratio:float = training_pipeline.MODEL_TRAINER_VALIDATION_SPLIT_RATIO
+            self.max_boosting_rounds:int = training_pipeline.MODEL_TRAINER_MAX_BOOSTING_ROUNDS
+            self.early_stopping_rounds:int = training_pipeline.MODEL_TRAINER_EARLY_STOPPING_ROUNDS
+            self.eval_metric:str = training_pipeline.MODEL_TRAINER_EVAL_METRIC
+            self.random_state:int = training_pipeline.MODEL_TRAINER_RANDOM_STATE
         except Exception as e:
             logging.error(str(SensorException(error_message=e)))
             raise SensorException(error_message=e)
@@ -119,6 +133,11 @@ class ModelEvaluationConfig:
                 self.model_evaluation_dir, training_pipeline.MODEL_EVALUATION_REPORT_NAME
             )
             self.change_threshold = training_pipeline.MODEL_EVALUATION_CHANGED_THRESHOLD
+            self.prediction_cache_dir_name = training_pipeline.MODEL_EVALUATION_PREDICTION_CACHE_DIR
+            self.bootstrap_resamples:int = training_pipeline.MODEL_EVALUATION_BOOTSTRAP_RESAMPLES
+            self.bootstrap_confidence:float = training_pipeline.MODEL_EVALUATION_BOOTSTRAP_CONFIDENCE
+            self.bootstrap_max_batch_bytes:int = training_pipeline.MODEL_EVALUATION_BOOTSTRAP_MAX_BATCH_BYTES
+            self.bootstrap_random_state:int = training_pipeline.MODEL_EVALUATION_BOOTSTRAP_RANDOM_STATE
         except Exception as e:
             logging.error(str(SensorException(error_message=e)))
             raise SensorException(error_message=e)
@@ -136,9 +155,42 @@ class ModelPusherConfig:
                 self.model_pusher_dir, training_pipeline.MODEL_FILE_NAME
             )
             model_timestamp = round(datetime.now().timestamp())
+            self.model_version:str = f"{model_timestamp}"
+            self.saved_model_dir:str = training_pipeline.SAVED_MODEL_DIR
+            self.model_blob_dir:str = training_pipeline.MODEL_BLOB_DIR
             self.saved_model_path = os.path.join(
-                training_pipeline.SAVED_MODEL_DIR, f"{model_timestamp}", training_pipeline.MODEL_FILE_NAME
+                self.saved_model_dir, self.model_version, training_pipeline.MODEL_FILE_NAME
             )
         except Exception as e:
             logging.error(str(SensorException(error_message=e)))
-            raise SensorException(error_message=e)
\ No newline at end of file
+            raise SensorException(error_message=e)
+
+
+class ArtifactRetentionConfig:
+
+    def __init__(self, training_pipeline_config:TrainingPipelineConfig, dry_run:bool=None)->None:
+        try:
+            logging.info("Accessing ArtifactRetentionConfig.")
+            self.artifact_root_dir:str = training_pipeline.ARTIFACT_DIR
+            self.current_run_dir:str = training_pipeline_config.artifact_dir
+            self.run_manifest_file_name:str = training_pipeline.ARTIFACT_RETENTION_RUN_MANIFEST_NAME
+            self.run_manifest_file_path:str = os.path.join(
+                training_pipeline_config.artifact_dir, training_pipeline.ARTIFACT_RETENTION_RUN_MANIFEST_NAME
+            )
+            self.retention_report_file_path:str = os.path.join(
+                training_pipeline_config.artifact_dir, training_pipeline.ARTIFACT_RETENTION_DIR_NAME
+                , training_pipeline.ARTIFACT_RETENTION_REPORT_NAME
+            )
+            self.saved_model_dir:str = training_pipeline.SAVED_MODEL_DIR
+            self.model_blob_dir:str = training_pipeline.MODEL_BLOB_DIR
+            self.keep_last_runs:int = training_pipeline.ARTIFACT_RETENTION_KEEP_LAST_RUNS
+            self.keep_accepted_runs:bool = training_pipeline.ARTIFACT_RETENTION_KEEP_ACCEPTED_RUNS
+            self.max_runs_bytes:int = training_pipeline.ARTIFACT_RETENTION_MAX_RUNS_BYTES
+            self.keep_last_models:int = training_pipeline.ARTIFACT_RETENTION_KEEP_LAST_MODELS
+            self.max_models_bytes:int = training_pipeline.ARTIFACT_RETENTION_MAX_MODELS_BYTES
+            self.compact_keep_suffixes:tuple = training_pipeline.ARTIFACT_RETENTION_COMPACT_KEEP_SUFFIXES
+            self.timestamp_format:str = training_pipeline.ARTIFACT_TIMESTAMP_FORMAT
+            self.dry_run:bool = training_pipeline.ARTIFACT_RETENTION_DRY_RUN if dry_run is None else dry_run
+        except Exception as e:
+            logging.error(str(SensorException(error_message=e)))
+            raise SensorException(error_message=e)
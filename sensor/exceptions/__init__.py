@@ -26,6 +26,16 @@ class SensorException(Exception):
     def __str__(self,):
         return self.error_message
 
+    def __reduce__(self,):
+        # a process pool pickles errors back to the parent, keep the formatted message
+        return (restore_sensor_exception, (self.error_message,))
+
+
+def restore_sensor_exception(error_message:str)->SensorException:
+    exception = SensorException.__new__(SensorException)
+    exception.error_message = error_message
+    return exception
+
       
       
       
@@ -1,23 +1,165 @@
 import numpy as np
+from typing import Tuple
 from sensor.logger import logging
 from sensor.exceptions import SensorException
 from sensor.entity.artifact_entity import ClassificationMetricsArtifact
-from sklearn.metrics import (f1_score, recall_score, roc_auc_score, precision_score)
+from sensor.constant.training_pipeline import (FALSE_POSITIVE_COST, FALSE_NEGATIVE_COST)
 
 class ClassificationMetrics:
     @staticmethod
-    def get_classfication_metric(y_true:np.array, y_pred:np.array)->ClassificationMetricsArtifact:
-        f1score = f1_score(y_true , y_pred)
-        recallscore = recall_score(y_true , y_pred)
-        precisionscore = precision_score(y_true , y_pred)
-        aurocscore = roc_auc_score(y_true , y_pred)
+    def get_threshold_sweep(y_true:np.array, y_score:np.array)->dict:
+        """
+        Description:
+            This function builds the confusion matrix for every distinct score \
+            threshold from a single descending sort of the scores. A sample is \
+            predicted positive when its score is >= the threshold, the first \
+            threshold is +inf (nothing predicted positive).
 
-        classfication_metric_artifact = ClassificationMetricsArtifact(
-            f1_score=f1score, precision_score=precisionscore
-            , recall_score=recallscore, auroc_score=aurocscore
-        )
-        
-        return classfication_metric_artifact
-    
+        Params:
+        ----------
+        y_true: np.array
+            encoded target variables
+        y_score: np.array
+            positive class probabilities
 
+        Returns: dict of thresholds, tp, fp, fn, tn arrays
+        """
+        try:
+            y_true = np.asarray(y_true, dtype=np.float64)
+            y_score = np.asarray(y_score, dtype=np.float64)
+            order = np.argsort(y_score, kind="mergesort")[::-1]
+            y_score, y_true = y_score[order], y_true[order]
 
+            # last index of every run of equal scores
+            threshold_idx = np.r_[np.flatnonzero(np.diff(y_score)), y_true.size-1]
+            tp = np.r_[0, np.cumsum(y_true)[threshold_idx]]
+            fp = np.r_[0, threshold_idx+1-tp[1:]]
+            thresholds = np.r_[np.inf, y_score[threshold_idx]]
+
+            return {
+                "thresholds":thresholds
+                , "tp":tp
+                , "fp":fp
+                , "fn":tp[-1]-tp
+                , "tn":fp[-1]-fp
+            }
+        except Exception as e:
+            logging.error(str(SensorException(error_message=e)))
+            raise SensorException(error_message=e)
+
+    @staticmethod
+    def get_classfication_metric(y_true:np.array, y_score:np.array
+                                , threshold:float=None)->ClassificationMetricsArtifact:
+        """
+        Description:
+            This function computes f1, precision, recall, AUROC and the APS \
+            misclassification cost (FALSE_POSITIVE_COST x FP + FALSE_NEGATIVE_COST x FN) \
+            from one threshold sweep over the predicted probabilities.
+
+        Params:
+        ----------
+        y_true: np.array
+            encoded target variables
+        y_score: np.array
+            positive class probabilities
+        threshold: float
+            decision threshold, the cost-optimal threshold of the sweep when None
+
+        Returns: ClassificationMetricsArtifact
+        """
+        try:
+            sweep = ClassificationMetrics.get_threshold_sweep(y_true=y_true, y_score=y_score)
+            thresholds, tp, fp, fn = sweep["thresholds"], sweep["tp"], sweep["fp"], sweep["fn"]
+            n_pos, n_neg = tp[-1], fp[-1]
+            if n_pos==0 or n_neg==0:
+                raise Exception("Both target classes are required to compute classification metrics.")
+
+            cost = FALSE_POSITIVE_COST*fp + FALSE_NEGATIVE_COST*fn
+            if threshold is None:
+                idx = int(np.argmin(cost))
+                threshold = float(thresholds[idx])
+            else:
+                # last sweep point whose threshold is still >= the given threshold
+                idx = int(np.searchsorted(-thresholds, -threshold, side="right"))-1
+
+            tpr, fpr = tp/n_pos, fp/n_neg
+            aurocscore = float(np.sum(np.diff(fpr)*(tpr[1:]+tpr[:-1]))/2)
+            predicted_pos = tp[idx]+fp[idx]
+            precisionscore = float(tp[idx]/predicted_pos) if predicted_pos else 0.0
+            recallscore = float(tpr[idx])
+            f1score = float(2*tp[idx]/(2*tp[idx]+fp[idx]+fn[idx]))
+
+            classfication_metric_artifact = ClassificationMetricsArtifact(
+                f1_score=f1score, precision_score=precisionscore
+                , recall_score=recallscore, auroc_score=aurocscore
+                , cost_score=float(cost[idx]), threshold=threshold
+            )
+
+            return classfication_metric_artifact
+        except Exception as e:
+            logging.error(str(SensorException(error_message=e)))
+            raise SensorException(error_message=e)
+
+    @staticmethod
+    def get_paired_bootstrap_interval(y_true:np.array, y_pred_a:np.array, y_pred_b:np.array
+                                    , n_resamples:int, confidence:float, max_batch_bytes:int
+                                    , random_state:int=None)->Tuple[float, float, float]:
+        """
+        Description:
+            This function gives the f1 difference of two models' predictions on the \
+            same dataset with its paired bootstrap confidence interval. Both models \
+            are scored on the same resampled rows. Resamples are drawn as numpy index \
+            matrices in batches sized to stay within max_batch_bytes, and every row \
+            is reduced to the counts of its 8 (target, pred_a, pred_b) combinations.
+
+        Params:
+        ----------
+        y_true: np.array
+            encoded target variables
+        y_pred_a, y_pred_b: np.array
+            predicted target variables of the two models
+        n_resamples: int
+            number of bootstrap resamples
+        confidence: float
+            confidence level of the interval
+        max_batch_bytes: int
+            memory budget of one batch of resamples
+        random_state: int
+            seed of the resampling
+
+        Returns: (f1_a - f1_b, lower bound, upper bound)
+        """
+        try:
+            codes = (4*np.asarray(y_true, dtype=np.uint8) + 2*np.asarray(y_pred_a, dtype=np.uint8)
+                    + np.asarray(y_pred_b, dtype=np.uint8))
+            n_rows = codes.size
+            # int32 index + uint8 gathered code + bool comparison per element
+            batch_size = int(max(1, min(n_resamples, max_batch_bytes//(6*n_rows))))
+            rng = np.random.default_rng(random_state)
+
+            def f1_delta(counts:np.array)->np.array:
+                tp_a, fp_a, fn_a = counts[:,6]+counts[:,7], counts[:,2]+counts[:,3], counts[:,4]+counts[:,5]
+                tp_b, fp_b, fn_b = counts[:,5]+counts[:,7], counts[:,1]+counts[:,3], counts[:,4]+counts[:,6]
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    f1_a = np.nan_to_num(2*tp_a/(2*tp_a+fp_a+fn_a))
+                    f1_b = np.nan_to_num(2*tp_b/(2*tp_b+fp_b+fn_b))
+                return f1_a-f1_b
+
+            deltas = list()
+            for start in range(0, n_resamples, batch_size):
+                n_batch = min(batch_size, n_resamples-start)
+                sample = codes[rng.integers(0, n_rows, size=(n_batch, n_rows), dtype=np.int32)]
+                counts = np.stack([(sample==code).sum(axis=1) for code in range(8)], axis=1)
+                deltas.append(f1_delta(counts=counts))
+            deltas = np.concatenate(deltas)
+
+            alpha = (1-confidence)/2
+            lower, upper = np.quantile(deltas, [alpha, 1-alpha])
+            delta = float(f1_delta(counts=np.bincount(codes, minlength=8)[None,:])[0])
+            logging.info("Paired bootstrap of [{0}] resamples in batches of [{1}]: f1 delta [{2}] CI [{3}, {4}]".format(
+                n_resamples, batch_size, delta, lower, upper
+            ))
+            return delta, float(lower), float(upper)
+        except Exception as e:
+            logging.error(str(SensorException(error_message=e)))
+            raise SensorException(error_message=e)
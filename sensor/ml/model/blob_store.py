@@ -0,0 +1,101 @@
+import os
+import shutil
+from sensor.logger import logging
+from sensor.utils.main_utils import Utils
+from sensor.exceptions import SensorException
+from sensor.constant.training_pipeline import MODEL_BLOB_DIR
+
+
+class BlobStore:
+    """
+    Description:
+        This class stores model files once by their sha256 content hash. \
+        A stored file becomes a hardlink of its blob, so storing costs no extra \
+        disk and the mode of the file, shared with the blob, is left as it is. \
+        Published copies are hardlinks to the stored blob, falling back to a \
+        copy where the filesystem cannot link. Every file is first written \
+        under a temporary name and then renamed into place, so a reader or a \
+        crash never observes a partially written file.
+
+    Params:
+        blob_dir: directory of the content-addressed blobs
+    """
+    def __init__(self, blob_dir:str=MODEL_BLOB_DIR)->None:
+        self.blob_dir = blob_dir
+
+    def get_blob_path(self, digest:str)->str:
+        return os.path.join(self.blob_dir, digest)
+
+    @staticmethod
+    def _get_tmp_path(dst:str)->str:
+        dst_dir = os.path.dirname(dst)
+        if dst_dir:
+            os.makedirs(dst_dir, exist_ok=True)
+        tmp_dst = f"{dst}.{os.getpid()}.tmp"
+        if os.path.lexists(tmp_dst):
+            os.remove(tmp_dst)
+        return tmp_dst
+
+    @staticmethod
+    def _link_or_copy(src:str, dst:str)->None:
+        """
+        Description:
+            This function places src at dst atomically, as a hardlink when possible.
+        """
+        tmp_dst = BlobStore._get_tmp_path(dst=dst)
+        try:
+            os.link(src, tmp_dst)
+        except OSError:
+            shutil.copyfile(src, tmp_dst)
+        os.replace(tmp_dst, dst)
+
+    def put(self, file_path:str)->str:
+        """
+        Description:
+            This function adds a file to the store, a file whose content is \
+            already stored costs no extra disk.
+
+        Params:
+        ----------
+        file_path: str
+            file to be stored
+
+        Returns: sha256 digest of the file
+        """
+        try:
+            digest = Utils.get_file_fingerprint(file_path=file_path)
+            blob_path = self.get_blob_path(digest=digest)
+            if os.path.exists(blob_path):
+                logging.info("Blob [{0}] already stored.".format(digest))
+                return digest
+            # the blob shares the file's inode, copied only across filesystems
+            self._link_or_copy(src=file_path, dst=blob_path)
+            logging.info("Stored [{0}] as blob [{1}].".format(os.path.basename(file_path), digest))
+            return digest
+        except Exception as e:
+            logging.error(str(SensorException(error_message=e)))
+            raise SensorException(error_message=e)
+
+    def link(self, digest:str, dst_path:str)->str:
+        """
+        Description:
+            This function publishes a stored blob at the given path.
+
+        Params:
+        ----------
+        digest: str
+            sha256 digest of the blob
+        dst_path: str
+            path to publish the blob at
+
+        Returns: dst_path
+        """
+        try:
+            blob_path = self.get_blob_path(digest=digest)
+            if not os.path.exists(blob_path):
+                raise Exception("Blob [{0}] is not stored.".format(digest))
+            self._link_or_copy(src=blob_path, dst=dst_path)
+            return dst_path
+        except Exception as e:
+            logging.error(str(SensorException(error_message=e)))
+            raise SensorException(error_message=e)
@@ -0,0 +1,244 @@
+import os
+import json
+import shutil
+import threading
+import numpy as np
+import xgboost
+from typing import Optional
+from sklearn.pipeline import Pipeline
+from sklearn.impute import SimpleImputer
+from sklearn.preprocessing import RobustScaler
+from sensor.logger import logging
+from sensor.utils.main_utils import Utils
+from sensor.exceptions import SensorException
+from sensor.ml.model.estimator import SensorModel
+from sensor.constant.training_pipeline import MODEL_BUNDLE_DIR_NAME
+
+BUNDLE_FORMAT_VERSION:int = 1
+BUNDLE_MANIFEST_NAME:str = "manifest.json"
+BUNDLE_BOOSTER_NAME:str = "booster.ubj"
+BUNDLE_ARRAY_NAMES:dict = {
+    "fill_value":"imputer_fill_value.npy"
+    , "center":"scaler_center.npy"
+    , "scale":"scaler_scale.npy"
+}
+
+
+class ArrayPreprocessor:
+    """
+    Description:
+        This class replays the fitted SimpleImputer + RobustScaler pipeline with \
+        plain numpy parameter arrays.
+
+    Params:
+        fill_value: per feature imputation values
+        center: per feature scaler center
+        scale: per feature scaler scale
+    """
+    def __init__(self, fill_value:np.array, center:np.array, scale:np.array)->None:
+        self.fill_value = fill_value
+        self.center = center
+        self.scale = scale
+
+    def transform(self, X:np.array)->np.array:
+        """
+        Description:
+            This function imputes missing values and robust scales the input features.
+
+        Returns: transformed input features
+        """
+        try:
+            X = np.array(X, dtype=np.float64)
+            if X.ndim!=2 or X.shape[1]!=self.fill_value.shape[0]:
+                raise Exception("Expected [{0}] input features, got shape [{1}].".format(
+                    self.fill_value.shape[0], X.shape
+                ))
+            missing = np.isnan(X)
+            if missing.any():
+                X[missing] = np.broadcast_to(self.fill_value, X.shape)[missing]
+            X -= self.center
+            X /= self.scale
+            return X
+        except Exception as e:
+            logging.error(str(SensorException(error_message=e)))
+            raise SensorException(error_message=e)
+
+
+class BoosterClassifier:
+    """
+    Description:
+        This class exposes a bundled booster through predict_proba, the booster \
+        file is only read on first use.
+
+    Params:
+        booster_path: native xgboost model file
+        nthread: booster thread count, None keeps the xgboost default
+    """
+    def __init__(self, booster_path:str, nthread:Optional[int]=None)->None:
+        self.booster_path = booster_path
+        self.nthread = nthread
+        self._booster = None
+        self._lock = threading.Lock()
+
+    def get_booster(self,)->xgboost.Booster:
+        if self._booster is None:
+            with self._lock:
+                if self._booster is None:
+                    booster = xgboost.Booster(model_file=self.booster_path)
+                    if self.nthread is not None:
+                        booster.set_param({"nthread":self.nthread})
+                    logging.info("Loaded booster [{0}].".format(os.path.basename(self.booster_path)))
+                    self._booster = booster
+        return self._booster
+
+    def predict_proba(self, X:np.array)->np.array:
+        y_score = self.get_booster().predict(xgboost.DMatrix(X))
+        return np.column_stack([1-y_score, y_score])
+
+
+class ModelBundle:
+    """
+    Description:
+        This class saves and loads SensorModel as a versioned bundle directory: \
+        the booster in xgboost's native UBJSON format, the preprocessor as numpy \
+        parameter arrays and a small JSON manifest. Loading memory-maps the \
+        arrays and defers reading the booster until the first prediction, so \
+        no pickled object graph has to be rebuilt.
+    """
+    @staticmethod
+    def get_preprocessor_arrays(preprocessor:Pipeline)->dict:
+        """
+        Description:
+            This function extracts the parameter arrays of the fitted preprocessing pipeline.
+
+        Returns: dict of fill_value, center and scale arrays
+        """
+        steps = [step for _, step in preprocessor.steps]
+        if len(steps)!=2 or not isinstance(steps[0], SimpleImputer) or not isinstance(steps[1], RobustScaler):
+            raise Exception("Only the SimpleImputer + RobustScaler preprocessing pipeline can be bundled.")
+        imputer, scaler = steps
+        n_features = imputer.statistics_.shape[0]
+        return {
+            "fill_value":np.asarray(imputer.statistics_, dtype=np.float64)
+            , "center":(np.asarray(scaler.center_, dtype=np.float64) if scaler.center_ is not None
+                        else np.zeros(n_features))
+            , "scale":(np.asarray(scaler.scale_, dtype=np.float64) if scaler.scale_ is not None
+                        else np.ones(n_features))
+        }
+
+    @staticmethod
+    def save(sensor_model:SensorModel, bundle_dir:str)->str:
+        """
+        Description:
+            This function writes the model bundle, the directory is renamed into \
+            place once complete.
+
+        Params:
+        ----------
+        sensor_model: SensorModel
+            fitted preprocessor and XGBClassifier
+        bundle_dir: str
+            bundle directory to be created
+
+        Returns: bundle_dir
+        """
+        try:
+            tmp_bundle_dir = f"{bundle_dir}.{os.getpid()}.tmp"
+            shutil.rmtree(tmp_bundle_dir, ignore_errors=True)
+            os.makedirs(tmp_bundle_dir)
+
+            preprocessor_arrays = ModelBundle.get_preprocessor_arrays(preprocessor=sensor_model.preprocessor)
+            for name, array in preprocessor_arrays.items():
+                Utils.save_numpy_array(
+                    file_path=os.path.join(tmp_bundle_dir, BUNDLE_ARRAY_NAMES[name]), array=array
+                )
+            booster = sensor_model.model.get_booster()
+            booster.save_model(os.path.join(tmp_bundle_dir, BUNDLE_BOOSTER_NAME))
+
+            feature_names = getattr(sensor_model.preprocessor, "feature_names_in_", None)
+            manifest = {
+                "format_version":BUNDLE_FORMAT_VERSION
+                , "xgboost_version":xgboost.__version__
+                , "threshold":float(sensor_model.threshold)
+                , "n_features":int(preprocessor_arrays["fill_value"].shape[0])
+                , "feature_names":None if feature_names is None else list(map(str, feature_names))
+                , "num_boosted_rounds":int(booster.num_boosted_rounds())
+                , "booster":BUNDLE_BOOSTER_NAME
+                , "arrays":BUNDLE_ARRAY_NAMES
+            }
+            with open(os.path.join(tmp_bundle_dir, BUNDLE_MANIFEST_NAME), "w") as manifest_file:
+                json.dump(manifest, manifest_file, indent=2)
+
+            shutil.rmtree(bundle_dir, ignore_errors=True)
+            os.replace(tmp_bundle_dir, bundle_dir)
+            logging.info("Model bundle saved as [{0}].".format(bundle_dir))
+            return bundle_dir
+        except Exception as e:
+            logging.error(str(SensorException(error_message=e)))
+            raise SensorException(error_message=e)
+
+    @staticmethod
+    def read_manifest(bundle_dir:str)->dict:
+        with open(os.path.join(bundle_dir, BUNDLE_MANIFEST_NAME), "r") as manifest_file:
+            return json.load(manifest_file)
+
+    @staticmethod
+    def load(bundle_dir:str, nthread:Optional[int]=None)->SensorModel:
+        """
+        Description:
+            This function loads a model bundle with memory-mapped preprocessor \
+            arrays and a lazily loaded booster.
+
+        Params:
+        ----------
+        bundle_dir: str
+            bundle directory
+        nthread: int
+            booster thread count
+
+        Returns: SensorModel
+        """
+        try:
+            manifest = ModelBundle.read_manifest(bundle_dir=bundle_dir)
+            if manifest["format_version"]>BUNDLE_FORMAT_VERSION:
+                raise Exception("Model bundle format [{0}] is newer than supported [{1}].".format(
+                    manifest["format_version"], BUNDLE_FORMAT_VERSION
+                ))
+            preprocessor = ArrayPreprocessor(**{
+                name:Utils.load_numpy_array(file_path=os.path.join(bundle_dir, file_name), mmap_mode="r")
+                for name, file_name in manifest["arrays"].items()
+            })
+            model = BoosterClassifier(
+                booster_path=os.path.join(bundle_dir, manifest["booster"]), nthread=nthread
+            )
+            return SensorModel(preprocessor=preprocessor, model=model, threshold=manifest["threshold"])
+        except Exception as e:
+            logging.error(str(SensorException(error_message=e)))
+            raise SensorException(error_message=e)
+
+    @staticmethod
+    def get_bundle_dir(model_path:str)->str:
+        return os.path.join(os.path.dirname(model_path), MODEL_BUNDLE_DIR_NAME)
+
+    @staticmethod
+    def load_saved_model(model_path:str, nthread:Optional[int]=None)->SensorModel:
+        """
+        Description:
+            This function loads a saved model from the bundle next to it, falling \
+            back to the dill pickle for models saved before bundles existed.
+
+        Params:
+        ----------
+        model_path: str
+            saved model.pkl path
+
+        Returns: SensorModel
+        """
+        try:
+            bundle_dir = ModelBundle.get_bundle_dir(model_path=model_path)
+            if os.path.exists(os.path.join(bundle_dir, BUNDLE_MANIFEST_NAME)):
+                return ModelBundle.load(bundle_dir=bundle_dir, nthread=nthread)
+            return Utils.load_object(file_path=model_path)
+        except Exception as e:
+            logging.error(str(SensorException(error_message=e)))
+            raise SensorException(error_message=e)
@@ -0,0 +1,162 @@
+import os
+import numpy as np
+import multiprocessing
+from typing import List
+from xgboost import XGBClassifier
+from multiprocessing.shared_memory import SharedMemory
+from concurrent.futures import ProcessPoolExecutor
+from sklearn.model_selection import StratifiedKFold, train_test_split
+from sensor.logger import logging
+from sensor.exceptions import SensorException
+from sensor.ml.metric.classification_metric import ClassificationMetrics
+from sensor.entity.artifact_entity import (ClassificationMetricsArtifact, CrossValidationMetricsArtifact)
+
+# worker process view over the parent's shared-memory dataset
+_shared_memory:SharedMemory = None
+_shared_arr:np.ndarray = None
+
+
+def _attach_shared_array(shm_name:str, shape:tuple, dtype:str)->None:
+    """
+    Description:
+        Process pool initializer, attaches the worker to the shared-memory \
+        copy of the dataset instead of receiving a pickled copy per fold.
+    """
+    global _shared_memory, _shared_arr
+    _shared_memory = SharedMemory(name=shm_name)
+    _shared_arr = np.ndarray(shape=shape, dtype=dtype, buffer=_shared_memory.buf)
+
+
+def _fit_fold(fold:int, train_idx:np.array, test_idx:np.array, n_threads:int, model_params:dict
+            , validation_split_ratio:float, random_state:int)->ClassificationMetricsArtifact:
+    """
+    Description:
+        Fits a model on one fold of the shared dataset the way the trainer fits \
+        the final model: it early stops and picks the cost-optimal decision \
+        threshold on a validation slice of the fold's training part, then \
+        scores the fold's held-out part at that threshold.
+    """
+    X, y = _shared_arr[:,:-1], _shared_arr[:,-1]
+    fit_idx, val_idx = train_test_split(
+        train_idx, test_size=validation_split_ratio, stratify=y[train_idx], random_state=random_state
+    )
+    xgb_clf = XGBClassifier(**model_params, n_jobs=n_threads)
+    xgb_clf.fit(X[fit_idx], y[fit_idx], eval_set=[(X[val_idx], y[val_idx])], verbose=False)
+    val_metrics = ClassificationMetrics.get_classfication_metric(
+        y_true=y[val_idx], y_score=xgb_clf.predict_proba(X[val_idx])[:,1]
+    )
+    fold_metrics = ClassificationMetrics.get_classfication_metric(
+        y_true=y[test_idx], y_score=xgb_clf.predict_proba(X[test_idx])[:,1], threshold=val_metrics.threshold
+    )
+    logging.info("Fold [{0}] classification metrics [{1}]".format(fold, fold_metrics.__dict__))
+    return fold_metrics
+
+
+class StratifiedCrossValidator:
+    """
+    Description:
+        This class runs stratified k-fold cross validation with the folds \
+        fitted concurrently in worker processes. Every worker reads the same \
+        shared-memory copy of the dataset and the xgboost threads are split \
+        between the workers so the cores are not oversubscribed.
+
+    Params:
+        n_folds: number of stratified folds
+        max_workers: upper limit of concurrent worker processes
+        model_params: XGBClassifier parameters of the trained model, early stopping included
+        validation_split_ratio: share of each fold's training part held out for early stopping
+        random_state: seed of the folds and the validation slices
+    """
+    def __init__(self, n_folds:int, max_workers:int, model_params:dict, validation_split_ratio:float
+                , random_state:int)->None:
+        try:
+            self.n_folds = n_folds
+            self.model_params = model_params
+            self.validation_split_ratio = validation_split_ratio
+            self.random_state = random_state
+            self.max_workers = max(1, min(max_workers, n_folds))
+            self.n_threads = max(1, (os.cpu_count() or 1)//self.max_workers)
+        except Exception as e:
+            logging.error(str(SensorException(error_message=e)))
+            raise SensorException(error_message=e)
+
+    @staticmethod
+    def summarize(fold_metrics:List[ClassificationMetricsArtifact])->CrossValidationMetricsArtifact:
+        """
+        Description:
+            This function aggregates per fold metrics into their mean and standard deviation.
+
+        Returns: CrossValidationMetricsArtifact
+        """
+        try:
+            metric_names = list(fold_metrics[0].__dict__.keys())
+            scores = np.array([[getattr(metrics, name) for name in metric_names]
+                               for metrics in fold_metrics])
+            mean_metrics = ClassificationMetricsArtifact(
+                **dict(zip(metric_names, map(float, scores.mean(axis=0))))
+            )
+            std_metrics = ClassificationMetricsArtifact(
+                **dict(zip(metric_names, map(float, scores.std(axis=0))))
+            )
+            return CrossValidationMetricsArtifact(
+                fold_metric_artifacts=fold_metrics
+                , mean_metric_artifact=mean_metrics
+                , std_metric_artifact=std_metrics
+            )
+        except Exception as e:
+            logging.error(str(SensorException(error_message=e)))
+            raise SensorException(error_message=e)
+
+    def cross_validate(self, arr:np.array)->CrossValidationMetricsArtifact:
+        """
+        Description:
+            This function cross validates the model on the given dataset.
+
+        Params:
+        ----------
+        arr: np.array
+            input features with the target feature as last column
+
+        Returns: CrossValidationMetricsArtifact
+        """
+        shared_memory = None
+        try:
+            arr = np.ascontiguousarray(arr)
+            shared_memory = SharedMemory(create=True, size=arr.nbytes)
+            shared_arr = np.ndarray(shape=arr.shape, dtype=arr.dtype, buffer=shared_memory.buf)
+            shared_arr[:] = arr
+            logging.info("Dataset of [{0}] bytes copied to shared memory [{1}].".format(
+                arr.nbytes, shared_memory.name
+            ))
+
+            folds = StratifiedKFold(n_splits=self.n_folds, shuffle=True, random_state=self.random_state).split(
+                X=np.zeros(arr.shape[0]), y=arr[:,-1]
+            )
+            logging.info("Cross validating [{0}] folds on [{1}] workers with [{2}] threads each.".format(
+                self.n_folds, self.max_workers, self.n_threads
+            ))
+            with ProcessPoolExecutor(
+                max_workers=self.max_workers
+                , mp_context=multiprocessing.get_context()
+                , initializer=_attach_shared_array
+                , initargs=(shared_memory.name, arr.shape, arr.dtype.str)
+            ) as executor:
+                futures = [
+                    executor.submit(_fit_fold, fold, train_idx, test_idx, self.n_threads, self.model_params
+                                    , self.validation_split_ratio, self.random_state)
+                    for fold, (train_idx, test_idx) in enumerate(folds)
+                ]
+                fold_metrics = [future.result() for future in futures]
+
+            cv_metrics = self.summarize(fold_metrics=fold_metrics)
+            logging.info("Cross validation mean [{0}] std [{1}]".format(
+                cv_metrics.mean_metric_artifact.__dict__, cv_metrics.std_metric_artifact.__dict__
+            ))
+            return cv_metrics
+        except Exception as e:
+            logging.error(str(SensorException(error_message=e)))
+            raise SensorException(error_message=e)
+        finally:
+            if shared_memory is not None:
+                shared_memory.close()
+                shared_memory.unlink()
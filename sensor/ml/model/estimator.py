@@ -1,8 +1,11 @@
 import os
 import numpy as np
+from typing import Optional
 from sensor.logger import logging
 from sensor.exceptions import SensorException
-from sensor.constant.training_pipeline import (MODEL_FILE_NAME, SAVED_MODEL_DIR)
+from sensor.ml.model.registry import ModelRegistry
+from sensor.telemetry import INFERENCE_STAGE_SECONDS
+from sensor.constant.training_pipeline import SAVED_MODEL_DIR
 
 class TargetValueMapping:
     
@@ -52,15 +55,42 @@ class SensorModel:
     Params:
         preprocessor: data transformation object
         model: model object
+        threshold: decision threshold on the positive class probability
     """
-    def __init__(self, preprocessor:object, model:object) -> None:
+    # models pickled before thresholds were stored keep the booster default
+    threshold:float = 0.5
+    # models pickled before the inplace path keep the booster's thread count
+    nthread:Optional[int] = None
+
+    def __init__(self, preprocessor:object, model:object, threshold:float=0.5) -> None:
         try:
             logging.info("SensorModel Initiated.")
             self.preprocessor = preprocessor
             self.model = model
+            self.threshold = threshold
         except Exception as e:
             logging.error(str(SensorException(error_message=e)))
             raise SensorException(error_message=e)
+
+    def predict_proba(self,X_test:np.array)->np.array:
+        """
+        Description: 
+            This function gives the positive class probability for the new input features.
+        
+        Returns: positive class probabilities
+        """
+        try:
+            with INFERENCE_STAGE_SECONDS.time(stage="transform"):
+                X_transformed = self.preprocessor.transform(X_test)
+            logging.info("Data transformation completed for prediction.")
+            with INFERENCE_STAGE_SECONDS.time(stage="predict"):
+                y_score = self.model.predict_proba(X_transformed)[:,1]
+            logging.info("Model prediction completed for prediction.")
+            
+            return y_score
+        except Exception as e:
+            logging.error(msg=str(SensorException(error_message=e)))
+            raise SensorException(error_message=e)
         
     def predict(self,X_test:np.array)->np.array:
         """
@@ -70,47 +100,121 @@ class SensorModel:
         Returns: predicted target variables
         """
         try:
-            X_transformed = self.preprocessor.transform(X_test)
-            logging.info("Data transformation completed for prediction.")
-            y_pred = self.model.predict(X_transformed)
-            logging.info("Model prediction completed for prediction.")
+            y_pred = (self.predict_proba(X_test)>=self.threshold).astype(int)
             
             return y_pred
         except Exception as e:
             logging.error(msg=str(SensorException(error_message=e)))
             raise SensorException(error_message=e)
+
+    def get_booster(self,)->Optional[object]:
+        """
+        Description:
+            This function gives the underlying xgboost booster, or None when the \
+            model does not expose one with inplace_predict.
+        """
+        get_booster = getattr(self.model, "get_booster", None)
+        booster = get_booster() if get_booster is not None else None
+        return booster if hasattr(booster, "inplace_predict") else None
+
+    def set_nthread(self, nthread:int)->None:
+        """
+        Description: This function sets the thread count used by the booster \
+            on the inplace prediction path.
+        """
+        try:
+            self.nthread = nthread
+            booster = self.get_booster()
+            if booster is not None:
+                booster.set_param({"nthread":nthread})
+        except Exception as e:
+            logging.error(msg=str(SensorException(error_message=e)))
+            raise SensorException(error_message=e)
+
+    def inplace_predict_proba(self,X_test:np.array)->np.array:
+        """
+        Description:
+            This function gives the positive class probability through the \
+            booster's inplace_predict on a contiguous float32 array, skipping the \
+            DMatrix and the sklearn wrapper. Models without a booster fall back \
+            to predict_proba.
+
+        Returns: positive class probabilities
+        """
+        try:
+            booster = self.get_booster()
+            if booster is None:
+                return self.predict_proba(X_test)
+            with INFERENCE_STAGE_SECONDS.time(stage="transform"):
+                X_transformed = np.ascontiguousarray(self.preprocessor.transform(X_test), dtype=np.float32)
+            with INFERENCE_STAGE_SECONDS.time(stage="predict"):
+                # columns are ordered by the preprocessor, the booster has no feature names to check
+                y_score = booster.inplace_predict(X_transformed, validate_features=False)
+            if y_score.ndim==2:
+                y_score = y_score[:,1]
+
+            return y_score
+        except Exception as e:
+            logging.error(msg=str(SensorException(error_message=e)))
+            raise SensorException(error_message=e)
+
+    def inplace_predict(self,X_test:np.array)->np.array:
+        """
+        Description:
+            This function makes prediction for the new input features through \
+            inplace_predict_proba and the stored decision threshold.
+
+        Returns: predicted target variables
+        """
+        try:
+            y_pred = (self.inplace_predict_proba(X_test)>=self.threshold).astype(int)
+
+            return y_pred
+        except Exception as e:
+            logging.error(msg=str(SensorException(error_message=e)))
+            raise SensorException(error_message=e)
     
 class ModelResolver:
+    """
+    Description:
+        This class resolves the current champion model through the model registry.
+
+    Params:
+        model_dir: saved models directory
+    """
     def __init__(self, model_dir=SAVED_MODEL_DIR)->None:
         self.model_dir = model_dir
+        self.model_registry = ModelRegistry(model_dir=model_dir)
     
     def get_latest_model_path(self,)->str:
         try:
-            model_list = os.listdir(self.model_dir)
-            model_timestamps = list(map(int,model_list))
+            current_model = self.model_registry.get_current()
+            if current_model is None:
+                raise Exception("There is no registered model in [{0}].".format(self.model_dir))
 
-            latest_model_dir = max(model_timestamps)
-            latest_model_path = os.path.join(
-                self.model_dir, f"{latest_model_dir}", MODEL_FILE_NAME
-            )
+            return current_model["model_path"]
+        except Exception as e:
+            raise SensorException(error_message=e)
+
+    def get_latest_model_version(self,)->str:
+        try:
+            current_model = self.model_registry.get_current()
+            if current_model is None:
+                raise Exception("There is no registered model in [{0}].".format(self.model_dir))
 
-            return latest_model_path
+            return current_model["version"]
         except Exception as e:
             raise SensorException(error_message=e)
     
     def is_model_exists(self,)->bool:
         try:
-            if not os.path.exists(self.model_dir):
+            current_model = self.model_registry.get_current()
+            if current_model is None:
                 return False
             
-            model_timestamps = os.listdir(self.model_dir)
-            if len(model_timestamps)==0:
-                return False
-            
-            latest_model_path = self.get_latest_model_path()
-            if not os.path.exists(latest_model_path):
+            if not os.path.exists(current_model["model_path"]):
                 return False
             
             return True
         except Exception as e:
-            raise SensorException(error_message=e)
\ No newline at end of file
+            raise SensorException(error_message=e)
@@ -0,0 +1,311 @@
+import os
+import json
+import time
+from typing import List, Optional
+from sensor.logger import logging
+from sensor.exceptions import SensorException
+from sensor.utils.file_lock import FileLock
+from sensor.constant.training_pipeline import (MODEL_FILE_NAME, SAVED_MODEL_DIR
+                                                , MODEL_REGISTRY_MANIFEST_NAME, MODEL_REGISTRY_LOCK_NAME)
+
+MANIFEST_FORMAT_VERSION:int = 1
+
+
+class ModelRegistry:
+    """
+    Description:
+        This class keeps an indexed manifest of the saved model versions, with \
+        their path, metrics and data fingerprint, plus the "current" champion \
+        pointer. Writers serialize on a lock file and replace the manifest with \
+        an atomic rename, so concurrent readers always see a complete manifest. \
+        Readers cache the parsed manifest until the file changes on disk.
+
+    Params:
+        model_dir: saved models directory
+    """
+    def __init__(self, model_dir:str=SAVED_MODEL_DIR)->None:
+        try:
+            self.model_dir = model_dir
+            self.manifest_path = os.path.join(model_dir, MODEL_REGISTRY_MANIFEST_NAME)
+            self.lock_path = os.path.join(model_dir, MODEL_REGISTRY_LOCK_NAME)
+            self._manifest = None
+            self._manifest_stat = None
+        except Exception as e:
+            logging.error(str(SensorException(error_message=e)))
+            raise SensorException(error_message=e)
+
+    @staticmethod
+    def _empty_manifest()->dict:
+        return {
+            "format_version":MANIFEST_FORMAT_VERSION
+            , "current":None
+            , "latest":None
+            , "pinned":False
+            , "history":list()
+            , "versions":dict()
+        }
+
+    def _scan_legacy_versions(self,)->dict:
+        """
+        Description:
+            This function builds a manifest from the timestamp directories saved \
+            before the registry existed, skipping entries that are not versions.
+
+        Returns: manifest dict
+        """
+        manifest = self._empty_manifest()
+        if not os.path.isdir(self.model_dir):
+            return manifest
+        for version in sorted(filter(str.isdigit, os.listdir(self.model_dir)), key=int):
+            model_path = os.path.join(self.model_dir, version, MODEL_FILE_NAME)
+            if not os.path.exists(model_path):
+                continue
+            manifest["versions"][version] = {
+                "version":version
+                , "model_path":model_path
+                , "metrics":None
+                , "data_fingerprint":None
+                , "created_at":os.path.getmtime(model_path)
+            }
+            manifest["latest"] = manifest["current"] = version
+        logging.info("Indexed [{0}] legacy saved model versions.".format(len(manifest["versions"])))
+        return manifest
+
+    def _load_manifest(self,)->Optional[dict]:
+        """
+        Description:
+            This function gives the manifest file content, re-reading it only \
+            when the file has been replaced since the last read.
+
+        Returns: manifest dict, None when there is no manifest file
+        """
+        try:
+            stat = os.stat(self.manifest_path)
+        except FileNotFoundError:
+            return None
+        manifest_stat = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if manifest_stat!=self._manifest_stat:
+            with open(self.manifest_path, "r") as manifest_file:
+                self._manifest = json.load(manifest_file)
+            self._manifest_stat = manifest_stat
+        return self._manifest
+
+    def read_manifest(self,)->dict:
+        """
+        Description:
+            This function gives the registry manifest. When the directory only \
+            holds legacy versions, the first read indexes them and writes the \
+            manifest, so later reads do not scan the directory again.
+
+        Returns: manifest dict
+        """
+        try:
+            manifest = self._load_manifest()
+            if manifest is not None:
+                return manifest
+            if not os.path.isdir(self.model_dir):
+                return self._empty_manifest()
+            with FileLock(lock_file_path=self.lock_path):
+                # another process may have written it while this one waited
+                if not os.path.exists(self.manifest_path):
+                    self._write_manifest(manifest=self._scan_legacy_versions())
+            return self._load_manifest()
+        except Exception as e:
+            logging.error(str(SensorException(error_message=e)))
+            raise SensorException(error_message=e)
+
+    def _write_manifest(self, manifest:dict)->None:
+        """
+        Description:
+            This function writes the manifest to a temporary file and renames it \
+            over the current one. Callers hold the registry lock.
+        """
+        os.makedirs(self.model_dir, exist_ok=True)
+        manifest_tmp_path = f"{self.manifest_path}.{os.getpid()}.tmp"
+        with open(manifest_tmp_path, "w") as manifest_file:
+            json.dump(manifest, manifest_file, indent=2)
+            manifest_file.flush()
+            os.fsync(manifest_file.fileno())
+        os.replace(manifest_tmp_path, self.manifest_path)
+
+    def _update_manifest(self, update)->dict:
+        """
+        Description:
+            This function applies `update(manifest)` as one locked read-modify-write.
+
+        Returns: updated manifest dict
+        """
+        with FileLock(lock_file_path=self.lock_path):
+            self._manifest_stat = None
+            manifest = self._load_manifest() or self._scan_legacy_versions()
+            update(manifest)
+            self._write_manifest(manifest=manifest)
+            return manifest
+
+    @staticmethod
+    def _set_current(manifest:dict, version:str)->None:
+        if manifest["current"] is not None and manifest["current"]!=version:
+            manifest["history"].append(manifest["current"])
+        manifest["current"] = version
+
+    def register(self, version:str, model_path:str, metrics:dict=None
+                , data_fingerprint:str=None, promote:bool=True, **extra)->dict:
+        """
+        Description:
+            This function adds a model version to the registry and, unless the \
+            current version is pinned, promotes it to champion.
+
+        Params:
+        ----------
+        version: str
+            version id
+        model_path: str
+            saved model file path
+        metrics: dict
+            evaluation metrics of the model
+        data_fingerprint: str
+            content hash of the evaluation dataset
+        promote: bool
+            make the version the current champion
+
+        Returns: registry entry of the version
+        """
+        try:
+            entry = {
+                "version":version
+                , "model_path":model_path
+                , "metrics":metrics
+                , "data_fingerprint":data_fingerprint
+                , "created_at":time.time()
+                , **extra
+            }
+
+            def update(manifest:dict)->None:
+                manifest["versions"][version] = entry
+                manifest["latest"] = version
+                if promote and not manifest["pinned"]:
+                    self._set_current(manifest=manifest, version=version)
+
+            self._update_manifest(update=update)
+            logging.info("Registered model version [{0}].".format(version))
+            return entry
+        except Exception as e:
+            logging.error(str(SensorException(error_message=e)))
+            raise SensorException(error_message=e)
+
+    def pin(self, version:str)->None:
+        """
+        Description:
+            This function makes the given version the champion and keeps it \
+            there, new versions are registered without promotion until unpinned.
+        """
+        try:
+            def update(manifest:dict)->None:
+                if version not in manifest["versions"]:
+                    raise Exception("Model version [{0}] is not registered.".format(version))
+                self._set_current(manifest=manifest, version=version)
+                manifest["pinned"] = True
+
+            self._update_manifest(update=update)
+            logging.info("Pinned model version [{0}].".format(version))
+        except Exception as e:
+            logging.error(str(SensorException(error_message=e)))
+            raise SensorException(error_message=e)
+
+    def unpin(self,)->None:
+        """
+        Description:
+            This function lets newly registered versions be promoted again.
+        """
+        try:
+            self._update_manifest(update=lambda manifest: manifest.update(pinned=False))
+            logging.info("Unpinned model registry.")
+        except Exception as e:
+            logging.error(str(SensorException(error_message=e)))
+            raise SensorException(error_message=e)
+
+    def rollback(self, version:Optional[str]=None)->str:
+        """
+        Description:
+            This function moves the champion back to the given version, or to \
+            the previous champion when no version is given.
+
+        Returns: the version that became champion
+        """
+        try:
+            def update(manifest:dict)->None:
+                target = version
+                if target is None:
+                    while manifest["history"] and manifest["history"][-1] not in manifest["versions"]:
+                        manifest["history"].pop()
+                    if not manifest["history"]:
+                        raise Exception("There is no previous model version to roll back to.")
+                    target = manifest["history"].pop()
+                    manifest["current"] = target
+                else:
+                    if target not in manifest["versions"]:
+                        raise Exception("Model version [{0}] is not registered.".format(target))
+                    self._set_current(manifest=manifest, version=target)
+
+            manifest = self._update_manifest(update=update)
+            logging.info("Rolled back to model version [{0}].".format(manifest["current"]))
+            return manifest["current"]
+        except Exception as e:
+            logging.error(str(SensorException(error_message=e)))
+            raise SensorException(error_message=e)
+
+    def remove(self, version:str)->None:
+        """
+        Description:
+            This function removes a version from the registry, the champion \
+            version cannot be removed.
+        """
+        try:
+            def update(manifest:dict)->None:
+                if version==manifest["current"]:
+                    raise Exception("The current model version [{0}] cannot be removed.".format(version))
+                manifest["versions"].pop(version, None)
+                manifest["history"] = [v for v in manifest["history"] if v!=version]
+                if manifest["latest"]==version:
+                    manifest["latest"] = max(manifest["versions"], key=lambda v: manifest["versions"][v]["created_at"]
+                                            , default=None)
+
+            self._update_manifest(update=update)
+            logging.info("Removed model version [{0}] from registry.".format(version))
+        except Exception as e:
+            logging.error(str(SensorException(error_message=e)))
+            raise SensorException(error_message=e)
+
+    def get_version(self, version:str)->Optional[dict]:
+        """
+        Description:
+            This function gives the registry entry of the given version.
+        """
+        return self.read_manifest()["versions"].get(version)
+
+    def get_current(self,)->Optional[dict]:
+        """
+        Description:
+            This function gives the registry entry of the current champion.
+        """
+        manifest = self.read_manifest()
+        if manifest["current"] is None:
+            return None
+        return manifest["versions"].get(manifest["current"])
+
+    def get_latest(self,)->Optional[dict]:
+        """
+        Description:
+            This function gives the registry entry of the most recently registered version.
+        """
+        manifest = self.read_manifest()
+        if manifest["latest"] is None:
+            return None
+        return manifest["versions"].get(manifest["latest"])
+
+    def list_versions(self,)->List[dict]:
+        """
+        Description:
+            This function lists the registered versions, oldest first.
+        """
+        return sorted(self.read_manifest()["versions"].values(), key=lambda entry: entry["created_at"])
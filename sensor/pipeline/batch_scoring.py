@@ -0,0 +1,193 @@
+import time
+import argparse
+import itertools
+import collections
+import multiprocessing
+from datetime import datetime, timezone
+from typing import List, Optional
+from concurrent.futures import Future, ProcessPoolExecutor
+from pymongo import UpdateOne
+from sensor.logger import logging
+from sensor.utils.main_utils import Utils
+from sensor.exceptions import SensorException
+from sensor.data_access.sensor_data import SensorData
+from sensor.ml.model.registry import ModelRegistry
+from sensor.ml.model.estimator import TargetValueMapping
+from sensor.entity.artifact_entity import BatchScoringArtifact
+from sensor.constant.training_pipeline import SAVED_MODEL_DIR, SCHEMA_FILE_PATH
+from sensor.constant.database import (COLLECTION_NAME, PREDICTION_COLLECTION_NAME
+                                     , BATCH_SCORING_CHECKPOINT_COLLECTION_NAME)
+from sensor.constant.application import (BATCH_SCORING_CHUNK_SIZE, BATCH_SCORING_MAX_WORKERS
+                                        , BATCH_SCORING_START_METHOD, MODEL_INFERENCE_NTHREAD)
+
+# the champion model of a scoring worker, loaded once by the pool initializer
+_worker_model = None
+
+
+def init_scoring_worker(model_path:str, nthread:int)->None:
+    global _worker_model
+    from sensor.serving.model_cache import ModelCache
+    _worker_model = ModelCache.load_model(model_path=model_path, nthread=nthread)
+
+
+def score_records(records:List[dict], feature_columns:List[str])->tuple:
+    X = SensorData.get_record_features(records=records, columns=feature_columns)
+    y_score = _worker_model.inplace_predict_proba(X)
+    return [float(score) for score in y_score], float(_worker_model.threshold)
+
+
+class BatchScoring:
+    """
+    Description:
+        This class scores a whole mongoDB collection with the champion model. \
+        The collection is streamed in _id order with the schema projection, \
+        chunks are scored on a process pool whose workers load the model once, \
+        and predictions are upserted by _id with unordered bulk writes. After \
+        every written chunk the last _id is checkpointed, so a restart, or the \
+        next nightly run, only reads records that were not scored yet. \
+        Re-scoring a chunk after a crash overwrites the same predictions.
+
+    Params:
+        collection_name: collection to score
+        source_collection: collection object to read, defaults to collection_name through SensorData
+        prediction_collection: collection object predictions are written to
+        checkpoint_collection: collection object holding one checkpoint per scored collection
+        chunk_size: records per scored chunk
+        max_workers: scoring processes
+        model_dir: saved models directory
+    """
+    def __init__(self, collection_name:str=COLLECTION_NAME, source_collection=None, prediction_collection=None
+                , checkpoint_collection=None, chunk_size:int=BATCH_SCORING_CHUNK_SIZE
+                , max_workers:int=BATCH_SCORING_MAX_WORKERS, model_dir:str=SAVED_MODEL_DIR)->None:
+        try:
+            self.collection_name = collection_name
+            if source_collection is None or prediction_collection is None or checkpoint_collection is None:
+                sensor_data = SensorData()
+                if source_collection is None:
+                    source_collection = sensor_data.get_collection(collection_name=collection_name)
+                if prediction_collection is None:
+                    prediction_collection = sensor_data.get_collection(collection_name=PREDICTION_COLLECTION_NAME)
+                if checkpoint_collection is None:
+                    checkpoint_collection = sensor_data.get_collection(
+                        collection_name=BATCH_SCORING_CHECKPOINT_COLLECTION_NAME
+                    )
+            self.source_collection = source_collection
+            self.prediction_collection = prediction_collection
+            self.checkpoint_collection = checkpoint_collection
+            self.chunk_size = chunk_size
+            self.max_workers = max_workers
+            self.model_registry = ModelRegistry(model_dir=model_dir)
+            self.feature_columns = Utils.read_yaml_file(file_path=SCHEMA_FILE_PATH)["numerical_columns"]
+            self.label_mapping = TargetValueMapping().reverse_mapping()
+        except Exception as e:
+            logging.error(str(SensorException(error_message=e)))
+            raise SensorException(error_message=e)
+
+    def read_checkpoint(self,)->Optional[dict]:
+        return self.checkpoint_collection.find_one({"_id":self.collection_name})
+
+    def write_checkpoint(self, last_id:object, model_version:str, rows_scored:int)->None:
+        self.checkpoint_collection.replace_one(
+            {"_id":self.collection_name}
+            , {"last_id":last_id, "model_version":model_version, "rows_scored":rows_scored
+               , "updated_at":datetime.now(timezone.utc)}
+            , upsert=True
+        )
+
+    def write_predictions(self, ids:list, future:Future, model_version:str)->None:
+        """
+        Description:
+            This function waits for a scored chunk and upserts its predictions \
+            with one unordered bulk write.
+        """
+        y_score, threshold = future.result()
+        scored_at = datetime.now(timezone.utc)
+        requests = [UpdateOne({"_id":_id}, {"$set":{
+            "prediction":self.label_mapping[int(score>=threshold)], "probability":score
+            , "model_version":model_version, "scored_at":scored_at
+        }}, upsert=True) for _id, score in zip(ids, y_score)]
+        self.prediction_collection.bulk_write(requests, ordered=False)
+
+    def run(self, reset:bool=False)->BatchScoringArtifact:
+        """
+        Description:
+            This function scores every record after the checkpoint and moves the \
+            checkpoint forward chunk by chunk.
+
+        Params:
+        ----------
+        reset: bool
+            ignore the checkpoint and score the collection from the start
+
+        Returns: BatchScoringArtifact
+        """
+        try:
+            start = time.perf_counter()
+            current = self.model_registry.get_current()
+            if current is None:
+                raise Exception("There is no registered model to score [{0}] with.".format(self.collection_name))
+            checkpoint = None if reset else self.read_checkpoint()
+            resumed_after_id = None if checkpoint is None else checkpoint["last_id"]
+            total_rows = 0 if checkpoint is None else checkpoint["rows_scored"]
+            logging.info("Batch scoring [{0}] with model version [{1}] after _id [{2}].".format(
+                self.collection_name, current["version"], resumed_after_id
+            ))
+
+            chunks = SensorData.iter_record_chunks(
+                collection=self.source_collection, columns=self.feature_columns
+                , chunk_size=self.chunk_size, after_id=resumed_after_id
+            )
+            last_id, rows_scored, chunks_scored = resumed_after_id, 0, 0
+            # chunks are written in read order, so the checkpoint never passes an unwritten chunk
+            pending = collections.deque()
+            executor = ProcessPoolExecutor(
+                max_workers=self.max_workers
+                , mp_context=multiprocessing.get_context(BATCH_SCORING_START_METHOD)
+                , initializer=init_scoring_worker
+                , initargs=(current["model_path"], max(1, MODEL_INFERENCE_NTHREAD//self.max_workers))
+            )
+            try:
+                for records in itertools.chain(chunks, [None]):
+                    if records is not None:
+                        ids = [record["_id"] for record in records]
+                        pending.append((ids, executor.submit(score_records, records, self.feature_columns)))
+                    # keep every worker busy plus one chunk queued, drain once the cursor is exhausted
+                    while pending and (records is None or len(pending)>self.max_workers):
+                        ids, future = pending.popleft()
+                        self.write_predictions(ids=ids, future=future, model_version=current["version"])
+                        last_id = ids[-1]
+                        rows_scored += len(ids)
+                        chunks_scored += 1
+                        self.write_checkpoint(last_id=last_id, model_version=current["version"]
+                                             , rows_scored=total_rows+rows_scored)
+            finally:
+                executor.shutdown(wait=True, cancel_futures=True)
+
+            elapsed = time.perf_counter()-start
+            batch_scoring_artifact = BatchScoringArtifact(
+                collection_name=self.collection_name
+                , prediction_collection_name=getattr(self.prediction_collection, "name", PREDICTION_COLLECTION_NAME)
+                , model_version=current["version"]
+                , resumed_after_id=None if resumed_after_id is None else str(resumed_after_id)
+                , last_id=None if last_id is None else str(last_id)
+                , rows_scored=rows_scored
+                , chunks_scored=chunks_scored
+                , elapsed_seconds=elapsed
+                , rows_per_second=rows_scored/elapsed if elapsed>0 else 0.0
+            )
+            logging.info("Batch scoring artifact: [{0}]".format(batch_scoring_artifact))
+            return batch_scoring_artifact
+        except Exception as e:
+            logging.error(str(SensorException(error_message=e)))
+            raise SensorException(error_message=e)
+
+
+if __name__=="__main__":
+    parser = argparse.ArgumentParser(description="Score a mongoDB collection with the champion model.")
+    parser.add_argument("--collection", default=COLLECTION_NAME)
+    parser.add_argument("--chunk-size", type=int, default=BATCH_SCORING_CHUNK_SIZE)
+    parser.add_argument("--workers", type=int, default=BATCH_SCORING_MAX_WORKERS)
+    parser.add_argument("--reset", action="store_true", help="ignore the checkpoint and rescore everything")
+    args = parser.parse_args()
+    print(BatchScoring(collection_name=args.collection, chunk_size=args.chunk_size
+                       , max_workers=args.workers).run(reset=args.reset))
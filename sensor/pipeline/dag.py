@@ -0,0 +1,163 @@
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from sensor.logger import logging
+from sensor.exceptions import SensorException
+
+DAG_EXECUTOR_TYPES:dict = {"thread":ThreadPoolExecutor, "process":ProcessPoolExecutor}
+
+
+@dataclass
+class Stage:
+    """
+    Description:
+        A pipeline stage: fn is called with one keyword argument per entry of \
+        inputs, each bound to the artifact of the named upstream stage.
+
+    Params:
+        name: stage name, also the key of its artifact
+        fn: stage callable
+        inputs: keyword argument name -> upstream stage name
+        output: artifact type the stage must return, None skips the check
+        after: upstream stages that must complete first without passing an artifact
+        condition: called with the artifacts so far, False skips the stage and its dependents
+    """
+    name:str
+    fn:Callable
+    inputs:Dict[str, str] = field(default_factory=dict)
+    output:Optional[type] = None
+    after:Tuple[str, ...] = ()
+    condition:Optional[Callable[[dict], bool]] = None
+
+    @property
+    def dependencies(self,)->List[str]:
+        return list(dict.fromkeys(list(self.inputs.values())+list(self.after)))
+
+
+class DAGExecutor:
+    """
+    Description:
+        This class runs a DAG of stages on a thread or process pool. A stage is \
+        submitted once all of its dependencies completed, in declaration order, \
+        and at most max_workers stages run at a time. The first failure stops \
+        new submissions; stages already running are awaited and the failure is \
+        raised, so a failed run never starts a stage downstream of it.
+
+    Params:
+        stages: pipeline stages
+        max_workers: concurrency limit
+        executor_type: thread or process, process needs picklable stage callables
+        on_stage_start: called with the stage name when it is submitted
+        on_stage_end: called with the stage name and its status: completed, failed or skipped
+    """
+    def __init__(self, stages:List[Stage], max_workers:int=1, executor_type:str="thread"
+                , on_stage_start:Optional[Callable[[str], None]]=None
+                , on_stage_end:Optional[Callable[[str, str], None]]=None)->None:
+        try:
+            if executor_type not in DAG_EXECUTOR_TYPES:
+                raise Exception("Unknown executor type [{0}], expected one of {1}.".format(
+                    executor_type, tuple(DAG_EXECUTOR_TYPES)
+                ))
+            self.stages = {stage.name:stage for stage in stages}
+            if len(self.stages)!=len(stages):
+                raise Exception("Stage names must be unique.")
+            self.max_workers = max(1, max_workers)
+            self.executor_type = executor_type
+            self.on_stage_start = on_stage_start
+            self.on_stage_end = on_stage_end
+            self.order = self.get_topological_order()
+        except Exception as e:
+            logging.error(str(SensorException(error_message=e)))
+            raise SensorException(error_message=e)
+
+    def get_topological_order(self,)->List[str]:
+        """
+        Description: This function checks the DAG and gives its stages in a \
+            dependency respecting order, ties kept in declaration order.
+        """
+        for stage in self.stages.values():
+            unknown = [name for name in stage.dependencies if name not in self.stages]
+            if unknown:
+                raise Exception("Stage [{0}] depends on unknown stages {1}.".format(stage.name, unknown))
+        order, placed = list(), set()
+        while len(order)<len(self.stages):
+            ready = [name for name, stage in self.stages.items()
+                     if name not in placed and all(dependency in placed for dependency in stage.dependencies)]
+            if not ready:
+                raise Exception("Stages {0} form a dependency cycle.".format(
+                    [name for name in self.stages if name not in placed]
+                ))
+            order.extend(ready)
+            placed.update(ready)
+        return order
+
+    def _notify_end(self, name:str, status:str)->None:
+        if self.on_stage_end is not None:
+            self.on_stage_end(name, status)
+
+    def run(self,)->Dict[str, Any]:
+        """
+        Description:
+            This function runs the stages and gives their artifacts.
+
+        Returns: artifacts of the completed stages by stage name
+        """
+        artifacts:Dict[str, Any] = dict()
+        skipped, running = set(), dict()
+        pending = list(self.order)
+        failure:Optional[Tuple[str, BaseException]] = None
+        start = time.perf_counter()
+        executor = DAG_EXECUTOR_TYPES[self.executor_type](max_workers=self.max_workers)
+        try:
+            while True:
+                # submit every stage whose dependencies are settled, while a worker is free
+                for name in list(pending):
+                    if failure is not None or len(running)>=self.max_workers:
+                        break
+                    stage = self.stages[name]
+                    if any(dependency not in artifacts and dependency not in skipped
+                           for dependency in stage.dependencies):
+                        continue
+                    pending.remove(name)
+                    if (any(dependency in skipped for dependency in stage.dependencies)
+                            or (stage.condition is not None and not stage.condition(artifacts))):
+                        skipped.add(name)
+                        logging.info("Stage [{0}] skipped.".format(name))
+                        self._notify_end(name=name, status="skipped")
+                        continue
+                    kwargs = {argument:artifacts[upstream] for argument, upstream in stage.inputs.items()}
+                    if self.on_stage_start is not None:
+                        self.on_stage_start(name)
+                    running[executor.submit(stage.fn, **kwargs)] = name
+                # stages are visited in topological order, so a skip has settled its dependents already
+                if not running:
+                    break
+
+                done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        artifact = future.result()
+                        output = self.stages[name].output
+                        if output is not None and not isinstance(artifact, output):
+                            raise Exception("Stage [{0}] returned [{1}], expected [{2}].".format(
+                                name, type(artifact).__name__, output.__name__
+                            ))
+                    except BaseException as e:
+                        self._notify_end(name=name, status="failed")
+                        if failure is None:
+                            failure = (name, e)
+                        continue
+                    artifacts[name] = artifact
+                    self._notify_end(name=name, status="completed")
+        finally:
+            executor.shutdown(wait=True)
+
+        if failure is not None:
+            logging.error("Stage [{0}] failed, [{1}] stages not started.".format(failure[0], len(pending)))
+            raise failure[1]
+        logging.info("DAG of [{0}] stages finished in [{1:.2f}] seconds, [{2}] skipped.".format(
+            len(self.stages), time.perf_counter()-start, len(skipped)
+        ))
+        return {name:artifacts[name] for name in self.order if name in artifacts}
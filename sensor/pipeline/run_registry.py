@@ -0,0 +1,297 @@
+import os
+import json
+import time
+import uuid
+import socket
+import threading
+from typing import List, Optional, Tuple
+from sensor.logger import logging
+from sensor.exceptions import SensorException
+from sensor.utils.file_lock import FileLock
+from sensor.constant.application import (TRAINING_RUN_DIR, TRAINING_RUN_REGISTRY_NAME, TRAINING_RUN_REGISTRY_LOCK_NAME
+                                        , TRAINING_RUN_LOCK_NAME, TRAINING_RUN_LEASE_SECONDS, TRAINING_RUN_HISTORY)
+
+TRAINING_RUN_FINISHED:tuple = ("succeeded", "failed", "abandoned")
+
+
+class TrainingRunRegistry:
+    """
+    Description:
+        This class coordinates training runs across processes and containers \
+        sharing the artifact volume. The registry file records every run with \
+        its state, start/end times and the stages in progress, plus the one \
+        active run. A trigger claims the active slot under the registry lock, \
+        or coalesces into the run that holds it.
+
+        The active run is alive while its lease is fresh: a queued run's lease \
+        covers the wait for a worker, a running run renews it from a heartbeat \
+        thread. A running run also holds the run lock for its whole duration, \
+        which the OS releases when the process dies, so on the same host a \
+        crashed run is detected at once instead of when its lease expires.
+
+    Params:
+        run_dir: directory of the registry and lock files
+        lease_seconds: seconds an active run stays alive without a heartbeat
+    """
+    def __init__(self, run_dir:str=TRAINING_RUN_DIR, lease_seconds:float=TRAINING_RUN_LEASE_SECONDS)->None:
+        self.run_dir = run_dir
+        self.registry_path = os.path.join(run_dir, TRAINING_RUN_REGISTRY_NAME)
+        self.lock_path = os.path.join(run_dir, TRAINING_RUN_REGISTRY_LOCK_NAME)
+        self.run_lock_path = os.path.join(run_dir, TRAINING_RUN_LOCK_NAME)
+        self.lease_seconds = lease_seconds
+        self._run_lock:Optional[FileLock] = None
+        self._heartbeat:Optional[threading.Thread] = None
+        self._heartbeat_stop = threading.Event()
+
+    def __getstate__(self,)->dict:
+        # the lock and heartbeat belong to the process running the pipeline
+        state = dict(self.__dict__)
+        state.update(_run_lock=None, _heartbeat=None)
+        state.pop("_heartbeat_stop")
+        return state
+
+    def __setstate__(self, state:dict)->None:
+        self.__dict__.update(state, _heartbeat_stop=threading.Event())
+
+    def read_registry(self,)->dict:
+        if not os.path.exists(self.registry_path):
+            return {"active":None, "runs":dict()}
+        with open(self.registry_path, "r") as registry_file:
+            return json.load(registry_file)
+
+    def _write_registry(self, registry:dict)->None:
+        """
+        Description:
+            This function writes the registry to a temporary file and renames it \
+            over the current one. Callers hold the registry lock.
+        """
+        os.makedirs(self.run_dir, exist_ok=True)
+        registry_tmp_path = f"{self.registry_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(registry_tmp_path, "w") as registry_file:
+            json.dump(registry, registry_file, indent=2)
+        os.replace(registry_tmp_path, self.registry_path)
+
+    def _update_registry(self, update)->object:
+        """
+        Description:
+            This function applies `update(registry)` as one locked read-modify-write.
+
+        Returns: what update returned
+        """
+        with FileLock(lock_file_path=self.lock_path):
+            registry = self.read_registry()
+            result = update(registry)
+            self._write_registry(registry=registry)
+            return result
+
+    def _is_alive(self, run:dict)->bool:
+        if run["lease_expires_at"]<time.time():
+            return False
+        if run["state"]!="running" or run["host"]!=socket.gethostname() or self._run_lock is not None:
+            return True
+        # a free run lock on the run's own host means its process is gone
+        probe = FileLock(lock_file_path=self.run_lock_path)
+        if probe.acquire(blocking=False):
+            probe.release()
+            return False
+        return True
+
+    def _get_live_active(self, registry:dict)->Optional[dict]:
+        """
+        Description:
+            This function gives the active run, marking it abandoned first when \
+            its process is gone. Callers hold the registry lock.
+        """
+        if registry["active"] is None:
+            return None
+        run = registry["runs"].get(registry["active"])
+        if run is not None and run["state"] not in TRAINING_RUN_FINISHED and self._is_alive(run=run):
+            return run
+        if run is not None and run["state"] not in TRAINING_RUN_FINISHED:
+            run.update(state="abandoned", finished_at=time.time(), current_stages=list()
+                       , error="The run stopped renewing its lease.")
+            logging.error("Training run [{0}] abandoned.".format(run["run_id"]))
+        registry["active"] = None
+        return None
+
+    def _new_run(self, run_id:str, state:str)->dict:
+        return {
+            "run_id":run_id, "state":state, "submitted_at":time.time(), "started_at":None, "finished_at":None
+            , "current_stages":list(), "host":socket.gethostname(), "pid":os.getpid()
+            , "lease_expires_at":time.time()+self.lease_seconds, "error":None
+        }
+
+    @staticmethod
+    def _trim_history(registry:dict)->None:
+        finished = sorted((run for run in registry["runs"].values() if run["state"] in TRAINING_RUN_FINISHED)
+                          , key=lambda run: run["submitted_at"])
+        for run in finished[:max(0, len(finished)-TRAINING_RUN_HISTORY)]:
+            registry["runs"].pop(run["run_id"])
+
+    def claim(self, run_id:Optional[str]=None)->Tuple[str, bool]:
+        """
+        Description:
+            This function makes a new queued run the active one, unless a live \
+            run is active already.
+
+        Params:
+        ----------
+        run_id: str
+            id of the new run, generated when not given
+
+        Returns: the active run id and whether this call created it
+        """
+        try:
+            run_id = run_id or uuid.uuid4().hex
+
+            def update(registry:dict)->Tuple[str, bool]:
+                active = self._get_live_active(registry=registry)
+                if active is not None:
+                    return active["run_id"], False
+                registry["runs"][run_id] = self._new_run(run_id=run_id, state="queued")
+                registry["active"] = run_id
+                self._trim_history(registry=registry)
+                return run_id, True
+
+            active_id, created = self._update_registry(update=update)
+            if created:
+                logging.info("Training run [{0}] claimed.".format(run_id))
+            else:
+                logging.info("Training trigger coalesced into active run [{0}].".format(active_id))
+            return active_id, created
+        except Exception as e:
+            logging.error(str(SensorException(error_message=e)))
+            raise SensorException(error_message=e)
+
+    def start(self, run_id:Optional[str]=None)->str:
+        """
+        Description:
+            This function takes the run lock and marks the run running, claiming \
+            it first when it was not claimed by a trigger. It fails when another \
+            live run is active.
+
+        Returns: run id
+        """
+        try:
+            run_id = run_id or uuid.uuid4().hex
+            run_lock = FileLock(lock_file_path=self.run_lock_path)
+            if not run_lock.acquire(blocking=False):
+                active = self.get_active()
+                raise Exception("Training run [{0}] is already in progress.".format(
+                    None if active is None else active["run_id"]
+                ))
+            self._run_lock = run_lock
+
+            def update(registry:dict)->None:
+                active = self._get_live_active(registry=registry)
+                if active is not None and active["run_id"]!=run_id:
+                    raise Exception("Training run [{0}] is already in progress.".format(active["run_id"]))
+                run = registry["runs"].setdefault(run_id, self._new_run(run_id=run_id, state="queued"))
+                run.update(state="running", started_at=time.time(), host=socket.gethostname(), pid=os.getpid()
+                           , lease_expires_at=time.time()+self.lease_seconds)
+                registry["active"] = run_id
+                self._trim_history(registry=registry)
+
+            try:
+                self._update_registry(update=update)
+            except Exception:
+                self._run_lock = None
+                run_lock.release()
+                raise
+            self._heartbeat_stop.clear()
+            self._heartbeat = threading.Thread(target=self._renew_lease, args=(run_id,), daemon=True
+                                               , name="training-run-heartbeat")
+            self._heartbeat.start()
+            logging.info("Training run [{0}] started.".format(run_id))
+            return run_id
+        except Exception as e:
+            logging.error(str(SensorException(error_message=e)))
+            raise SensorException(error_message=e)
+
+    def _renew_lease(self, run_id:str)->None:
+        while not self._heartbeat_stop.wait(self.lease_seconds/4):
+            try:
+                self._update_run(run_id=run_id, lease_expires_at=time.time()+self.lease_seconds)
+            except Exception:
+                # a missed beat is retried on the next one, the lease has slack for three
+                pass
+
+    def _update_run(self, run_id:str, **fields)->None:
+        def update(registry:dict)->None:
+            run = registry["runs"].get(run_id)
+            if run is not None and run["state"] not in TRAINING_RUN_FINISHED:
+                run.update(fields)
+
+        self._update_registry(update=update)
+
+    def set_current_stages(self, run_id:str, current_stages:List[str])->None:
+        """
+        Description:
+            This function records the stages the run has in progress.
+        """
+        try:
+            self._update_run(run_id=run_id, current_stages=list(current_stages)
+                             , lease_expires_at=time.time()+self.lease_seconds)
+        except Exception as e:
+            logging.error(str(SensorException(error_message=e)))
+            raise SensorException(error_message=e)
+
+    def finish(self, run_id:str, state:str, error:Optional[str]=None)->None:
+        """
+        Description:
+            This function records the outcome of a run, frees the active slot and \
+            releases the run lock when this process holds it.
+
+        Params:
+        ----------
+        run_id: str
+            run id
+        state: str
+            succeeded, failed or abandoned
+        error: str
+            failure message
+        """
+        try:
+            if self._heartbeat is not None:
+                self._heartbeat_stop.set()
+                self._heartbeat.join()
+                self._heartbeat = None
+
+            def update(registry:dict)->None:
+                run = registry["runs"].get(run_id)
+                if run is not None and run["state"] not in TRAINING_RUN_FINISHED:
+                    run.update(state=state, finished_at=time.time(), current_stages=list(), error=error)
+                if registry["active"]==run_id:
+                    registry["active"] = None
+
+            try:
+                self._update_registry(update=update)
+            finally:
+                if self._run_lock is not None:
+                    self._run_lock.release()
+                    self._run_lock = None
+            logging.info("Training run [{0}] {1}.".format(run_id, state))
+        except Exception as e:
+            logging.error(str(SensorException(error_message=e)))
+            raise SensorException(error_message=e)
+
+    def get_run(self, run_id:str)->Optional[dict]:
+        return self.read_registry()["runs"].get(run_id)
+
+    def get_active(self,)->Optional[dict]:
+        """
+        Description:
+            This function gives the live active run, None when training is idle.
+        """
+        try:
+            return self._update_registry(update=lambda registry: self._get_live_active(registry=registry))
+        except Exception as e:
+            logging.error(str(SensorException(error_message=e)))
+            raise SensorException(error_message=e)
+
+    def list_runs(self,)->List[dict]:
+        """
+        Description:
+            This function lists the recorded runs, oldest first.
+        """
+        return sorted(self.read_registry()["runs"].values(), key=lambda run: run["submitted_at"])
@@ -0,0 +1,222 @@
+import os
+import sys
+import json
+import time
+import shutil
+import hashlib
+import dataclasses
+from typing import Callable, Optional, Tuple
+import numpy as np
+import pandas as pd
+import sklearn
+import xgboost
+from sensor.logger import logging
+from sensor.utils.main_utils import Utils
+from sensor.exceptions import SensorException
+from sensor.constant.training_pipeline import (STAGE_CACHE_DIR, STAGE_CACHE_KEEP_ENTRIES, STAGE_CACHE_VERSION
+                                              , STAGE_CACHE_ENTRY_NAME, SCHEMA_FILE_PATH)
+
+RUN_DIR_PLACEHOLDER:str = "<run_dir>"
+
+
+def map_artifact_strings(artifact:object, fn:Callable[[str], str])->object:
+    """
+    Description: Rebuild a (nested) artifact with fn applied to every string, \
+        in-memory fields excluded from repr are reset to their default.
+    """
+    if dataclasses.is_dataclass(artifact) and not isinstance(artifact, type):
+        return type(artifact)(**{
+            field.name:map_artifact_strings(getattr(artifact, field.name), fn) if field.repr else field.default
+            for field in dataclasses.fields(artifact) if field.init
+        })
+    if isinstance(artifact, list):
+        return [map_artifact_strings(item, fn) for item in artifact]
+    if isinstance(artifact, tuple):
+        return tuple(map_artifact_strings(item, fn) for item in artifact)
+    if isinstance(artifact, dict):
+        return {key:map_artifact_strings(value, fn) for key, value in artifact.items()}
+    if isinstance(artifact, str):
+        return fn(artifact)
+    return artifact
+
+
+class StageCache:
+    """
+    Description:
+        This class memoizes pipeline stages across runs. A stage's key hashes \
+        the content of every input artifact file, its config with the run \
+        directory factored out, the source of the whole sensor package and \
+        the schema, so a change to any module a stage calls invalidates it, the \
+        library versions and STAGE_CACHE_VERSION. A hit hard links the cached \
+        stage directory into the new run and rebuilds the artifact with its \
+        paths moved to the new run, so the files are never copied; stages \
+        only ever write fresh run directories, which keeps shared links safe.
+
+    Params:
+        cache_dir: directory of the cached stage outputs
+        keep_entries: most recently used entries kept per stage
+    """
+    def __init__(self, cache_dir:str=STAGE_CACHE_DIR, keep_entries:int=STAGE_CACHE_KEEP_ENTRIES)->None:
+        self.cache_dir = cache_dir
+        self.keep_entries = keep_entries
+        self._file_fingerprints = dict()
+        self._code_fingerprint:Optional[str] = None
+
+    def get_file_fingerprint(self, file_path:str)->str:
+        stat = os.stat(file_path)
+        # the same input is fingerprinted by every downstream stage, hash it once per run
+        cache_key = (os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns)
+        if cache_key not in self._file_fingerprints:
+            self._file_fingerprints[cache_key] = Utils.get_file_fingerprint(file_path=file_path)
+        return self._file_fingerprints[cache_key]
+
+    def get_input_fingerprint(self, value:object)->object:
+        if dataclasses.is_dataclass(value) and not isinstance(value, type):
+            return {field.name:self.get_input_fingerprint(getattr(value, field.name))
+                    for field in dataclasses.fields(value) if field.repr}
+        if isinstance(value, (list, tuple)):
+            return [self.get_input_fingerprint(item) for item in value]
+        if isinstance(value, dict):
+            return {key:self.get_input_fingerprint(item) for key, item in value.items()}
+        if isinstance(value, str) and os.path.isfile(value):
+            return "sha256:"+self.get_file_fingerprint(file_path=value)
+        if isinstance(value, np.generic):
+            return value.item()
+        return value
+
+    def get_code_fingerprint(self,)->str:
+        """
+        Description:
+            This function hashes every source file of the sensor package and the \
+            schema, once per cache instance.
+
+        Returns: hex digest
+        """
+        if self._code_fingerprint is None:
+            package_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+            source_paths = sorted(
+                os.path.join(dir_path, file_name)
+                for dir_path, _, file_names in os.walk(package_dir) for file_name in file_names
+                if file_name.endswith(".py")
+            )
+            code_hash = hashlib.sha256()
+            for source_path in source_paths+[SCHEMA_FILE_PATH]:
+                if not os.path.exists(source_path):
+                    continue
+                code_hash.update(os.path.relpath(source_path, package_dir).encode())
+                with open(source_path, "rb") as source_file:
+                    code_hash.update(hashlib.sha256(source_file.read()).digest())
+            self._code_fingerprint = code_hash.hexdigest()
+        return self._code_fingerprint
+
+    def get_key(self, stage_name:str, inputs:dict, config:object, run_dir:str)->str:
+        """
+        Description:
+            This function gives the cache key of a stage invocation.
+
+        Params:
+        ----------
+        stage_name: str
+            pipeline stage name
+        inputs: dict
+            input artifacts by keyword argument
+        config: object
+            stage config, its paths are made relative to the run directory
+        run_dir: str
+            artifact directory of the current run
+
+        Returns: hex digest
+        """
+        try:
+            payload = {
+                "stage":stage_name
+                , "version":STAGE_CACHE_VERSION
+                , "inputs":self.get_input_fingerprint(value=inputs)
+                , "config":{name:value.replace(run_dir, RUN_DIR_PLACEHOLDER) if isinstance(value, str) else value
+                            for name, value in sorted(vars(config).items())}
+                , "code":self.get_code_fingerprint()
+                , "libraries":{"python":sys.version.split()[0], "numpy":np.__version__, "pandas":pd.__version__
+                               , "sklearn":sklearn.__version__, "xgboost":xgboost.__version__}
+            }
+            return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+        except Exception as e:
+            logging.error(str(SensorException(error_message=e)))
+            raise SensorException(error_message=e)
+
+    def get_entry_dir(self, stage_name:str, key:str)->str:
+        return os.path.join(self.cache_dir, stage_name, key)
+
+    @staticmethod
+    def link_tree(src_dir:str, dst_dir:str)->None:
+        # hard links cost no space or copy time, fall back to copying across filesystems
+        shutil.copytree(src_dir, dst_dir, copy_function=StageCache.link_file, dirs_exist_ok=True)
+
+    @staticmethod
+    def link_file(src_path:str, dst_path:str)->None:
+        try:
+            os.link(src_path, dst_path)
+        except OSError:
+            shutil.copy2(src_path, dst_path)
+
+    def load(self, stage_name:str, key:str, run_dir:str, stage_dir:str)->Optional[Tuple[object, float]]:
+        """
+        Description:
+            This function links a cached stage directory into the run.
+
+        Returns: the artifact and the elapsed seconds of the cached run, None on a miss
+        """
+        try:
+            entry_dir = self.get_entry_dir(stage_name=stage_name, key=key)
+            entry_path = os.path.join(entry_dir, STAGE_CACHE_ENTRY_NAME)
+            if not os.path.exists(entry_path):
+                return None
+            entry = Utils.load_object(file_path=entry_path)
+            if os.path.isdir(os.path.join(entry_dir, "files")):
+                self.link_tree(src_dir=os.path.join(entry_dir, "files"), dst_dir=stage_dir)
+            artifact = map_artifact_strings(
+                artifact=entry["artifact"], fn=lambda value: value.replace(RUN_DIR_PLACEHOLDER, run_dir)
+            )
+            # the entry's mtime orders eviction, most recently used last
+            os.utime(entry_dir)
+            return artifact, entry["elapsed_seconds"]
+        except Exception as e:
+            logging.error(str(SensorException(error_message=e)))
+            raise SensorException(error_message=e)
+
+    def save(self, stage_name:str, key:str, artifact:object, run_dir:str, stage_dir:str, elapsed_seconds:float)->None:
+        """
+        Description:
+            This function stores a completed stage: its directory as hard links \
+            and its artifact with paths relative to the run directory.
+        """
+        try:
+            entry_dir = self.get_entry_dir(stage_name=stage_name, key=key)
+            tmp_entry_dir = f"{entry_dir}.{os.getpid()}.tmp"
+            shutil.rmtree(tmp_entry_dir, ignore_errors=True)
+            os.makedirs(tmp_entry_dir)
+            if os.path.isdir(stage_dir):
+                self.link_tree(src_dir=stage_dir, dst_dir=os.path.join(tmp_entry_dir, "files"))
+            Utils.save_object(file_path=os.path.join(tmp_entry_dir, STAGE_CACHE_ENTRY_NAME), obj={
+                "artifact":map_artifact_strings(
+                    artifact=artifact, fn=lambda value: value.replace(run_dir, RUN_DIR_PLACEHOLDER)
+                )
+                , "elapsed_seconds":elapsed_seconds
+                , "created_at":time.time()
+            })
+            if os.path.exists(entry_dir):
+                shutil.rmtree(tmp_entry_dir, ignore_errors=True)
+            else:
+                os.replace(tmp_entry_dir, entry_dir)
+            self.evict(stage_name=stage_name)
+        except Exception as e:
+            logging.error(str(SensorException(error_message=e)))
+            raise SensorException(error_message=e)
+
+    def evict(self, stage_name:str)->None:
+        stage_cache_dir = os.path.join(self.cache_dir, stage_name)
+        entry_dirs = [os.path.join(stage_cache_dir, name) for name in os.listdir(stage_cache_dir)
+                      if not name.endswith(".tmp")]
+        entry_dirs.sort(key=os.path.getmtime)
+        for entry_dir in entry_dirs[:max(0, len(entry_dirs)-self.keep_entries)]:
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            logging.info("Evicted stage cache entry [{0}].".format(entry_dir))
@@ -0,0 +1,232 @@
+import os
+import json
+import time
+import uuid
+import threading
+import multiprocessing
+from typing import List, Optional
+from concurrent.futures import Future, ProcessPoolExecutor
+from sensor.logger import logging
+from sensor.utils.main_utils import Utils
+from sensor.exceptions import SensorException
+from sensor.telemetry import REGISTRY
+from sensor.pipeline.run_registry import TrainingRunRegistry
+from sensor.constant.application import TRAINING_JOB_DIR, TRAINING_JOB_MAX_WORKERS, TRAINING_JOB_START_METHOD
+
+TRAINING_JOB_STAGES:tuple = ("data_ingestion", "data_validation", "data_transformation", "model_trainer"
+                            , "model_evaluation", "model_pusher", "artifact_retention")
+TRAINING_JOB_FINISHED:tuple = ("succeeded", "failed")
+
+
+class TrainingJobStore:
+    """
+    Description:
+        This class keeps one JSON record per training job. The worker process \
+        writes progress into it and the web process reads it, every write is \
+        a rename of a complete file so a reader never sees a partial record.
+
+    Params:
+        job_dir: directory of the job records
+    """
+    def __init__(self, job_dir:str=TRAINING_JOB_DIR)->None:
+        self.job_dir = job_dir
+
+    def get_job_path(self, job_id:str)->str:
+        return os.path.join(self.job_dir, f"{job_id}.json")
+
+    def write(self, job:dict)->None:
+        os.makedirs(self.job_dir, exist_ok=True)
+        job_path = self.get_job_path(job_id=job["job_id"])
+        tmp_job_path = f"{job_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_job_path, "w") as job_file:
+            json.dump(job, job_file, indent=2, default=str)
+        os.replace(tmp_job_path, job_path)
+
+    def read(self, job_id:str)->Optional[dict]:
+        job_path = self.get_job_path(job_id=job_id)
+        if not os.path.exists(job_path):
+            return None
+        with open(job_path, "r") as job_file:
+            return json.load(job_file)
+
+    def list_jobs(self,)->List[dict]:
+        if not os.path.isdir(self.job_dir):
+            return list()
+        jobs = [self.read(job_id=file_name[:-len(".json")]) for file_name in os.listdir(self.job_dir)
+                if file_name.endswith(".json")]
+        return sorted([job for job in jobs if job is not None], key=lambda job: job["submitted_at"])
+
+
+def get_job_progress(job:dict)->dict:
+    """
+    Description: Summarize a job record as its status, current stage, \
+        completed fraction and per-stage timings.
+    """
+    completed = [stage for stage, timing in job["stages"].items() if timing["status"]=="completed"]
+    return {
+        "job_id":job["job_id"]
+        , "status":job["status"]
+        , "current_stage":job["current_stage"]
+        , "progress":1.0 if job["status"]=="succeeded" else len(completed)/len(TRAINING_JOB_STAGES)
+        , "stages":job["stages"]
+        , "submitted_at":job["submitted_at"]
+        , "started_at":job["started_at"]
+        , "finished_at":job["finished_at"]
+        , "error":job["error"]
+        , "stage_cache":job.get("stage_cache")
+    }
+
+
+def run_training_job(job_id:str, job_dir:str, force_stages:tuple=())->dict:
+    """
+    Description:
+        This function runs the training pipeline in a worker process and keeps \
+        the job record up to date after every stage.
+
+    Returns: the finished job record with the worker's metrics snapshot
+    """
+    # imported in the worker, the web process never loads the training stack
+    from sensor.pipeline.training_pipeline import TrainingPipeline
+
+    # pool workers are reused, the snapshot handed back must only cover this job
+    REGISTRY.reset()
+    job_store = TrainingJobStore(job_dir=job_dir)
+    job = job_store.read(job_id=job_id)
+    job.update(status="running", started_at=time.time(), worker_pid=os.getpid())
+    job_store.write(job=job)
+
+    def on_progress(stage_name:str, timing:dict)->None:
+        job["current_stage"] = stage_name
+        job["stages"][stage_name] = dict(timing)
+        job_store.write(job=job)
+
+    try:
+        train_pipeline = TrainingPipeline(progress_callback=on_progress, force_stages=force_stages, run_id=job_id)
+        run_artifacts = train_pipeline.run_pipeline()
+        job["stage_cache"] = train_pipeline.stage_cache_summary
+        job["artifact_store"] = train_pipeline.artifact_store_stats
+        job["result"] = {stage:Utils.artifact_to_dict(artifact) for stage, artifact in run_artifacts.items()}
+        job["status"] = "succeeded"
+    except Exception as e:
+        # frees the claim of a run that failed before it started, a finished run is left as is
+        TrainingRunRegistry().finish(run_id=job_id, state="failed", error=str(e))
+        job["error"] = str(e)
+        job["status"] = "failed"
+    job["current_stage"] = None
+    job["finished_at"] = time.time()
+    job_store.write(job=job)
+    return {**job, "metrics":REGISTRY.snapshot()}
+
+
+class TrainingJobManager:
+    """
+    Description:
+        This class runs training jobs on a background process pool, so the web \
+        worker only records the job and returns its id. Jobs are runs of the \
+        training run registry: a trigger while a run is queued or running, in \
+        this process or any other sharing the artifact volume, returns that run \
+        instead of starting another one.
+
+    Params:
+        job_dir: directory of the job records
+        max_workers: training processes
+    """
+    instance = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, job_dir:str=TRAINING_JOB_DIR, max_workers:int=TRAINING_JOB_MAX_WORKERS)->None:
+        try:
+            self.job_store = TrainingJobStore(job_dir=job_dir)
+            self.max_workers = max_workers
+            self.run_registry = TrainingRunRegistry()
+            self._executor = None
+        except Exception as e:
+            logging.error(str(SensorException(error_message=e)))
+            raise SensorException(error_message=e)
+
+    @classmethod
+    def get_instance(cls,)->"TrainingJobManager":
+        """
+        Description:
+            This function gives the process-wide job manager, creating it on first use.
+        """
+        if cls.instance is None:
+            with cls._instance_lock:
+                if cls.instance is None:
+                    cls.instance = cls()
+        return cls.instance
+
+    def _get_executor(self,)->ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn, the web process runs threads that must not be forked mid-lock
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers
+                , mp_context=multiprocessing.get_context(TRAINING_JOB_START_METHOD)
+            )
+        return self._executor
+
+    def _on_done(self, job_id:str, future:Future)->None:
+        error = future.exception() if not future.cancelled() else Exception("Job cancelled.")
+        if error is None:
+            # training ran in the worker, fold its metrics into the serving process
+            REGISTRY.merge(snapshot=future.result()["metrics"])
+            return
+        # the worker died before it could record the outcome
+        job = self.job_store.read(job_id=job_id)
+        if job is not None and job["status"] not in TRAINING_JOB_FINISHED:
+            job.update(status="failed", error=str(error), finished_at=time.time(), current_stage=None)
+            self.job_store.write(job=job)
+        self.run_registry.finish(run_id=job_id, state="failed", error=str(error))
+        if not future.cancelled():
+            logging.error("Training job [{0}] failed: [{1}].".format(job_id, error))
+
+    def submit(self, force_stages:tuple=())->dict:
+        """
+        Description:
+            This function queues a training job, or gives the job already in flight.
+
+        Params:
+        ----------
+        force_stages: tuple
+            cached stages the job recomputes even on a cache hit
+
+        Returns: dict of job_id and whether it was created by this call
+        """
+        try:
+            job_id, created = self.run_registry.claim(run_id=uuid.uuid4().hex)
+            if not created:
+                return {"job_id":job_id, "created":False}
+            self.job_store.write(job={
+                "job_id":job_id, "status":"queued", "submitted_at":time.time(), "started_at":None
+                , "finished_at":None, "current_stage":None, "stages":dict(), "result":None, "error":None
+                , "force_stages":list(force_stages), "stage_cache":None
+            })
+            try:
+                future = self._get_executor().submit(
+                    run_training_job, job_id, self.job_store.job_dir, tuple(force_stages)
+                )
+            except Exception as e:
+                self.run_registry.finish(run_id=job_id, state="failed", error=str(e))
+                raise
+            future.add_done_callback(lambda future: self._on_done(job_id=job_id, future=future))
+            logging.info("Training job [{0}] submitted.".format(job_id))
+            return {"job_id":job_id, "created":True}
+        except Exception as e:
+            logging.error(str(SensorException(error_message=e)))
+            raise SensorException(error_message=e)
+
+    def get_job(self, job_id:str)->Optional[dict]:
+        return self.job_store.read(job_id=job_id)
+
+    def list_jobs(self,)->List[dict]:
+        return self.job_store.list_jobs()
+
+    def shutdown(self,)->None:
+        """
+        Description:
+            This function cancels queued jobs and stops the pool without waiting \
+            for a running job.
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -1,31 +1,256 @@
+# standard modules
+import os
+import time
+import json
+import argparse
+import functools
+from typing import Callable, Iterable, List, Optional
 # user-defined modules
 from sensor.logger import logging
 from sensor.exceptions import SensorException
 from sensor.entity.config_entity import (TrainingPipelineConfig, DataIngestionConfig, DataValidationConfig, DataTransformationConfig
-                                        , ModelTrainerConfig, ModelEvaluationConfig, ModelPusherConfig)
+                                        , ModelTrainerConfig, ModelEvaluationConfig, ModelPusherConfig, ArtifactRetentionConfig)
 from sensor.entity.artifact_entity import (DataIngestionArtifact, DataValidationArtifact, DataTransformationArtifact
-                                        , ModelTrainerArtifact, ModelEvaluationArtifact, ModelPusherArtifact)
+                                        , ModelTrainerArtifact, ModelEvaluationArtifact, ModelPusherArtifact
+                                        , ArtifactRetentionArtifact)
 from sensor.components.data_ingestion import DataIngestion
 from sensor.components.data_validation import DataValidation
 from sensor.components.data_transformation import DataTransformation
 from sensor.components.model_trainer import ModelTrainer
 from sensor.components.model_evaluation import ModelEvaluation
 from sensor.components.model_pusher import ModelPusher
-from sensor.constant.training_pipeline import SAVED_MODEL_DIR
+from sensor.components.artifact_retention import ArtifactRetention
+from sensor.constant.training_pipeline import (SAVED_MODEL_DIR, TRAINING_PIPELINE_MAX_WORKERS, TRAINING_PIPELINE_EXECUTOR
+                                              , STAGE_CACHE_ENABLED, STAGE_CACHE_RECORD_DIR_NAME, STAGE_CACHE_SUMMARY_FILE_NAME)
+from sensor.utils.main_utils import Utils
+from sensor.utils.artifact_store import ArtifactStore
 from sensor.data_access.sensor_data import SensorData
+from sensor.pipeline.dag import DAGExecutor, Stage
+from sensor.pipeline.stage_cache import StageCache
+from sensor.pipeline.run_registry import TrainingRunRegistry
+from sensor.telemetry import TRAINING_RUNS, TRAINING_STAGE_SECONDS
 
 class TrainingPipeline:
-    is_pipeline_running=False
 
-    def __init__(self) -> None:
+    def __init__(self, progress_callback:Optional[Callable[[str, dict], None]]=None
+                , max_workers:int=TRAINING_PIPELINE_MAX_WORKERS, force_stages:Iterable[str]=()
+                , use_stage_cache:bool=STAGE_CACHE_ENABLED, run_id:Optional[str]=None
+                , dry_run:Optional[bool]=None) -> None:
+        """
+        Params:
+            - progress_callback: called with the stage name and its timing \
+                record whenever a stage starts, completes, fails or is skipped.
+            - max_workers: stages run at the same time.
+            - force_stages: cached stages to recompute even on a cache hit.
+            - use_stage_cache: False recomputes every stage and caches nothing.
+            - run_id: run claimed in the run registry by the trigger, a new run \
+                is registered when not given.
+            - dry_run: True only reports what artifact retention would remove, \
+                the configured default when not given.
+        """
         self.training_pipeline_config = TrainingPipelineConfig()
-        self.sensor_data = SensorData()
-    
+        # connected on first use, so a rejected trigger never opens a connection
+        self.sensor_data = None
+        self.progress_callback = progress_callback
+        self.max_workers = max_workers
+        self.stage_timings = dict()
+        self.force_stages = set(force_stages)
+        self.stage_cache = StageCache() if use_stage_cache else None
+        self.stage_cache_summary = dict()
+        self.run_id = run_id
+        self.dry_run = dry_run
+        self.run_registry = TrainingRunRegistry()
+        # datasets and fitted objects handed from stage to stage without re-parsing their files
+        self.artifact_store = ArtifactStore()
+        self.artifact_store_stats = dict()
+
+    def __getstate__(self,)->dict:
+        # stages sent to a process pool carry the pipeline, not its callback or mongo connection
+        state = dict(self.__dict__)
+        state.update(progress_callback=None, sensor_data=None)
+        return state
+
+    def start_stage_timing(self, stage_name:str)->None:
+        timing = {"status":"running", "started_at":time.time(), "elapsed_seconds":None
+                  , "_start":time.perf_counter()}
+        self.stage_timings[stage_name] = timing
+        self.report_current_stages()
+        if self.progress_callback is not None:
+            self.progress_callback(stage_name, self.get_stage_timing(stage_name=stage_name))
+
+    def end_stage_timing(self, stage_name:str, status:str)->None:
+        timing = self.stage_timings.setdefault(stage_name, {"started_at":None, "_start":None})
+        timing["status"] = status
+        timing["elapsed_seconds"] = None if timing["_start"] is None else time.perf_counter()-timing["_start"]
+        if timing["elapsed_seconds"] is not None:
+            TRAINING_STAGE_SECONDS.observe(timing["elapsed_seconds"], stage=stage_name, status=status)
+            logging.info("Stage [{0}] {1} in [{2:.2f}] seconds.".format(stage_name, status, timing["elapsed_seconds"]))
+        self.report_current_stages()
+        if self.progress_callback is not None:
+            self.progress_callback(stage_name, self.get_stage_timing(stage_name=stage_name))
+
+    def report_current_stages(self,)->None:
+        if self.run_id is not None:
+            self.run_registry.set_current_stages(run_id=self.run_id, current_stages=[
+                stage_name for stage_name, timing in self.stage_timings.items() if timing["status"]=="running"
+            ])
+
+    def get_stage_timing(self, stage_name:str)->dict:
+        return {key:value for key, value in self.stage_timings[stage_name].items() if not key.startswith("_")}
+
+    def run_stage(self, stage_name:str, stage:Callable, **kwargs):
+        """
+        Description: Run a pipeline stage in the calling thread, recording its wall time.
+        """
+        self.start_stage_timing(stage_name=stage_name)
+        try:
+            artifact = stage(**kwargs)
+        except Exception:
+            self.end_stage_timing(stage_name=stage_name, status="failed")
+            raise
+        self.end_stage_timing(stage_name=stage_name, status="completed")
+        return artifact
+
+    def get_stage_cache_record_path(self, stage_name:str)->str:
+        return os.path.join(
+            self.training_pipeline_config.artifact_dir, STAGE_CACHE_RECORD_DIR_NAME, f"{stage_name}.json"
+        )
+
+    def run_cached_stage(self, stage_name:str, stage:Callable, config:object, stage_dir:str, **kwargs):
+        """
+        Description:
+            This function runs a stage through the stage cache: a hit links the \
+            cached outputs into the run instead of running the stage, a miss or \
+            a forced stage runs it and caches the outputs. The outcome is recorded \
+            in the run directory, so stages on a process pool report it too.
+        """
+        try:
+            if self.stage_cache is None:
+                return stage(**kwargs)
+            run_dir = self.training_pipeline_config.artifact_dir
+            key = self.stage_cache.get_key(
+                stage_name=stage_name, inputs=kwargs, config=config, run_dir=run_dir
+            )
+            record = {"key":key, "status":"forced" if stage_name in self.force_stages else "miss"}
+            cached = None
+            if stage_name not in self.force_stages:
+                cached = self.stage_cache.load(stage_name=stage_name, key=key, run_dir=run_dir, stage_dir=stage_dir)
+            if cached is not None:
+                artifact, saved_seconds = cached
+                record.update(status="hit", saved_seconds=saved_seconds)
+                logging.info("Stage [{0}] cache hit [{1}], saved [{2:.2f}] seconds.".format(
+                    stage_name, key[:12], saved_seconds
+                ))
+            else:
+                start = time.perf_counter()
+                artifact = stage(**kwargs)
+                record["elapsed_seconds"] = time.perf_counter()-start
+                self.stage_cache.save(
+                    stage_name=stage_name, key=key, artifact=artifact, run_dir=run_dir, stage_dir=stage_dir
+                    , elapsed_seconds=record["elapsed_seconds"]
+                )
+            record_path = self.get_stage_cache_record_path(stage_name=stage_name)
+            os.makedirs(os.path.dirname(record_path), exist_ok=True)
+            with open(record_path, "w") as record_file:
+                json.dump(record, record_file)
+            return artifact
+        except Exception as e:
+            logging.error(str(SensorException(e)))
+            raise SensorException(error_message=e)
+
+    def get_stage_cache_summary(self,)->dict:
+        """
+        Description:
+            This function collects the cache outcome of every cached stage of \
+            the run and writes it next to the run artifacts.
+
+        Returns: dict of stage outcomes and the total seconds saved
+        """
+        stages = dict()
+        for stage_name in self.get_cached_stage_names():
+            record_path = self.get_stage_cache_record_path(stage_name=stage_name)
+            if os.path.exists(record_path):
+                with open(record_path, "r") as record_file:
+                    stages[stage_name] = json.load(record_file)
+        summary = {
+            "enabled":self.stage_cache is not None
+            , "stages":stages
+            , "hits":sum(record["status"]=="hit" for record in stages.values())
+            , "saved_seconds":sum(record.get("saved_seconds", 0.0) for record in stages.values())
+        }
+        Utils.write_yaml_file(
+            file_path=os.path.join(self.training_pipeline_config.artifact_dir, STAGE_CACHE_SUMMARY_FILE_NAME)
+            , content=summary, replace=True
+        )
+        logging.info("Stage cache: [{0}] hits of [{1}] stages, [{2:.2f}] seconds saved.".format(
+            summary["hits"], len(stages), summary["saved_seconds"]
+        ))
+        return summary
+
+    def close_artifact_store(self,)->None:
+        """
+        Description:
+            This function writes out the run's pending artifacts, frees the ones \
+            held in memory and keeps the loads they saved.
+        """
+        self.artifact_store_stats = self.artifact_store.get_stats()
+        self.artifact_store.close()
+        logging.info("Artifact store: [{0}] loads served from memory, [{1}] parsed, [{2:.1f}] MB not re-read.".format(
+            self.artifact_store_stats["hits"], self.artifact_store_stats["misses"]
+            , self.artifact_store_stats["bytes_avoided"]/2**20
+        ))
+
+    def get_cached_stage(self, stage_name:str, stage:Callable, config:object, stage_dir:str)->Callable:
+        return functools.partial(self.run_cached_stage, stage_name, stage, config, stage_dir)
+
+    @staticmethod
+    def get_cached_stage_names()->tuple:
+        # ingestion reads mongo, evaluation the current champion and pushing has side effects
+        return ("data_validation", "data_transformation", "model_trainer")
+
+    def get_stages(self,)->List[Stage]:
+        """
+        Description:
+            This function declares the training stages as a DAG. Validation and \
+            transformation both only read the ingested dataset, so they run side \
+            by side; the trainer still waits for validation, so a failed check \
+            never produces a model.
+        """
+        data_validation_config = DataValidationConfig(training_pipeline_config=self.training_pipeline_config)
+        data_transformation_config = DataTransformationConfig(training_pipeline_config=self.training_pipeline_config)
+        model_trainer_config = ModelTrainerConfig(training_pipleine_config=self.training_pipeline_config)
+        return [
+            Stage(name="data_ingestion", fn=self.start_data_ingestion, output=DataIngestionArtifact)
+            , Stage(name="data_validation", fn=self.get_cached_stage(
+                        "data_validation", self.start_data_validation, data_validation_config
+                        , data_validation_config.data_validation_dir)
+                    , inputs={"data_ingestion_artifact":"data_ingestion"}, output=DataValidationArtifact)
+            , Stage(name="data_transformation", fn=self.get_cached_stage(
+                        "data_transformation", self.start_data_transformation, data_transformation_config
+                        , data_transformation_config.data_transformation_dir)
+                    , inputs={"data_ingestion_artifact":"data_ingestion"}, output=DataTransformationArtifact)
+            , Stage(name="model_trainer", fn=self.get_cached_stage(
+                        "model_trainer", self.start_model_trainer, model_trainer_config
+                        , model_trainer_config.model_trainer_dir)
+                    , inputs={"data_transformation_artifact":"data_transformation"}
+                    , output=ModelTrainerArtifact, after=("data_validation",))
+            , Stage(name="model_evaluation", fn=self.start_model_evaluation
+                    , inputs={"data_ingestion_artifact":"data_ingestion", "model_trainer_artifact":"model_trainer"}
+                    , output=ModelEvaluationArtifact)
+            , Stage(name="model_pusher", fn=self.start_model_pusher
+                    , inputs={"model_evaluation_artifact":"model_evaluation"}, output=ModelPusherArtifact
+                    , condition=lambda artifacts: artifacts["model_evaluation"].is_model_accepted)
+        ]
+
     def start_data_ingestion(self,)->DataIngestionArtifact:
         try:
+            if self.sensor_data is None:
+                self.sensor_data = SensorData()
             data_ingestion_config = DataIngestionConfig(training_pipeline_config=self.training_pipeline_config)
-            data_ingestion = DataIngestion(data_ingestion_config=data_ingestion_config, sensor_data=self.sensor_data)
+            data_ingestion = DataIngestion(data_ingestion_config=data_ingestion_config, sensor_data=self.sensor_data
+                                           , artifact_store=self.artifact_store)
             data_ingestion_artifact =data_ingestion.initiate_data_ingestion()
+            self.artifact_store.flush(prefix=data_ingestion_config.data_ingestion_dir)
             return data_ingestion_artifact
         except Exception as e:
             logging.error(str(SensorException(e)))
@@ -40,6 +265,7 @@ class TrainingPipeline:
             data_validation = DataValidation(
                 data_ingestion_artifact=data_ingestion_artifact
                 , data_validation_config=data_validation_config
+                , artifact_store=self.artifact_store
             )
             data_validation_artifact = data_validation.initiate_data_validation()
 
@@ -57,8 +283,10 @@ class TrainingPipeline:
             data_transformation = DataTransformation(
                 data_ingestion_artifact=data_ingestion_artifact
                 , data_transformation_config=data_transformation_config
+                , artifact_store=self.artifact_store
             )
             data_transformation_artifact = data_transformation.initiate_data_transformation()
+            self.artifact_store.flush(prefix=data_transformation_config.data_transformation_dir)
 
             return data_transformation_artifact
         except Exception as e:
@@ -74,6 +302,7 @@ class TrainingPipeline:
             model_trainer =ModelTrainer(
                 data_transformation_artifact=data_transformation_artifact
                 ,model_trainer_config=model_trainer_config
+                , artifact_store=self.artifact_store
             )
             model_trainer_artifact = model_trainer.initiate_model_trainer()
 
@@ -93,6 +322,7 @@ class TrainingPipeline:
                 data_ingestion_artifact=data_ingestion_artifact
                 , model_evaluation_config=model_evaluation_config
                 , model_trainer_artifact=model_trainer_artifact
+                , artifact_store=self.artifact_store
             )
             model_evaluation_artifact = model_evaluation.initiate_model_evaluation()
 
@@ -117,36 +347,77 @@ class TrainingPipeline:
         except Exception as e:
             logging.error(str(SensorException(e)))
             raise SensorException(error_message=e)
+
+    def start_artifact_retention(self, run_artifacts:dict)->ArtifactRetentionArtifact:
+        try:
+            artifact_retention_config = ArtifactRetentionConfig(
+                training_pipeline_config=self.training_pipeline_config, dry_run=self.dry_run
+            )
+            artifact_retention = ArtifactRetention(
+                artifact_retention_config=artifact_retention_config
+                , run_artifacts=run_artifacts
+            )
+            artifact_retention_artifact = artifact_retention.initiate_artifact_retention()
+
+            return artifact_retention_artifact
+        except Exception as e:
+            logging.error(str(SensorException(e)))
+            raise SensorException(error_message=e)
         
     
-    def run_pipeline(self,):
+    def run_pipeline(self,)->dict:
+        """
+        Description:
+            This function runs every stage of the training pipeline as the active \
+            run of the run registry, it fails when another run is in progress.
+
+        Returns: artifacts of the run by stage name
+        """
+        self.run_id = self.run_registry.start(run_id=self.run_id)
         try:
-            TrainingPipeline.is_pipeline_running=True
+            unknown_stages = self.force_stages.difference(self.get_cached_stage_names())
+            if unknown_stages:
+                raise Exception("Only cached stages {0} can be forced, got {1}.".format(
+                    self.get_cached_stage_names(), sorted(unknown_stages)
+                ))
 
-            data_ingestion_artifact = self.start_data_ingestion()
-            data_validation_artifact = self.start_data_validation(
-                data_ingestion_artifact=data_ingestion_artifact
-            )
-            data_transformation_artifact = self.start_data_transformation(
-                data_ingestion_artifact=data_ingestion_artifact
-            )
-            model_trainer_artifact = self.start_model_trainer(
-                data_transformation_artifact=data_transformation_artifact, 
-            )
-            model_evaluation_artifact = self.start_model_evaluation(
-                data_ingestion_artifact=data_ingestion_artifact
-                , model_trainer_artifact=model_trainer_artifact
-            )
+            run_artifacts = DAGExecutor(
+                stages=self.get_stages(), max_workers=self.max_workers, executor_type=TRAINING_PIPELINE_EXECUTOR
+                , on_stage_start=lambda stage_name: self.start_stage_timing(stage_name=stage_name)
+                , on_stage_end=lambda stage_name, status: self.end_stage_timing(stage_name=stage_name, status=status)
+            ).run()
+            self.stage_cache_summary = self.get_stage_cache_summary()
+            model_evaluation_artifact = run_artifacts["model_evaluation"]
+            # rejected runs are retained too, their manifest records why
+            self.run_stage("artifact_retention", self.start_artifact_retention, run_artifacts=run_artifacts)
 
             if not model_evaluation_artifact.is_model_accepted:
                 raise Exception("Trained model is not better than best model.")
-            model_pusher_artifact  = self.start_model_pusher(
-                model_evaluation_artifact=model_evaluation_artifact
-            )
 
-            TrainingPipeline.is_pipeline_running=False
+            self.run_registry.finish(run_id=self.run_id, state="succeeded")
+            TRAINING_RUNS.inc(status="succeeded")
+            return run_artifacts
 
         except Exception as e:
-            TrainingPipeline.is_pipeline_running=False
+            self.run_registry.finish(run_id=self.run_id, state="failed", error=str(e))
+            TRAINING_RUNS.inc(status="failed")
             logging.error(str(SensorException(e)))
             raise SensorException(error_message=e)
+        finally:
+            self.close_artifact_store()
+
+
+if __name__=="__main__":
+    parser = argparse.ArgumentParser(description="Run the training pipeline.")
+    parser.add_argument("--force", nargs="+", default=(), choices=TrainingPipeline.get_cached_stage_names()
+                        , help="recompute these stages even when they are cached")
+    parser.add_argument("--no-cache", action="store_true", help="recompute every stage and cache nothing")
+    parser.add_argument("--max-workers", type=int, default=TRAINING_PIPELINE_MAX_WORKERS)
+    parser.add_argument("--dry-run", action="store_true", default=None
+                        , help="only report what artifact retention would remove")
+    args = parser.parse_args()
+    train_pipeline = TrainingPipeline(max_workers=args.max_workers, force_stages=args.force
+                                      , use_stage_cache=not args.no_cache, dry_run=args.dry_run)
+    train_pipeline.run_pipeline()
+    print(json.dumps({"stage_cache":train_pipeline.stage_cache_summary
+                      , "artifact_store":train_pipeline.artifact_store_stats}, indent=2))
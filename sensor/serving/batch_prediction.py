@@ -0,0 +1,142 @@
+import itertools
+import numpy as np
+import pandas as pd
+from typing import BinaryIO, Iterator, List, Optional
+from sensor.logger import logging
+from sensor.utils.main_utils import Utils
+from sensor.exceptions import SensorException
+from sensor.ml.model.estimator import TargetValueMapping
+from sensor.serving.model_cache import LoadedModel
+from sensor.telemetry import SERVING_ROWS, SERVING_STAGE_SECONDS
+from sensor.constant.training_pipeline import SCHEMA_FILE_PATH
+from sensor.constant.application import PREDICTION_CHUNK_SIZE, PREDICTION_NA_VALUES
+
+PREDICTION_FILE_FORMATS:tuple = ("csv", "parquet")
+
+
+class BatchPredictor:
+    """
+    Description:
+        This class scores an uploaded CSV or Parquet file chunk by chunk with one \
+        loaded model snapshot and yields the predictions as CSV, so memory is \
+        bounded by the chunk size and not by the file size.
+
+    Params:
+        loaded_model: model snapshot from the model cache
+        chunk_size: rows parsed and scored at a time
+        feature_columns: model input columns, the schema numerical columns by default
+    """
+    def __init__(self, loaded_model:LoadedModel, chunk_size:int=PREDICTION_CHUNK_SIZE
+                , feature_columns:Optional[List[str]]=None)->None:
+        try:
+            self.loaded_model = loaded_model
+            self.chunk_size = chunk_size
+            if feature_columns is None:
+                feature_columns = Utils.read_yaml_file(file_path=SCHEMA_FILE_PATH)["numerical_columns"]
+            self.feature_columns = feature_columns
+            self.label_mapping = TargetValueMapping().reverse_mapping()
+            self.rows_scored = 0
+        except Exception as e:
+            logging.error(str(SensorException(error_message=e)))
+            raise SensorException(error_message=e)
+
+    @staticmethod
+    def get_file_format(file_name:Optional[str], content_type:Optional[str]=None)->str:
+        """
+        Description: Infer the upload format from the file name, then the content type.
+        """
+        file_name = (file_name or "").lower()
+        content_type = (content_type or "").lower()
+        if file_name.endswith(".parquet") or "parquet" in content_type:
+            return "parquet"
+        if file_name.endswith(".csv") or "csv" in content_type or "text/plain" in content_type:
+            return "csv"
+        raise ValueError("Unsupported upload [{0}], expected one of {1}.".format(
+            file_name or content_type, PREDICTION_FILE_FORMATS
+        ))
+
+    def iter_chunks(self, file:BinaryIO, file_format:str)->Iterator[np.array]:
+        """
+        Description:
+            This function parses the file lazily and yields the feature columns \
+            of each chunk as a float64 array.
+        """
+        if file_format=="csv":
+            reader = pd.read_csv(
+                file, chunksize=self.chunk_size, na_values=PREDICTION_NA_VALUES
+                , usecols=lambda column: column in self.feature_columns
+            )
+            for chunk in reader:
+                yield self.get_features(df=chunk)
+        elif file_format=="parquet":
+            # pyarrow is only needed for parquet uploads
+            import pyarrow.parquet as pq
+            parquet_file = pq.ParquetFile(file)
+            missing = set(self.feature_columns)-set(parquet_file.schema_arrow.names)
+            if missing:
+                raise Exception("Missing feature columns: {0}.".format(sorted(missing)))
+            for batch in parquet_file.iter_batches(batch_size=self.chunk_size, columns=self.feature_columns):
+                yield self.get_features(df=batch.to_pandas())
+        else:
+            raise ValueError("Unsupported file format [{0}].".format(file_format))
+
+    def get_features(self, df:pd.DataFrame)->np.array:
+        missing = set(self.feature_columns)-set(df.columns)
+        if missing:
+            raise Exception("Missing feature columns: {0}.".format(sorted(missing)))
+        return df[self.feature_columns].apply(pd.to_numeric, errors="coerce").to_numpy(dtype=np.float64)
+
+    def format_predictions(self, y_score:np.array, offset:int)->bytes:
+        y_pred = (y_score>=self.loaded_model.model.threshold).astype(int)
+        predictions = pd.DataFrame({
+            "row":np.arange(offset, offset+len(y_score))
+            , "prediction":pd.Series(y_pred).map(self.label_mapping)
+            , "probability":np.round(y_score, 6)
+        })
+        return predictions.to_csv(header=False, index=False).encode()
+
+    def iter_predictions(self, file:BinaryIO, file_format:str)->Iterator[bytes]:
+        """
+        Description:
+            This function yields a CSV header and then the predictions of every \
+            chunk. The first chunk is parsed before anything is yielded, so a \
+            malformed upload fails before the response starts.
+
+        Params:
+        ----------
+        file: BinaryIO
+            uploaded file
+        file_format: str
+            csv or parquet
+
+        Returns: iterator of CSV encoded predictions
+        """
+        try:
+            chunks = self.iter_chunks(file=file, file_format=file_format)
+            with SERVING_STAGE_SECONDS.time(endpoint="predict", stage="parse"):
+                first_chunk = next(chunks, None)
+        except Exception as e:
+            logging.error(str(SensorException(error_message=e)))
+            raise SensorException(error_message=e)
+        return self._iter_predictions(first_chunk=first_chunk, chunks=chunks)
+
+    def _iter_predictions(self, first_chunk:Optional[np.array], chunks:Iterator[np.array])->Iterator[bytes]:
+        yield b"row,prediction,probability\n"
+        if first_chunk is None:
+            return
+        chunks = itertools.chain([first_chunk], chunks)
+        while True:
+            with SERVING_STAGE_SECONDS.time(endpoint="predict", stage="parse"):
+                X = next(chunks, None)
+            if X is None:
+                break
+            y_score = self.loaded_model.model.inplace_predict_proba(X)
+            with SERVING_STAGE_SECONDS.time(endpoint="predict", stage="serialize"):
+                predictions = self.format_predictions(y_score=y_score, offset=self.rows_scored)
+            self.rows_scored += len(X)
+            SERVING_ROWS.inc(len(X), endpoint="predict")
+            yield predictions
+        logging.info("Scored [{0}] rows with model version [{1}].".format(
+            self.rows_scored, self.loaded_model.version
+        ))
+
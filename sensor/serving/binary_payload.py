@@ -0,0 +1,107 @@
+import zlib
+import struct
+import numpy as np
+from typing import List
+from sensor.logger import logging
+from sensor.exceptions import SensorException
+
+FEATURE_PAYLOAD_MAGIC:bytes = b"APSF"
+FEATURE_PAYLOAD_FORMAT_VERSION:int = 1
+# magic, format version, column count, row count, schema fingerprint; 16 bytes keeps the floats aligned
+FEATURE_PAYLOAD_HEADER = struct.Struct("<4sHHII")
+FEATURE_PAYLOAD_DTYPE = np.dtype("<f4")
+FEATURE_PAYLOAD_CONTENT_TYPE:str = "application/x-sensor-features"
+ARROW_STREAM_CONTENT_TYPE:str = "application/vnd.apache.arrow.stream"
+
+
+class FeaturePayload:
+    """
+    Description:
+        This class encodes and decodes the binary feature payload: a 16 byte \
+        header followed by the rows as little-endian float32 in schema column \
+        order. The header carries the crc32 of the ordered column names, so a \
+        client built against another column order is rejected instead of \
+        silently scored. Decoding wraps the request body with np.frombuffer, \
+        no per-value parsing happens in Python.
+    """
+    @staticmethod
+    def get_schema_fingerprint(feature_columns:List[str])->int:
+        return zlib.crc32("\n".join(feature_columns).encode())
+
+    @staticmethod
+    def encode(X:np.array, feature_columns:List[str])->bytes:
+        """
+        Description:
+            This function encodes feature rows, ordered as feature_columns.
+
+        Returns: payload bytes
+        """
+        X = np.ascontiguousarray(X, dtype=FEATURE_PAYLOAD_DTYPE)
+        if X.ndim!=2 or X.shape[1]!=len(feature_columns):
+            raise ValueError("Expected rows of [{0}] features, got shape [{1}].".format(len(feature_columns), X.shape))
+        header = FEATURE_PAYLOAD_HEADER.pack(
+            FEATURE_PAYLOAD_MAGIC, FEATURE_PAYLOAD_FORMAT_VERSION, X.shape[1], X.shape[0]
+            , FeaturePayload.get_schema_fingerprint(feature_columns=feature_columns)
+        )
+        return header+X.tobytes()
+
+    @staticmethod
+    def decode(payload:bytes, feature_columns:List[str])->np.array:
+        """
+        Description:
+            This function validates the header against the schema and gives a \
+            read-only float32 view of the rows.
+
+        Params:
+        ----------
+        payload: bytes
+            request body
+        feature_columns: list
+            schema feature columns in model order
+
+        Returns: array of shape (rows, columns) sharing the payload buffer
+        """
+        try:
+            if len(payload)<FEATURE_PAYLOAD_HEADER.size:
+                raise ValueError("Payload is shorter than its [{0}] byte header.".format(FEATURE_PAYLOAD_HEADER.size))
+            magic, format_version, n_columns, n_rows, fingerprint = FEATURE_PAYLOAD_HEADER.unpack_from(payload)
+            if magic!=FEATURE_PAYLOAD_MAGIC:
+                raise ValueError("Not a feature payload, bad magic [{0}].".format(magic))
+            if format_version!=FEATURE_PAYLOAD_FORMAT_VERSION:
+                raise ValueError("Unsupported payload format version [{0}].".format(format_version))
+            if n_columns!=len(feature_columns):
+                raise ValueError("Payload has [{0}] columns, the schema has [{1}].".format(n_columns, len(feature_columns)))
+            if fingerprint!=FeaturePayload.get_schema_fingerprint(feature_columns=feature_columns):
+                raise ValueError("Payload column order does not match schema.yaml.")
+            expected_size = FEATURE_PAYLOAD_HEADER.size+n_rows*n_columns*FEATURE_PAYLOAD_DTYPE.itemsize
+            if len(payload)!=expected_size:
+                raise ValueError("Payload is [{0}] bytes, [{1}] rows need [{2}].".format(len(payload), n_rows, expected_size))
+            return np.frombuffer(
+                payload, dtype=FEATURE_PAYLOAD_DTYPE, count=n_rows*n_columns, offset=FEATURE_PAYLOAD_HEADER.size
+            ).reshape(n_rows, n_columns)
+        except Exception as e:
+            logging.error(str(SensorException(error_message=e)))
+            raise SensorException(error_message=e)
+
+    @staticmethod
+    def decode_arrow(payload:bytes, feature_columns:List[str])->np.array:
+        """
+        Description:
+            This function reads an Arrow IPC stream whose columns must be the \
+            schema feature columns in order, nulls become NaN.
+
+        Returns: array of shape (rows, columns)
+        """
+        try:
+            # pyarrow is only needed for Arrow payloads
+            import pyarrow as pa
+            table = pa.ipc.open_stream(pa.py_buffer(payload)).read_all()
+            if table.column_names!=list(feature_columns):
+                raise ValueError("Arrow column order does not match schema.yaml.")
+            X = np.empty((table.num_rows, table.num_columns), dtype=np.float64)
+            for i, column in enumerate(table.columns):
+                X[:, i] = column.to_numpy(zero_copy_only=False)
+            return X
+        except Exception as e:
+            logging.error(str(SensorException(error_message=e)))
+            raise SensorException(error_message=e)
@@ -0,0 +1,279 @@
+import os
+import gc
+import json
+import time
+import signal
+import socket
+import argparse
+from typing import Dict, Optional, Set
+import uvicorn
+from uvicorn.importer import import_from_string
+from sensor.logger import logging
+from sensor.utils.main_utils import Utils
+from sensor.exceptions import SensorException
+from sensor.ml.model.registry import ModelRegistry
+from sensor.serving.model_cache import LoadedModel, ModelCache
+from sensor.telemetry import MODEL_INFO, MODEL_LOAD_SECONDS
+from sensor.constant.training_pipeline import SAVED_MODEL_DIR
+from sensor.constant.application import (APP_HOST, APP_PORT, APP_WORKERS, MODEL_CACHE_POLL_INTERVAL
+                                        , MODEL_INFERENCE_NTHREAD
+                                        , SERVING_WORKER_REPORT_INTERVAL, SERVING_WORKER_STATUS_FILE
+                                        , SERVING_WORKER_SHUTDOWN_TIMEOUT)
+
+
+class ServingLauncher:
+    """
+    Description:
+        This class serves the app from N forked uvicorn workers that share one \
+        preloaded model copy-on-write. The parent loads the champion bundle \
+        once: its preprocessor arrays are read-only memory maps and the booster \
+        lives in the xgboost heap, so neither is touched by refcount updates; \
+        gc.freeze moves the remaining python objects out of the collector's \
+        reach before forking, so collections in the workers do not dirty them \
+        either. The parent binds the listening socket, watches the registry \
+        and, on a new champion, loads it, forks a new generation of workers \
+        and gracefully stops the old one. Dead workers are replaced.
+
+    Params:
+        app: import string of the ASGI app, e.g. "main:app"
+        n_workers: forked workers
+        host: bind address
+        port: bind port
+        model_dir: saved models directory
+        poll_interval: seconds between registry checks
+    """
+    def __init__(self, app:str="main:app", n_workers:int=APP_WORKERS, host:str=APP_HOST, port:int=APP_PORT
+                , model_dir:str=SAVED_MODEL_DIR, poll_interval:float=MODEL_CACHE_POLL_INTERVAL
+                , report_interval:float=SERVING_WORKER_REPORT_INTERVAL
+                , status_file_path:str=SERVING_WORKER_STATUS_FILE)->None:
+        try:
+            if not hasattr(os, "fork"):
+                raise Exception("Preload-and-fork serving needs os.fork, run main.py with one worker instead.")
+            self.app = app
+            self.n_workers = n_workers
+            self.host = host
+            self.port = port
+            self.model_registry = ModelRegistry(model_dir=model_dir)
+            self.poll_interval = poll_interval
+            self.report_interval = report_interval
+            self.status_file_path = status_file_path
+            # split the cores between workers so their booster threads do not oversubscribe
+            self.nthread = max(1, MODEL_INFERENCE_NTHREAD//n_workers)
+            self.loaded:Optional[LoadedModel] = None
+            self.workers:Dict[int, str] = dict()
+            self.retiring:Set[int] = set()
+            self._socket:Optional[socket.socket] = None
+            self._stopping = False
+            self._reload_requested = False
+        except Exception as e:
+            logging.error(str(SensorException(error_message=e)))
+            raise SensorException(error_message=e)
+
+    def bind(self,)->socket.socket:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((self.host, self.port))
+        sock.listen(2048)
+        sock.set_inheritable(True)
+        self._socket = sock
+        logging.info("Serving socket bound to [{0}:{1}].".format(self.host, self.port))
+        return sock
+
+    def load_champion(self,)->bool:
+        """
+        Description:
+            This function loads the registry champion in the parent, when it \
+            differs from the preloaded one, and freezes the heap for forking.
+
+        Returns: True when a new model was loaded
+        """
+        try:
+            current = self.model_registry.get_current()
+            if current is None or (self.loaded is not None and self.loaded.version==current["version"]):
+                return False
+            start = time.perf_counter()
+            model = ModelCache.load_model(model_path=current["model_path"], nthread=self.nthread)
+            load_latency = time.perf_counter()-start
+            # release the previous generation's model before freezing the new one
+            gc.unfreeze()
+            self.loaded = LoadedModel(
+                version=current["version"], model=model, load_latency=load_latency, loaded_at=time.time()
+            )
+            gc.collect()
+            gc.freeze()
+            logging.info("Preloaded model version [{0}] in [{1:.3f}] seconds.".format(current["version"], load_latency))
+            return True
+        except Exception as e:
+            logging.error(str(SensorException(error_message=e)))
+            raise SensorException(error_message=e)
+
+    def _run_worker(self,)->None:
+        for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP, signal.SIGCHLD):
+            signal.signal(signum, signal.SIG_DFL)
+        ModelCache.instance = ModelCache(poll_interval=None, loaded_model=self.loaded)
+        if self.loaded is not None:
+            MODEL_INFO.set(1, version=self.loaded.version)
+            MODEL_LOAD_SECONDS.set(self.loaded.load_latency)
+        config = uvicorn.Config(app=self.app, host=self.host, port=self.port)
+        uvicorn.Server(config=config).run(sockets=[self._socket])
+
+    def spawn_worker(self,)->int:
+        version = None if self.loaded is None else self.loaded.version
+        pid = os.fork()
+        if pid==0:
+            exit_code = 0
+            try:
+                self._run_worker()
+            except BaseException:
+                exit_code = 1
+            finally:
+                os._exit(exit_code)
+        self.workers[pid] = version
+        logging.info("Forked serving worker [{0}] for model version [{1}].".format(pid, version))
+        return pid
+
+    def reload(self,)->None:
+        """
+        Description:
+            This function forks a new generation of workers with the preloaded \
+            champion and sends the previous generation a graceful SIGTERM.
+        """
+        previous = list(self.workers)
+        for _ in range(self.n_workers):
+            self.spawn_worker()
+        for pid in previous:
+            self.workers.pop(pid, None)
+            self.retiring.add(pid)
+            self._signal(pid=pid, signum=signal.SIGTERM)
+        logging.info("Serving workers reloaded, retiring {0}.".format(previous))
+
+    @staticmethod
+    def _signal(pid:int, signum:int)->None:
+        try:
+            os.kill(pid, signum)
+        except ProcessLookupError:
+            pass
+
+    def reap(self,)->None:
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid==0:
+                return
+            if pid in self.retiring:
+                self.retiring.discard(pid)
+                continue
+            if pid in self.workers:
+                self.workers.pop(pid)
+                logging.error("Serving worker [{0}] exited with status [{1}].".format(pid, status))
+                if not self._stopping:
+                    self.spawn_worker()
+
+    def report(self,)->dict:
+        """
+        Description:
+            This function logs and writes the memory of the parent and every \
+            worker, the PSS total is the real footprint of the shared model.
+        """
+        try:
+            workers = {pid:{"model_version":version, **Utils.get_process_memory(pid=pid)}
+                       for pid, version in self.workers.items()}
+            status = {
+                "parent":{"pid":os.getpid(), **Utils.get_process_memory()}
+                , "workers":workers
+                , "total_pss":sum(memory.get("pss", 0) for memory in workers.values())
+                , "model_version":None if self.loaded is None else self.loaded.version
+                , "reported_at":time.time()
+            }
+            os.makedirs(os.path.dirname(self.status_file_path), exist_ok=True)
+            tmp_status_file_path = f"{self.status_file_path}.{os.getpid()}.tmp"
+            with open(tmp_status_file_path, "w") as status_file:
+                json.dump(status, status_file, indent=2)
+            os.replace(tmp_status_file_path, self.status_file_path)
+            for pid, memory in workers.items():
+                logging.info("Serving worker [{0}] rss [{1}] pss [{2}] private dirty [{3}] bytes.".format(
+                    pid, memory.get("rss"), memory.get("pss"), memory.get("private_dirty")
+                ))
+            return status
+        except Exception as e:
+            logging.error(str(SensorException(error_message=e)))
+            raise SensorException(error_message=e)
+
+    def _handle_stop(self, signum, frame)->None:
+        self._stopping = True
+
+    def _handle_reload(self, signum, frame)->None:
+        self._reload_requested = True
+
+    def shutdown(self, timeout:float=SERVING_WORKER_SHUTDOWN_TIMEOUT)->None:
+        pids = list(self.workers)+list(self.retiring)
+        for pid in pids:
+            self._signal(pid=pid, signum=signal.SIGTERM)
+        deadline = time.monotonic()+timeout
+        while (self.workers or self.retiring) and time.monotonic()<deadline:
+            for pid in list(self.workers)+list(self.retiring):
+                try:
+                    done, _ = os.waitpid(pid, os.WNOHANG)
+                except ChildProcessError:
+                    done = pid
+                if done:
+                    self.workers.pop(pid, None)
+                    self.retiring.discard(pid)
+            time.sleep(0.05)
+        for pid in list(self.workers)+list(self.retiring):
+            self._signal(pid=pid, signum=signal.SIGKILL)
+        if self._socket is not None:
+            self._socket.close()
+
+    def run(self,)->None:
+        """
+        Description:
+            This function preloads the app and the champion, forks the workers \
+            and supervises them until SIGTERM or SIGINT. SIGHUP forces a reload.
+        """
+        try:
+            # import the app before forking, so its modules are shared too
+            self.app = import_from_string(self.app) if isinstance(self.app, str) else self.app
+            self.bind()
+            self.load_champion()
+            signal.signal(signal.SIGTERM, self._handle_stop)
+            signal.signal(signal.SIGINT, self._handle_stop)
+            signal.signal(signal.SIGHUP, self._handle_reload)
+            for _ in range(self.n_workers):
+                self.spawn_worker()
+
+            next_poll = time.monotonic()+self.poll_interval
+            next_report = time.monotonic()
+            while not self._stopping:
+                self.reap()
+                now = time.monotonic()
+                if now>=next_poll or self._reload_requested:
+                    next_poll = now+self.poll_interval
+                    try:
+                        if self.load_champion() or self._reload_requested:
+                            self.reload()
+                    except Exception:
+                        # keep serving the current generation, the error is logged
+                        pass
+                    self._reload_requested = False
+                if now>=next_report:
+                    next_report = now+self.report_interval
+                    self.report()
+                time.sleep(0.2)
+        except Exception as e:
+            logging.error(str(SensorException(error_message=e)))
+            raise SensorException(error_message=e)
+        finally:
+            self.shutdown()
+
+
+if __name__=="__main__":
+    parser = argparse.ArgumentParser(description="Preload-and-fork multi-worker serving.")
+    parser.add_argument("--app", default="main:app")
+    parser.add_argument("--workers", type=int, default=APP_WORKERS)
+    parser.add_argument("--host", default=APP_HOST)
+    parser.add_argument("--port", type=int, default=APP_PORT)
+    args = parser.parse_args()
+    ServingLauncher(app=args.app, n_workers=args.workers, host=args.host, port=args.port).run()
@@ -0,0 +1,354 @@
+import io
+import os
+import sys
+import json
+import time
+import asyncio
+import platform
+import argparse
+import subprocess
+from datetime import datetime
+from typing import Dict, List, Optional
+import httpx
+import numpy as np
+from sensor.logger import logging
+from sensor.utils.main_utils import Utils
+from sensor.exceptions import SensorException
+from sensor.serving.binary_payload import FeaturePayload
+from sensor.constant.training_pipeline import SCHEMA_FILE_PATH, ARTIFACT_TIMESTAMP_FORMAT
+from sensor.constant.application import LOAD_TEST_DIR
+
+LOAD_TEST_ENDPOINTS:dict = {"row":"/predict/row", "binary":"/predict/binary", "batch":"/predict"}
+LOAD_TEST_MODES:tuple = ("closed", "open")
+
+
+class PayloadFactory:
+    """
+    Description:
+        This class builds a pool of synthetic APS-shaped request bodies ahead of \
+        the run, so generating them is not timed. APS counters are non negative \
+        and heavy tailed with a few percent missing, hence lognormal values with \
+        NaN holes; missing values are omitted keys for JSON rows and "na" in CSV.
+
+    Params:
+        feature_columns: schema feature columns
+        rows_per_request: rows per binary or batch request
+        missing_rate: fraction of missing feature values
+        seed: random seed of the pool
+    """
+    def __init__(self, feature_columns:List[str], rows_per_request:int=1, missing_rate:float=0.08, seed:int=0)->None:
+        self.feature_columns = feature_columns
+        self.rows_per_request = rows_per_request
+        self.missing_rate = missing_rate
+        self.rng = np.random.default_rng(seed)
+
+    def get_rows(self, n_rows:int)->np.array:
+        X = np.round(self.rng.lognormal(mean=3.0, sigma=2.5, size=(n_rows, len(self.feature_columns))))
+        X[self.rng.random(X.shape)<self.missing_rate] = np.nan
+        return X
+
+    def build(self, endpoint:str)->dict:
+        """
+        Description: This function gives the httpx request arguments of one request.
+        """
+        if endpoint=="row":
+            row = self.get_rows(n_rows=1)[0]
+            return {"json":{"features":{column:float(value) for column, value in zip(self.feature_columns, row)
+                                        if not np.isnan(value)}}}
+        X = self.get_rows(n_rows=self.rows_per_request)
+        if endpoint=="binary":
+            return {"content":FeaturePayload.encode(X=X, feature_columns=self.feature_columns)
+                    , "headers":{"content-type":"application/octet-stream"}}
+        if endpoint=="batch":
+            csv_file = io.StringIO()
+            np.savetxt(csv_file, X, delimiter=",", fmt="%.17g", header=",".join(self.feature_columns), comments="")
+            return {"files":{"file":("load_test.csv", csv_file.getvalue().replace("nan", "na"), "text/csv")}}
+        raise Exception("Unknown endpoint [{0}], expected one of {1}.".format(endpoint, tuple(LOAD_TEST_ENDPOINTS)))
+
+    def build_pool(self, endpoint:str, pool_size:int)->List[dict]:
+        return [self.build(endpoint=endpoint) for _ in range(pool_size)]
+
+
+class AppLifespan:
+    """
+    Description:
+        This class drives the ASGI lifespan protocol of an in-process app, so its \
+        startup handlers, e.g. loading the model cache, run before the first \
+        request the way uvicorn would run them.
+    """
+    def __init__(self, app)->None:
+        self.app = app
+        self._receive_queue:asyncio.Queue = asyncio.Queue()
+        self._send_queue:asyncio.Queue = asyncio.Queue()
+        self._task = None
+
+    async def _call(self, message_type:str)->None:
+        await self._receive_queue.put({"type":message_type})
+        message = await self._send_queue.get()
+        if message["type"].endswith(".failed"):
+            raise Exception("App {0} failed: [{1}].".format(message_type, message.get("message", "")))
+
+    async def __aenter__(self,)->"AppLifespan":
+        scope = {"type":"lifespan", "asgi":{"version":"3.0", "spec_version":"2.0"}, "state":dict()}
+        self._task = asyncio.ensure_future(self.app(scope, self._receive_queue.get, self._send_queue.put))
+        await self._call(message_type="lifespan.startup")
+        return self
+
+    async def __aexit__(self, *exc_info)->None:
+        await self._call(message_type="lifespan.shutdown")
+        await self._task
+
+
+class LoadTest:
+    """
+    Description:
+        This class load tests the prediction endpoints, in process through \
+        httpx's ASGI transport or against a running server. A closed loop keeps \
+        `concurrency` clients each sending its next request when the previous \
+        one returns. An open loop sends requests at a fixed `rate` whatever the \
+        response times, at most `concurrency` in flight, and measures latency \
+        from the scheduled send time, so a stalled server shows up in the tail \
+        instead of slowing the arrivals down.
+
+    Params:
+        app: ASGI app driven in process, ignored when base_url is given
+        base_url: URL of a running server, e.g. a local uvicorn
+        endpoint: one of row, binary, batch
+        mode: closed or open
+        concurrency: closed loop clients, or open loop in-flight limit
+        rate: open loop requests per second
+        duration: seconds of measured load
+        warmup: seconds of unmeasured load before it
+        rows_per_request: rows per binary or batch request
+        pool_size: distinct request bodies, repeats hit the prediction cache
+        seed: payload seed
+    """
+    def __init__(self, app=None, base_url:Optional[str]=None, endpoint:str="row", mode:str="closed"
+                , concurrency:int=16, rate:float=100.0, duration:float=10.0, warmup:float=1.0
+                , rows_per_request:int=1, pool_size:int=1024, seed:int=0)->None:
+        try:
+            if app is None and base_url is None:
+                raise Exception("Load test needs an app or a base_url.")
+            if endpoint not in LOAD_TEST_ENDPOINTS:
+                raise Exception("Unknown endpoint [{0}], expected one of {1}.".format(endpoint, tuple(LOAD_TEST_ENDPOINTS)))
+            if mode not in LOAD_TEST_MODES:
+                raise Exception("Unknown mode [{0}], expected one of {1}.".format(mode, LOAD_TEST_MODES))
+            self.app = app
+            self.base_url = base_url
+            self.endpoint = endpoint
+            self.mode = mode
+            self.concurrency = concurrency
+            self.rate = rate
+            self.duration = duration
+            self.warmup = warmup
+            self.rows_per_request = 1 if endpoint=="row" else rows_per_request
+            self.pool_size = pool_size
+            self.seed = seed
+            feature_columns = Utils.read_yaml_file(file_path=SCHEMA_FILE_PATH)["numerical_columns"]
+            self.payloads = PayloadFactory(
+                feature_columns=feature_columns, rows_per_request=self.rows_per_request, seed=seed
+            ).build_pool(endpoint=endpoint, pool_size=pool_size)
+            self.latencies:List[float] = list()
+            self.statuses:Dict[str, int] = dict()
+            self.model_version:Optional[str] = None
+            self._n_sent = 0
+            self._measuring = False
+        except Exception as e:
+            logging.error(str(SensorException(error_message=e)))
+            raise SensorException(error_message=e)
+
+    def get_client(self,)->httpx.AsyncClient:
+        limits = httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency)
+        if self.base_url is not None:
+            return httpx.AsyncClient(base_url=self.base_url, limits=limits, timeout=None)
+        return httpx.AsyncClient(transport=httpx.ASGITransport(app=self.app), base_url="http://load-test"
+                                 , limits=limits, timeout=None)
+
+    async def send(self, client:httpx.AsyncClient, scheduled_at:float)->None:
+        payload = self.payloads[self._n_sent%len(self.payloads)]
+        self._n_sent += 1
+        try:
+            response = await client.post(LOAD_TEST_ENDPOINTS[self.endpoint], **payload)
+            # a streamed batch response is only complete once the body is read
+            await response.aread()
+            status = str(response.status_code)
+        except Exception as e:
+            status = type(e).__name__
+        if self._measuring:
+            self.latencies.append(time.perf_counter()-scheduled_at)
+            self.statuses[status] = self.statuses.get(status, 0)+1
+
+    async def run_closed(self, client:httpx.AsyncClient, deadline:float)->None:
+        async def closed_client()->None:
+            while time.perf_counter()<deadline:
+                await self.send(client=client, scheduled_at=time.perf_counter())
+        await asyncio.gather(*(closed_client() for _ in range(self.concurrency)))
+
+    async def run_open(self, client:httpx.AsyncClient, deadline:float)->None:
+        in_flight = asyncio.Semaphore(self.concurrency)
+        tasks = set()
+
+        async def open_request(scheduled_at:float)->None:
+            async with in_flight:
+                await self.send(client=client, scheduled_at=scheduled_at)
+
+        interval = 1.0/self.rate
+        scheduled_at = time.perf_counter()
+        while scheduled_at<deadline:
+            delay = scheduled_at-time.perf_counter()
+            if delay>0:
+                await asyncio.sleep(delay)
+            task = asyncio.ensure_future(open_request(scheduled_at=scheduled_at))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+            scheduled_at += interval
+        if tasks:
+            await asyncio.gather(*tasks)
+
+    async def _run(self,)->float:
+        run_loop = self.run_closed if self.mode=="closed" else self.run_open
+        async with self.get_client() as client:
+            if self.warmup>0:
+                await run_loop(client=client, deadline=time.perf_counter()+self.warmup)
+            self._measuring = True
+            start = time.perf_counter()
+            await run_loop(client=client, deadline=start+self.duration)
+            # open loop requests scheduled before the deadline are awaited, so time up to the last response
+            elapsed = time.perf_counter()-start
+            self._measuring = False
+            response = await client.get("/model")
+            if response.status_code==200:
+                self.model_version = response.json().get("version")
+            return elapsed
+
+    async def _run_with_lifespan(self,)->float:
+        if self.base_url is not None:
+            return await self._run()
+        async with AppLifespan(app=self.app):
+            return await self._run()
+
+    def get_report(self, elapsed:float)->dict:
+        latencies = np.array(self.latencies)*1e3
+        n_requests = len(latencies)
+        n_ok = sum(count for status, count in self.statuses.items() if status.startswith("2"))
+        return {
+            "config":{
+                "target":self.base_url or "in-process", "endpoint":self.endpoint, "mode":self.mode
+                , "concurrency":self.concurrency, "rate":self.rate if self.mode=="open" else None
+                , "duration":self.duration, "warmup":self.warmup, "rows_per_request":self.rows_per_request
+                , "pool_size":self.pool_size, "seed":self.seed
+            }
+            , "requests":n_requests
+            , "errors":n_requests-n_ok
+            , "statuses":self.statuses
+            , "elapsed_seconds":elapsed
+            , "requests_per_second":n_requests/elapsed if elapsed>0 else 0.0
+            , "rows_per_second":n_ok*self.rows_per_request/elapsed if elapsed>0 else 0.0
+            , "latency_ms":{
+                "mean":float(latencies.mean()) if n_requests else None
+                , "p50":float(np.percentile(latencies, 50)) if n_requests else None
+                , "p95":float(np.percentile(latencies, 95)) if n_requests else None
+                , "p99":float(np.percentile(latencies, 99)) if n_requests else None
+                , "max":float(latencies.max()) if n_requests else None
+            }
+            , "model_version":self.model_version
+            , "environment":get_environment()
+        }
+
+    def run(self,)->dict:
+        """
+        Description:
+            This function runs the warmup and the measured load.
+
+        Returns: report of throughput, latency percentiles and statuses
+        """
+        try:
+            logging.info("Load testing [{0}] {1} loop, concurrency [{2}] for [{3}] seconds.".format(
+                self.endpoint, self.mode, self.concurrency, self.duration
+            ))
+            elapsed = asyncio.run(self._run_with_lifespan())
+            report = self.get_report(elapsed=elapsed)
+            logging.info("Load test report: [{0}]".format(report))
+            return report
+        except Exception as e:
+            logging.error(str(SensorException(error_message=e)))
+            raise SensorException(error_message=e)
+
+
+def get_environment()->dict:
+    try:
+        git_commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=os.path.dirname(os.path.abspath(__file__))
+            , capture_output=True, text=True, timeout=5
+        ).stdout.strip() or None
+    except Exception:
+        git_commit = None
+    return {"git_commit":git_commit, "python":platform.python_version(), "cpu_count":os.cpu_count()
+            , "timestamp":datetime.now().strftime(ARTIFACT_TIMESTAMP_FORMAT)}
+
+
+def save_report(report:dict, report_path:Optional[str]=None)->str:
+    if report_path is None:
+        report_path = os.path.join(LOAD_TEST_DIR, "{0}_{1}_{2}.json".format(
+            report["environment"]["timestamp"], report["config"]["endpoint"], report["config"]["mode"]
+        ))
+    os.makedirs(os.path.dirname(report_path) or ".", exist_ok=True)
+    with open(report_path, "w") as report_file:
+        json.dump(report, report_file, indent=2)
+    return report_path
+
+
+def compare_reports(report:dict, baseline:dict)->List[str]:
+    """
+    Description: This function gives one line per headline number with its \
+        relative change against a baseline report.
+    """
+    lines = list()
+    numbers = [("requests/s", "requests_per_second"), ("rows/s", "rows_per_second")]+[
+        (f"{quantile} ms", f"latency_ms.{quantile}") for quantile in ("p50", "p95", "p99")
+    ]
+    for name, path in numbers:
+        values = list()
+        for source in (baseline, report):
+            for key in path.split("."):
+                source = (source or dict()).get(key)
+            values.append(source)
+        before, after = values
+        change = "" if not before or after is None else f" ({(after-before)/before:+.1%})"
+        lines.append(f"{name:<12} {before} -> {after}{change}")
+    return lines
+
+
+if __name__=="__main__":
+    parser = argparse.ArgumentParser(description="Load test the prediction endpoints.")
+    parser.add_argument("--app", default="main:app", help="ASGI app driven in process")
+    parser.add_argument("--url", default=None, help="target a running server instead, e.g. http://127.0.0.1:8080")
+    parser.add_argument("--endpoint", choices=tuple(LOAD_TEST_ENDPOINTS), default="row")
+    parser.add_argument("--mode", choices=LOAD_TEST_MODES, default="closed")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--rate", type=float, default=100.0, help="open loop requests per second")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--warmup", type=float, default=1.0)
+    parser.add_argument("--rows-per-request", type=int, default=1)
+    parser.add_argument("--pool-size", type=int, default=1024)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help=f"report path, defaults to {LOAD_TEST_DIR}")
+    parser.add_argument("--baseline", default=None, help="report to compare against")
+    args = parser.parse_args()
+
+    app = None
+    if args.url is None:
+        from uvicorn.importer import import_from_string
+        sys.path.insert(0, os.getcwd())
+        app = import_from_string(args.app)
+    report = LoadTest(
+        app=app, base_url=args.url, endpoint=args.endpoint, mode=args.mode, concurrency=args.concurrency
+        , rate=args.rate, duration=args.duration, warmup=args.warmup, rows_per_request=args.rows_per_request
+        , pool_size=args.pool_size, seed=args.seed
+    ).run()
+    print(json.dumps({key:report[key] for key in ("requests", "errors", "requests_per_second"
+                                                  , "rows_per_second", "latency_ms")}, indent=2))
+    print("Report saved to [{0}].".format(save_report(report=report, report_path=args.output)))
+    if args.baseline is not None:
+        with open(args.baseline, "r") as baseline_file:
+            print("\n".join(compare_reports(report=report, baseline=json.load(baseline_file))))
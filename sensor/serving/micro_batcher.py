@@ -0,0 +1,176 @@
+import time
+import asyncio
+import collections
+import numpy as np
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Tuple
+from sensor.logger import logging
+from sensor.exceptions import SensorException
+from sensor.serving.model_cache import ModelCache
+from sensor.serving.prediction_cache import PredictionCache
+from sensor.telemetry import MICRO_BATCH_SIZE
+from sensor.constant.application import (MICRO_BATCH_MAX_SIZE, MICRO_BATCH_MAX_WAIT
+                                        , MICRO_BATCH_STATS_WINDOW)
+
+
+@dataclass(frozen=True)
+class RowPrediction:
+    prediction:int
+    probability:float
+    model_version:str
+
+
+def get_feature_row(features:dict, feature_columns:List[str])->np.array:
+    """
+    Description: Order a JSON row by the model feature columns, missing, null \
+        and "na" values become NaN and are imputed by the preprocessor.
+    """
+    unknown = set(features)-set(feature_columns)
+    if unknown:
+        raise ValueError("Unknown feature columns: {0}.".format(sorted(unknown)))
+    return np.array([
+        np.nan if features.get(column) in (None, "na") else float(features[column])
+        for column in feature_columns
+    ], dtype=np.float64)
+
+
+def predict_with_model_cache(X:np.array)->Tuple[np.array, float, str]:
+    """
+    Description: Score a batch with the current model cache snapshot, through \
+        the prediction cache.
+
+    Returns: positive class probabilities, decision threshold and model version
+    """
+    loaded_model = ModelCache.get_instance().get()
+    y_score = PredictionCache.get_instance().predict_proba(loaded_model=loaded_model, X=X)
+    return y_score, loaded_model.model.threshold, loaded_model.version
+
+
+class MicroBatcher:
+    """
+    Description:
+        This class coalesces concurrent single-row predictions into one \
+        vectorized predict. Requests wait in an asyncio queue; a single \
+        worker task takes the first waiting row, keeps collecting until the \
+        batch is full or the max wait has passed since that row arrived, \
+        scores the batch in a thread and resolves every request's future. \
+        While a batch is scoring new rows queue up, so batches grow with load.
+
+    Params:
+        predict_fn: scores a 2d array, gives probabilities, threshold and model version
+        max_batch_size: rows per predict call
+        max_wait: seconds the first row of a batch waits for company
+    """
+    def __init__(self, predict_fn:Callable=predict_with_model_cache
+                , max_batch_size:int=MICRO_BATCH_MAX_SIZE, max_wait:float=MICRO_BATCH_MAX_WAIT
+                , stats_window:int=MICRO_BATCH_STATS_WINDOW)->None:
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._queue:Optional[asyncio.Queue] = None
+        self._worker:Optional[asyncio.Task] = None
+        self._batch_sizes = collections.deque(maxlen=stats_window)
+        self._latencies = collections.deque(maxlen=stats_window)
+        self.rows_scored = 0
+        self.batches_scored = 0
+
+    def _ensure_worker(self,)->None:
+        # bound to the running loop on first use, the app may start several loops in tests
+        loop = asyncio.get_running_loop()
+        if self._worker is None or self._worker.done() or self._worker.get_loop() is not loop:
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._run())
+
+    async def predict(self, row:np.array)->RowPrediction:
+        """
+        Description:
+            This function queues one feature row and waits for its batch to be scored.
+
+        Params:
+        ----------
+        row: np.array
+            1d feature row
+
+        Returns: RowPrediction
+        """
+        self._ensure_worker()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((np.asarray(row, dtype=np.float64), future, time.perf_counter()))
+        return await future
+
+    async def _collect(self,)->List[tuple]:
+        batch = [await self._queue.get()]
+        deadline = batch[0][2]+self.max_wait
+        while len(batch)<self.max_batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            timeout = deadline-time.perf_counter()
+            if timeout<=0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout=timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self,)->None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            futures = [future for _, future, _ in batch]
+            try:
+                X = np.vstack([row for row, _, _ in batch])
+                y_score, threshold, version = await loop.run_in_executor(None, self.predict_fn, X)
+            except Exception as e:
+                logging.error(str(SensorException(error_message=e)))
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            finished = time.perf_counter()
+            for (_, future, enqueued_at), score in zip(batch, y_score):
+                if not future.done():
+                    future.set_result(RowPrediction(
+                        prediction=int(score>=threshold), probability=float(score), model_version=version
+                    ))
+                self._latencies.append(finished-enqueued_at)
+            self._batch_sizes.append(len(batch))
+            MICRO_BATCH_SIZE.observe(len(batch))
+            self.rows_scored += len(batch)
+            self.batches_scored += 1
+
+    async def stop(self,)->None:
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._worker = None
+
+    def stats(self,)->dict:
+        """
+        Description:
+            This function gives the queue depth and, over the recent window, the \
+            batch size distribution and request latency percentiles in milliseconds.
+        """
+        batch_sizes = np.array(self._batch_sizes, dtype=np.float64)
+        latencies = np.array(self._latencies, dtype=np.float64)*1e3
+        return {
+            "queue_depth":0 if self._queue is None else self._queue.qsize()
+            , "rows_scored":self.rows_scored
+            , "batches_scored":self.batches_scored
+            , "max_batch_size":self.max_batch_size
+            , "max_wait_ms":self.max_wait*1e3
+            , "batch_size":None if not len(batch_sizes) else {
+                "mean":float(batch_sizes.mean()), "max":int(batch_sizes.max())
+                , "p50":float(np.percentile(batch_sizes, 50))
+            }
+            , "latency_ms":None if not len(latencies) else {
+                f"p{q}":float(np.percentile(latencies, q)) for q in (50, 95, 99)
+            }
+        }
@@ -0,0 +1,189 @@
+import os
+import time
+import threading
+from dataclasses import dataclass
+from typing import Optional
+from sensor.logger import logging
+from sensor.utils.main_utils import Utils
+from sensor.exceptions import SensorException
+from sensor.ml.model.bundle import ModelBundle
+from sensor.ml.model.registry import ModelRegistry
+from sensor.telemetry import MODEL_INFO, MODEL_LOAD_SECONDS, MODEL_RELOADS
+from sensor.constant.training_pipeline import SAVED_MODEL_DIR
+from sensor.constant.application import MODEL_CACHE_POLL_INTERVAL, MODEL_INFERENCE_NTHREAD
+
+
+@dataclass(frozen=True)
+class LoadedModel:
+    version:str
+    model:object
+    load_latency:float
+    loaded_at:float
+
+
+class ModelCache:
+    """
+    Description:
+        Process-wide cache of the current champion model. A daemon thread polls \
+        the registry manifest and loads a new champion in the background; the \
+        loaded model is swapped in with a single reference assignment, so \
+        in-flight requests keep scoring with the model they started with.
+
+    Params:
+        model_dir: saved models directory
+        poll_interval: seconds between registry checks, None disables the \
+            watcher for workers whose model is managed by the launcher
+        loaded_model: model preloaded by the launcher before forking
+    """
+    instance = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, model_dir:str=SAVED_MODEL_DIR
+                , poll_interval:Optional[float]=MODEL_CACHE_POLL_INTERVAL
+                , loaded_model:Optional[LoadedModel]=None)->None:
+        try:
+            self.model_registry = ModelRegistry(model_dir=model_dir)
+            self.poll_interval = poll_interval
+            self.reload_count = 0
+            self.last_error = None
+            self._loaded:Optional[LoadedModel] = loaded_model
+            self._reload_lock = threading.Lock()
+            self._stop_event = threading.Event()
+            self._watcher = None
+        except Exception as e:
+            logging.error(str(SensorException(error_message=e)))
+            raise SensorException(error_message=e)
+
+    @classmethod
+    def get_instance(cls,)->"ModelCache":
+        """
+        Description:
+            This function gives the process-wide model cache, creating it on first use.
+        """
+        if cls.instance is None:
+            with cls._instance_lock:
+                if cls.instance is None:
+                    cls.instance = cls()
+        return cls.instance
+
+    @staticmethod
+    def load_model(model_path:str, nthread:int=MODEL_INFERENCE_NTHREAD)->object:
+        """
+        Description:
+            This function loads a saved model and forces its lazy parts to load, \
+            so the first request after a swap does not pay for them.
+        """
+        model = ModelBundle.load_saved_model(model_path=model_path, nthread=nthread)
+        # also covers pickled models, whose booster keeps the training thread count
+        model.set_nthread(nthread=nthread)
+        return model
+
+    def refresh(self,)->bool:
+        """
+        Description:
+            This function loads the registry champion when it differs from the \
+            loaded model and swaps it in.
+
+        Returns: True when a new model was swapped in
+        """
+        try:
+            current = self.model_registry.get_current()
+            loaded = self._loaded
+            if current is None or (loaded is not None and loaded.version==current["version"]):
+                return False
+            with self._reload_lock:
+                if self._loaded is not None and self._loaded.version==current["version"]:
+                    return False
+                start = time.perf_counter()
+                model = self.load_model(model_path=current["model_path"])
+                load_latency = time.perf_counter()-start
+                self._loaded = LoadedModel(
+                    version=current["version"], model=model
+                    , load_latency=load_latency, loaded_at=time.time()
+                )
+                self.reload_count += 1
+                self.last_error = None
+                MODEL_INFO.clear()
+                MODEL_INFO.set(1, version=current["version"])
+                MODEL_LOAD_SECONDS.set(load_latency)
+                MODEL_RELOADS.inc()
+            logging.info("Model version [{0}] loaded in [{1:.3f}] seconds.".format(
+                current["version"], load_latency
+            ))
+            return True
+        except Exception as e:
+            self.last_error = str(e)
+            logging.error(str(SensorException(error_message=e)))
+            raise SensorException(error_message=e)
+
+    def _watch(self,)->None:
+        while not self._stop_event.wait(self.poll_interval):
+            try:
+                self.refresh()
+            except Exception:
+                # keep serving the loaded model, the error is logged and exposed in status
+                pass
+
+    def start(self,)->None:
+        """
+        Description:
+            This function loads the current champion, if any, and starts watching \
+            the registry for new ones.
+        """
+        if self.poll_interval is None and self._loaded is not None:
+            return
+        try:
+            self.refresh()
+        except Exception:
+            pass
+        if self.poll_interval is None:
+            return
+        if self._watcher is None or not self._watcher.is_alive():
+            self._stop_event.clear()
+            self._watcher = threading.Thread(target=self._watch, name="model-cache-watcher", daemon=True)
+            self._watcher.start()
+
+    def stop(self,)->None:
+        """
+        Description:
+            This function stops watching the registry.
+        """
+        self._stop_event.set()
+        if self._watcher is not None:
+            self._watcher.join()
+            self._watcher = None
+
+    def get(self,)->LoadedModel:
+        """
+        Description:
+            This function gives the loaded model snapshot, callers keep using it \
+            for the whole request.
+        """
+        try:
+            loaded = self._loaded
+            if loaded is None:
+                self.refresh()
+                loaded = self._loaded
+            if loaded is None:
+                raise Exception("There is no registered model to serve.")
+            return loaded
+        except Exception as e:
+            logging.error(str(SensorException(error_message=e)))
+            raise SensorException(error_message=e)
+
+    def status(self,)->dict:
+        """
+        Description:
+            This function gives the loaded version, its load latency, reload \
+            statistics and the memory of the serving process.
+        """
+        loaded = self._loaded
+        return {
+            "pid":os.getpid()
+            , "version":None if loaded is None else loaded.version
+            , "load_latency_seconds":None if loaded is None else loaded.load_latency
+            , "loaded_at":None if loaded is None else loaded.loaded_at
+            , "reload_count":self.reload_count
+            , "last_error":self.last_error
+            , "memory":Utils.get_process_memory()
+        }
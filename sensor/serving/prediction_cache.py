@@ -0,0 +1,129 @@
+import hashlib
+import threading
+import collections
+import numpy as np
+from typing import Optional
+from sensor.logger import logging
+from sensor.exceptions import SensorException
+from sensor.serving.model_cache import LoadedModel
+from sensor.telemetry import PREDICTION_CACHE_LOOKUPS, PREDICTION_CACHE_BYTES
+from sensor.constant.application import PREDICTION_CACHE_ENABLED, PREDICTION_CACHE_MAX_BYTES
+
+# ordered dict slot and link, 16 byte digest and float, ~180 bytes measured with tracemalloc
+PREDICTION_CACHE_ENTRY_BYTES:int = 192
+
+
+class PredictionCache:
+    """
+    Description:
+        This class caches positive class probabilities by a blake2b digest of \
+        the raw float64 feature row and the model version, so a resent \
+        snapshot skips both the preprocessor and the booster. Entries are \
+        evicted least recently used once the memory budget is reached, and \
+        the whole cache is dropped the first time a new model version is seen.
+
+    Params:
+        max_bytes: memory budget of the cache
+        enabled: False passes every row through to the model
+    """
+    instance = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, max_bytes:int=PREDICTION_CACHE_MAX_BYTES, enabled:bool=PREDICTION_CACHE_ENABLED)->None:
+        self.max_entries = max(1, max_bytes//PREDICTION_CACHE_ENTRY_BYTES)
+        self.enabled = enabled
+        self.version:Optional[str] = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries:"collections.OrderedDict[bytes, float]" = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def get_instance(cls,)->"PredictionCache":
+        if cls.instance is None:
+            with cls._instance_lock:
+                if cls.instance is None:
+                    cls.instance = cls()
+        return cls.instance
+
+    @staticmethod
+    def get_row_keys(X:np.array)->list:
+        X = np.ascontiguousarray(X, dtype=np.float64)
+        return [hashlib.blake2b(row.tobytes(), digest_size=16).digest() for row in X]
+
+    def _check_version(self, version:str)->None:
+        if version!=self.version:
+            if self._entries:
+                logging.info("Model version changed to [{0}], dropping [{1}] cached predictions.".format(
+                    version, len(self._entries)
+                ))
+            self._entries.clear()
+            self.version = version
+
+    def predict_proba(self, loaded_model:LoadedModel, X:np.array)->np.array:
+        """
+        Description:
+            This function gives the positive class probabilities, scoring only \
+            the rows that are not cached for the model version.
+
+        Params:
+        ----------
+        loaded_model: LoadedModel
+            model snapshot from the model cache
+        X: np.array
+            2d feature rows
+
+        Returns: positive class probabilities
+        """
+        try:
+            if not self.enabled:
+                return loaded_model.model.inplace_predict_proba(X)
+            keys = self.get_row_keys(X=X)
+            y_score = np.empty(len(keys), dtype=np.float64)
+            missing = list()
+            with self._lock:
+                self._check_version(version=loaded_model.version)
+                for i, key in enumerate(keys):
+                    score = self._entries.get(key)
+                    if score is None:
+                        missing.append(i)
+                    else:
+                        self._entries.move_to_end(key)
+                        y_score[i] = score
+                n_hits = len(keys)-len(missing)
+                self.hits += n_hits
+                self.misses += len(missing)
+            PREDICTION_CACHE_LOOKUPS.inc(n_hits, result="hit")
+            PREDICTION_CACHE_LOOKUPS.inc(len(missing), result="miss")
+            if not missing:
+                return y_score
+
+            y_score[missing] = loaded_model.model.inplace_predict_proba(np.asarray(X)[missing])
+            with self._lock:
+                # a swap while scoring leaves these rows to the next version's cache
+                if self.version==loaded_model.version:
+                    for i in missing:
+                        self._entries[keys[i]] = float(y_score[i])
+                    while len(self._entries)>self.max_entries:
+                        self._entries.popitem(last=False)
+                        self.evictions += 1
+                PREDICTION_CACHE_BYTES.set(len(self._entries)*PREDICTION_CACHE_ENTRY_BYTES)
+            return y_score
+        except Exception as e:
+            logging.error(str(SensorException(error_message=e)))
+            raise SensorException(error_message=e)
+
+    def stats(self,)->dict:
+        lookups = self.hits+self.misses
+        return {
+            "enabled":self.enabled
+            , "model_version":self.version
+            , "entries":len(self._entries)
+            , "max_entries":self.max_entries
+            , "approx_bytes":len(self._entries)*PREDICTION_CACHE_ENTRY_BYTES
+            , "hits":self.hits
+            , "misses":self.misses
+            , "evictions":self.evictions
+            , "hit_rate":self.hits/lookups if lookups else None
+        }
@@ -0,0 +1,281 @@
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Tuple
+
+SERVING_BUCKETS:tuple = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+TRAINING_BUCKETS:tuple = (1.0, 5.0, 15.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0, 3600.0, 7200.0)
+BATCH_SIZE_BUCKETS:tuple = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512)
+
+
+class _Metric:
+    """
+    Description:
+        Base of the telemetry metrics. Updates go to a shard owned by the \
+        calling thread, so the hot path never takes a lock; only the first \
+        update of a new thread registers its shard. A scrape merges the shards.
+
+    Params:
+        name: prometheus metric name
+        documentation: HELP text
+        labelnames: label names, every update passes all of them
+    """
+    metric_type:str = "untyped"
+
+    def __init__(self, name:str, documentation:str, labelnames:Tuple[str, ...]=())->None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._shards:List[dict] = list()
+        self._shards_lock = threading.Lock()
+
+    def _get_shard(self,)->dict:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = dict()
+            with self._shards_lock:
+                self._shards.append(shard)
+            self._local.shard = shard
+        return shard
+
+    def reset(self,)->None:
+        with self._shards_lock:
+            self._local = threading.local()
+            self._shards = list()
+
+    def _get_key(self, labels:dict)->tuple:
+        if len(labels)!=len(self.labelnames):
+            raise ValueError("Metric [{0}] expects labels {1}, got {2}.".format(
+                self.name, self.labelnames, sorted(labels)
+            ))
+        return tuple(str(labels[labelname]) for labelname in self.labelnames)
+
+    def _iter_shards(self,)->List[dict]:
+        with self._shards_lock:
+            shards = list(self._shards)
+        # a shard may gain keys while it is copied, retry on the rare resize
+        snapshots = list()
+        for shard in shards:
+            while True:
+                try:
+                    snapshots.append(dict(shard))
+                    break
+                except RuntimeError:
+                    continue
+        return snapshots
+
+    @staticmethod
+    def _format_labels(labelnames:tuple, key:tuple, extra:str="")->str:
+        pairs = ['{0}="{1}"'.format(
+            labelname, value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        ) for labelname, value in zip(labelnames, key)]
+        if extra:
+            pairs.append(extra)
+        return "{"+",".join(pairs)+"}" if pairs else ""
+
+    def _header(self,)->List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.metric_type}"]
+
+
+class Counter(_Metric):
+    metric_type = "counter"
+
+    def inc(self, value:float=1.0, **labels)->None:
+        shard = self._get_shard()
+        key = self._get_key(labels=labels)
+        shard[key] = shard.get(key, 0.0)+value
+
+    def collect(self,)->Dict[tuple, float]:
+        totals = dict()
+        for shard in self._iter_shards():
+            for key, value in shard.items():
+                totals[key] = totals.get(key, 0.0)+value
+        return totals
+
+    def merge(self, samples:list)->None:
+        for key, value in samples:
+            self.inc(value, **dict(zip(self.labelnames, key)))
+
+    def expose(self,)->List[str]:
+        return self._header()+[
+            f"{self.name}{self._format_labels(self.labelnames, key)} {float(value)!r}"
+            for key, value in sorted(self.collect().items())
+        ]
+
+
+class Gauge(_Metric):
+    """
+    Description: A gauge holds the last value set, so it lives in one dict \
+        and a set is a single assignment.
+    """
+    metric_type = "gauge"
+
+    def __init__(self, name:str, documentation:str, labelnames:Tuple[str, ...]=())->None:
+        super().__init__(name=name, documentation=documentation, labelnames=labelnames)
+        self._values:Dict[tuple, float] = dict()
+
+    def set(self, value:float, **labels)->None:
+        self._values[self._get_key(labels=labels)] = value
+
+    def clear(self,)->None:
+        self._values = dict()
+
+    def reset(self,)->None:
+        self.clear()
+
+    def collect(self,)->Dict[tuple, float]:
+        return dict(self._values)
+
+    def merge(self, samples:list)->None:
+        for key, value in samples:
+            self.set(value, **dict(zip(self.labelnames, key)))
+
+    def expose(self,)->List[str]:
+        return self._header()+[
+            f"{self.name}{self._format_labels(self.labelnames, key)} {float(value)!r}"
+            for key, value in sorted(self.collect().items())
+        ]
+
+
+class Histogram(_Metric):
+    metric_type = "histogram"
+
+    def __init__(self, name:str, documentation:str, labelnames:Tuple[str, ...]=()
+                , buckets:tuple=SERVING_BUCKETS)->None:
+        super().__init__(name=name, documentation=documentation, labelnames=labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value:float, **labels)->None:
+        shard = self._get_shard()
+        key = self._get_key(labels=labels)
+        state = shard.get(key)
+        if state is None:
+            # per bucket counts, the last slot is +Inf; then sum and count
+            state = shard[key] = [[0]*(len(self.buckets)+1), 0.0, 0]
+        state[0][bisect.bisect_left(self.buckets, value)] += 1
+        state[1] += value
+        state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter()-start, **labels)
+
+    def collect(self,)->Dict[tuple, list]:
+        totals = dict()
+        for shard in self._iter_shards():
+            for key, (counts, total, count) in shard.items():
+                merged = totals.setdefault(key, [[0]*(len(self.buckets)+1), 0.0, 0])
+                merged[0] = [a+b for a, b in zip(merged[0], counts)]
+                merged[1] += total
+                merged[2] += count
+        return totals
+
+    def merge(self, samples:list)->None:
+        shard = self._get_shard()
+        for key, (counts, total, count) in samples:
+            key = tuple(key)
+            state = shard.setdefault(key, [[0]*(len(self.buckets)+1), 0.0, 0])
+            state[0] = [a+b for a, b in zip(state[0], counts)]
+            state[1] += total
+            state[2] += count
+
+    def expose(self,)->List[str]:
+        lines = self._header()
+        for key, (counts, total, count) in sorted(self.collect().items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets+(float("inf"),), counts):
+                cumulative += bucket_count
+                le = 'le="{0}"'.format("+Inf" if bound==float("inf") else f"{bound:g}")
+                lines.append(f"{self.name}_bucket{self._format_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{self._format_labels(self.labelnames, key)} {float(total)!r}")
+            lines.append(f"{self.name}_count{self._format_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Description:
+        This class holds the process metrics and renders them in the prometheus \
+        text exposition format. Snapshots let a worker process hand its \
+        metrics to the serving process, which merges them into its own.
+    """
+    def __init__(self,)->None:
+        self._metrics:Dict[str, _Metric] = dict()
+        self._lock = threading.Lock()
+
+    def register(self, metric:_Metric)->_Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError("Metric [{0}] is already registered.".format(metric.name))
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name:str, documentation:str, labelnames:Tuple[str, ...]=())->Counter:
+        return self.register(Counter(name=name, documentation=documentation, labelnames=labelnames))
+
+    def gauge(self, name:str, documentation:str, labelnames:Tuple[str, ...]=())->Gauge:
+        return self.register(Gauge(name=name, documentation=documentation, labelnames=labelnames))
+
+    def histogram(self, name:str, documentation:str, labelnames:Tuple[str, ...]=()
+                 , buckets:tuple=SERVING_BUCKETS)->Histogram:
+        return self.register(Histogram(name=name, documentation=documentation, labelnames=labelnames, buckets=buckets))
+
+    def snapshot(self,)->dict:
+        return {name:[[list(key), value] for key, value in metric.collect().items()]
+                for name, metric in self._metrics.items()}
+
+    def reset(self,)->None:
+        for metric in list(self._metrics.values()):
+            metric.reset()
+
+    def merge(self, snapshot:dict)->None:
+        for name, samples in snapshot.items():
+            if name in self._metrics:
+                self._metrics[name].merge(samples=[(tuple(key), value) for key, value in samples])
+
+    def expose(self,)->str:
+        lines = list()
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.expose())
+        return "\n".join(lines)+"\n"
+
+
+REGISTRY = MetricsRegistry()
+PROMETHEUS_CONTENT_TYPE:str = "text/plain; version=0.0.4; charset=utf-8"
+
+HTTP_REQUESTS = REGISTRY.counter(
+    "sensor_http_requests_total", "HTTP requests by route and status.", ("method", "route", "status"))
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    "sensor_http_request_seconds", "HTTP request latency by route.", ("method", "route"))
+SERVING_STAGE_SECONDS = REGISTRY.histogram(
+    "sensor_serving_stage_seconds", "Serving latency by endpoint and stage: parse, serialize.", ("endpoint", "stage"))
+INFERENCE_STAGE_SECONDS = REGISTRY.histogram(
+    "sensor_inference_stage_seconds", "SensorModel scoring latency by stage: transform, predict.", ("stage",))
+SERVING_ROWS = REGISTRY.counter(
+    "sensor_serving_rows_total", "Rows scored by endpoint.", ("endpoint",))
+PREDICTION_CACHE_LOOKUPS = REGISTRY.counter(
+    "sensor_prediction_cache_lookups_total", "Prediction cache lookups by result: hit, miss.", ("result",))
+PREDICTION_CACHE_BYTES = REGISTRY.gauge(
+    "sensor_prediction_cache_bytes", "Approximate memory held by the prediction cache.")
+MICRO_BATCH_SIZE = REGISTRY.histogram(
+    "sensor_micro_batch_size", "Rows per micro-batch.", buckets=BATCH_SIZE_BUCKETS)
+MODEL_INFO = REGISTRY.gauge(
+    "sensor_model_info", "Loaded champion model version, the value is always 1.", ("version",))
+MODEL_LOAD_SECONDS = REGISTRY.gauge(
+    "sensor_model_load_seconds", "Load latency of the loaded champion model.")
+MODEL_RELOADS = REGISTRY.counter(
+    "sensor_model_reloads_total", "Champion models loaded by the model cache.")
+TRAINING_STAGE_SECONDS = REGISTRY.histogram(
+    "sensor_training_stage_seconds", "Training pipeline stage duration.", ("stage", "status"), buckets=TRAINING_BUCKETS)
+TRAINING_ROWS = REGISTRY.counter(
+    "sensor_training_rows_total", "Rows processed by training stage.", ("stage",))
+TRAINING_RUNS = REGISTRY.counter(
+    "sensor_training_runs_total", "Training pipeline runs by outcome.", ("status",))
+ARTIFACT_STORE_READS = REGISTRY.counter(
+    "sensor_artifact_store_reads_total", "Stage artifact loads by result: hit (from memory), miss (parsed).", ("result",))
@@ -0,0 +1,227 @@
+import os
+import time
+import threading
+from typing import Callable, Dict, Optional
+from concurrent.futures import Future, ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+from sensor.logger import logging
+from sensor.utils.main_utils import Utils
+from sensor.exceptions import SensorException
+from sensor.telemetry import ARTIFACT_STORE_READS
+from sensor.constant.training_pipeline import ARTIFACT_STORE_IN_MEMORY, ARTIFACT_STORE_MAX_WRITERS
+
+
+def write_dataframe(file_path:str, df:pd.DataFrame)->None:
+    df.to_csv(file_path, index=False, header=True)
+
+
+def write_numpy_array(file_path:str, array:np.ndarray)->None:
+    Utils.save_numpy_array(file_path=file_path, array=array)
+
+
+def write_object(file_path:str, obj:object)->None:
+    Utils.save_object(file_path=file_path, obj=obj)
+
+
+class ArtifactStore:
+    """
+    Description:
+        This class hands artifacts from stage to stage within a run. The file \
+        path stays the handle, so artifacts, the stage cache and the retention \
+        manifest are unchanged, but a saved DataFrame, array or fitted object \
+        is kept in memory and written by a background writer, and a later load \
+        of the same path returns it without parsing the file again.
+
+        Handed out values are safe to share: DataFrames are lazy copies and \
+        arrays read-only views. A stage flushes its own writes before it \
+        returns, so downstream stages, the stage cache and process pool \
+        workers always find the files complete on disk. With in_memory False, \
+        or in a process pool worker, every call reads and writes the file \
+        synchronously.
+
+    Params:
+        in_memory: keep saved and loaded artifacts in memory
+        max_writers: background writer threads
+    """
+    def __init__(self, in_memory:bool=ARTIFACT_STORE_IN_MEMORY, max_writers:int=ARTIFACT_STORE_MAX_WRITERS)->None:
+        self.in_memory = in_memory
+        self.max_writers = max_writers
+        self._entries:Dict[str, object] = dict()
+        self._pending:Dict[str, Future] = dict()
+        self._hits:Dict[str, int] = dict()
+        self._stats = {"hits":0, "misses":0, "writes":0, "write_seconds":0.0, "read_seconds":0.0}
+        self._lock = threading.Lock()
+        self._executor:Optional[ThreadPoolExecutor] = None
+
+    def __getstate__(self,)->dict:
+        # a process pool worker has its own memory, it falls back to the files
+        return {"in_memory":False, "max_writers":self.max_writers}
+
+    def __setstate__(self, state:dict)->None:
+        self.__init__(**state)
+
+    @staticmethod
+    def _share(value:object)->object:
+        if isinstance(value, pd.DataFrame):
+            return value.copy(deep=False)
+        if isinstance(value, np.ndarray):
+            view = value.view()
+            view.flags.writeable = False
+            return view
+        return value
+
+    def _persist(self, file_path:str, value:object, writer:Callable[[str, object], None])->None:
+        start = time.perf_counter()
+        os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+        tmp_file_path = f"{file_path}.{os.getpid()}.tmp"
+        # readers of the file never see it half written
+        writer(tmp_file_path, value)
+        os.replace(tmp_file_path, file_path)
+        with self._lock:
+            self._stats["writes"] += 1
+            self._stats["write_seconds"] += time.perf_counter()-start
+
+    def put(self, file_path:str, value:object, writer:Callable[[str, object], None])->None:
+        """
+        Description:
+            This function saves an artifact: kept in memory and written in the \
+            background, or written right away when the store is not in memory.
+
+        Params:
+        ----------
+        file_path: str
+            artifact file path, also its handle
+        value: object
+            DataFrame, array or object to save
+        writer: Callable
+            called with a file path and the value to write it
+        """
+        try:
+            if not self.in_memory:
+                self._persist(file_path=file_path, value=value, writer=writer)
+                return
+            value = self._share(value)
+            # a path saved twice is written in order
+            previous = self._pending.get(file_path)
+            if previous is not None:
+                previous.result()
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_writers
+                                                        , thread_name_prefix="artifact-store-writer")
+                self._entries[file_path] = value
+                self._pending[file_path] = self._executor.submit(self._persist, file_path, value, writer)
+        except Exception as e:
+            logging.error(str(SensorException(error_message=e)))
+            raise SensorException(error_message=e)
+
+    def get(self, file_path:str, reader:Callable[[str], object])->object:
+        """
+        Description:
+            This function loads an artifact from memory, reading the file only \
+            the first time the path is loaded in the run.
+
+        Params:
+        ----------
+        file_path: str
+            artifact file path
+        reader: Callable
+            called with the file path to read it
+
+        Returns: the artifact
+        """
+        try:
+            with self._lock:
+                if file_path in self._entries:
+                    self._stats["hits"] += 1
+                    self._hits[file_path] = self._hits.get(file_path, 0)+1
+                    ARTIFACT_STORE_READS.inc(result="hit")
+                    return self._share(self._entries[file_path])
+            start = time.perf_counter()
+            value = reader(file_path)
+            with self._lock:
+                self._stats["misses"] += 1
+                self._stats["read_seconds"] += time.perf_counter()-start
+                if self.in_memory:
+                    self._entries.setdefault(file_path, value)
+            ARTIFACT_STORE_READS.inc(result="miss")
+            return self._share(value)
+        except Exception as e:
+            logging.error(str(SensorException(error_message=e)))
+            raise SensorException(error_message=e)
+
+    def save_dataframe(self, file_path:str, df:pd.DataFrame)->None:
+        # the csv is written without its index, read back it has a fresh one
+        self.put(file_path=file_path, value=df.reset_index(drop=True), writer=write_dataframe)
+
+    def read_dataframe(self, file_path:str)->pd.DataFrame:
+        return self.get(file_path=file_path, reader=lambda file_path: Utils.read_csv(file_path=file_path))
+
+    def save_numpy_array(self, file_path:str, array:np.ndarray)->None:
+        self.put(file_path=file_path, value=array, writer=write_numpy_array)
+
+    def load_numpy_array(self, file_path:str, mmap_mode:str=None)->np.ndarray:
+        return self.get(file_path=file_path
+                        , reader=lambda file_path: Utils.load_numpy_array(file_path=file_path, mmap_mode=mmap_mode))
+
+    def save_object(self, file_path:str, obj:object)->None:
+        self.put(file_path=file_path, value=obj, writer=write_object)
+
+    def load_object(self, file_path:str)->object:
+        return self.get(file_path=file_path, reader=lambda file_path: Utils.load_object(file_path=file_path))
+
+    def flush(self, prefix:Optional[str]=None)->None:
+        """
+        Description:
+            This function waits until the pending writes are on disk.
+
+        Params:
+        ----------
+        prefix: str
+            only wait for files under this path, e.g. the directory of a stage
+        """
+        try:
+            with self._lock:
+                pending = {file_path:future for file_path, future in self._pending.items()
+                           if prefix is None or file_path.startswith(prefix)}
+            for file_path, future in pending.items():
+                future.result()
+                with self._lock:
+                    if self._pending.get(file_path) is future:
+                        self._pending.pop(file_path)
+        except Exception as e:
+            logging.error(str(SensorException(error_message=e)))
+            raise SensorException(error_message=e)
+
+    def get_stats(self,)->dict:
+        """
+        Description:
+            This function gives the loads served from memory, with the file bytes \
+            they did not have to parse, and the background write time.
+        """
+        with self._lock:
+            hits = dict(self._hits)
+            stats = dict(self._stats)
+        return {
+            "in_memory":self.in_memory
+            , **stats
+            , "bytes_avoided":sum(os.path.getsize(file_path)*count for file_path, count in hits.items()
+                                  if os.path.exists(file_path))
+            , "loads_avoided":hits
+        }
+
+    def close(self,)->None:
+        """
+        Description:
+            This function writes out what is pending and drops the artifacts \
+            held in memory.
+        """
+        try:
+            self.flush()
+        finally:
+            with self._lock:
+                self._entries.clear()
+                if self._executor is not None:
+                    self._executor.shutdown(wait=True)
+                    self._executor = None
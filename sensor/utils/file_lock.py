@@ -0,0 +1,84 @@
+import os
+from sensor.logger import logging
+from sensor.exceptions import SensorException
+
+try:
+    import fcntl
+except ImportError:         # windows
+    fcntl = None
+    import msvcrt
+
+
+class FileLock:
+    """
+    Description:
+        Cross-process exclusive lock on a lock file, used as a context manager. \
+        The lock is released by the OS when the holding process dies, so a \
+        crashed writer never leaves it stuck.
+
+    Params:
+        lock_file_path: path of the lock file, created if missing
+    """
+    def __init__(self, lock_file_path:str)->None:
+        self.lock_file_path = lock_file_path
+        self._lock_file = None
+
+    def acquire(self, blocking:bool=True)->bool:
+        """
+        Description:
+            This function acquires the lock.
+
+        Params:
+        ----------
+        blocking: bool
+            wait for the lock instead of failing when it is held
+
+        Returns: True when the lock was acquired
+        """
+        try:
+            lock_dir = os.path.dirname(self.lock_file_path)
+            if lock_dir:
+                os.makedirs(lock_dir, exist_ok=True)
+            lock_file = open(self.lock_file_path, "a+")
+            try:
+                if fcntl is not None:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX if blocking else fcntl.LOCK_EX|fcntl.LOCK_NB)
+                else:
+                    lock_file.seek(0)
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK if blocking else msvcrt.LK_NBLCK, 1)
+            except OSError:
+                lock_file.close()
+                if blocking:
+                    raise
+                return False
+            self._lock_file = lock_file
+            return True
+        except Exception as e:
+            logging.error(str(SensorException(error_message=e)))
+            raise SensorException(error_message=e)
+
+    def release(self)->None:
+        """
+        Description:
+            This function releases the lock.
+        """
+        try:
+            if self._lock_file is None:
+                return
+            if fcntl is not None:
+                fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_UN)
+            else:
+                self._lock_file.seek(0)
+                msvcrt.locking(self._lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+            self._lock_file.close()
+            self._lock_file = None
+        except Exception as e:
+            logging.error(str(SensorException(error_message=e)))
+            raise SensorException(error_message=e)
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback)->None:
+        self.release()
@@ -1,5 +1,7 @@
 import os
 import dill
+import dataclasses
+import hashlib
 import yaml
 import numpy as np
 import pandas as pd
@@ -114,7 +116,7 @@ class Utils:
             raise SensorException(error_message=e)
     
     @staticmethod
-    def load_numpy_array(file_path:str)->np.array:
+    def load_numpy_array(file_path:str, mmap_mode:str=None)->np.array:
         """
         Description: 
             This function extracts the numpy array from the given path.
@@ -123,6 +125,8 @@ class Utils:
         -------
         file_path: str
             file path to extract numpy array.
+        mmap_mode: str
+            memory-map the file instead of reading it, e.g. "r"
         
         Returns: 
             numpy array
@@ -131,12 +135,37 @@ class Utils:
             logging.info("Extracting numpy array from the file [{0}].".format(
                 os.path.basename(p=file_path)
             ))
-            with open(file=file_path, mode="rb") as file_obj:
-                return np.load(file=file_obj)
+            return np.load(file=file_path, mmap_mode=mmap_mode)
 
         except Exception as e:
             logging.error(str(SensorException(e)))
             raise SensorException(e)
+
+    @staticmethod
+    def get_file_fingerprint(file_path:str, chunk_size:int=1<<20)->str:
+        """
+        Description: 
+            This function computes the sha256 content hash of the given file.
+
+        Params:
+        -------
+        file_path: str
+            file path to fingerprint
+        chunk_size: int
+            bytes read per iteration
+        
+        Returns: 
+            hex digest of the file content
+        """
+        try:
+            file_hash = hashlib.sha256()
+            with open(file=file_path, mode="rb") as file_obj:
+                for chunk in iter(lambda: file_obj.read(chunk_size), b""):
+                    file_hash.update(chunk)
+            return file_hash.hexdigest()
+        except Exception as e:
+            logging.error(str(SensorException(error_message=e)))
+            raise SensorException(error_message=e)
         
     @staticmethod
     def save_object(file_path:str, obj:object)->None:
@@ -190,5 +219,68 @@ class Utils:
             logging.error(str(SensorException(error_message=e)))
             raise SensorException(error_message=e)
 
+    @staticmethod
+    def artifact_to_dict(artifact:object)->object:
+        """
+        Description: 
+            This function converts a (nested) artifact dataclass into plain \
+            python types, skipping in-memory fields that are excluded from repr.
+        
+        Params:
+        --------
+        artifact: object
+            artifact dataclass
+        
+        Returns: 
+            dict of the artifact fields
+        """
+        try:
+            if dataclasses.is_dataclass(artifact):
+                return {
+                    field.name:Utils.artifact_to_dict(getattr(artifact, field.name))
+                    for field in dataclasses.fields(artifact) if field.repr
+                }
+            if isinstance(artifact, (list, tuple)):
+                return [Utils.artifact_to_dict(item) for item in artifact]
+            if isinstance(artifact, dict):
+                return {key:Utils.artifact_to_dict(value) for key, value in artifact.items()}
+            if isinstance(artifact, np.generic):
+                return artifact.item()
+            return artifact
+        except Exception as e:
+            logging.error(str(SensorException(error_message=e)))
+            raise SensorException(error_message=e)
 
-
+    @staticmethod
+    def get_process_memory(pid:int=None)->dict:
+        """
+        Description: 
+            This function reads the memory of a process from /proc, PSS splits \
+            pages shared between processes evenly, so summing it over forked \
+            workers gives their real footprint.
+        
+        Params:
+        --------
+        pid: int
+            process id, the current process by default
+        
+        Returns: 
+            dict of rss, pss, shared and private bytes, empty where /proc is missing
+        """
+        try:
+            pid = os.getpid() if pid is None else pid
+            fields = {"Rss":"rss", "Pss":"pss", "Shared_Clean":"shared_clean", "Shared_Dirty":"shared_dirty"
+                      , "Private_Clean":"private_clean", "Private_Dirty":"private_dirty"}
+            smaps_rollup_path = f"/proc/{pid}/smaps_rollup"
+            if not os.path.exists(smaps_rollup_path):
+                return dict()
+            memory = dict()
+            with open(smaps_rollup_path, "r") as smaps_rollup:
+                for line in smaps_rollup:
+                    name, _, value = line.partition(":")
+                    if name in fields:
+                        memory[fields[name]] = int(value.split()[0])*1024
+            return memory
+        except Exception as e:
+            logging.error(str(SensorException(error_message=e)))
+            raise SensorException(error_message=e)
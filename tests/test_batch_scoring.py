@@ -0,0 +1,156 @@
+import os
+import numpy as np
+import pytest
+from xgboost import XGBClassifier
+from sklearn.pipeline import Pipeline
+from sklearn.impute import SimpleImputer
+from sensor.utils.main_utils import Utils
+from sensor.exceptions import SensorException
+from sensor.ml.model.registry import ModelRegistry
+from sensor.ml.model.estimator import SensorModel
+from sensor.pipeline.batch_scoring import BatchScoring
+from sensor.data_access.local_collection import LocalCollection
+from sensor.constant.training_pipeline import SCHEMA_FILE_PATH, MODEL_FILE_NAME
+
+N_RECORDS = 23
+CHUNK_SIZE = 5
+
+
+class RecordingCollection(LocalCollection):
+    """
+    Description: LocalCollection recording the size and ordering of every bulk write.
+    """
+    def __init__(self, documents=None)->None:
+        super().__init__(documents=documents)
+        self.bulk_writes = list()
+
+    def bulk_write(self, requests:list, ordered:bool=True):
+        self.bulk_writes.append((len(requests), ordered))
+        return super().bulk_write(requests, ordered=ordered)
+
+
+class CrashingCheckpointCollection(LocalCollection):
+    """
+    Description: LocalCollection failing the checkpoint write of the given chunk, \
+        as if the job died after writing the chunk's predictions.
+    """
+    def __init__(self, crash_on_write:int)->None:
+        super().__init__()
+        self.crash_on_write = crash_on_write
+        self.writes = 0
+
+    def replace_one(self, filter:dict, replacement:dict, upsert:bool=False)->None:
+        self.writes += 1
+        if self.writes==self.crash_on_write:
+            raise RuntimeError("scoring job killed")
+        super().replace_one(filter=filter, replacement=replacement, upsert=upsert)
+
+
+def make_records(feature_columns:list, ids:range)->list:
+    rng = np.random.default_rng(0)
+    records = list()
+    for _id in ids:
+        values = rng.integers(0, 1000, size=len(feature_columns))
+        record = {column:str(value) for column, value in zip(feature_columns, values)}
+        record[feature_columns[0]] = "na"
+        records.append({"_id":_id, **record})
+    return records
+
+
+@pytest.fixture(scope="module")
+def feature_columns()->list:
+    return Utils.read_yaml_file(file_path=SCHEMA_FILE_PATH)["numerical_columns"]
+
+
+@pytest.fixture(scope="module")
+def model_dir(tmp_path_factory, feature_columns)->str:
+    """
+    Description: Saved models directory with a tiny registered champion.
+    """
+    model_dir = str(tmp_path_factory.mktemp("saved_models"))
+    rng = np.random.default_rng(0)
+    X = rng.random((200, len(feature_columns)))
+    y = (X[:,1]>0.5).astype(int)
+    preprocessor = Pipeline(steps=[("imputer", SimpleImputer(strategy="constant", fill_value=0))]).fit(X)
+    model = XGBClassifier(n_estimators=5, max_depth=2).fit(preprocessor.transform(X), y)
+    model_path = os.path.join(model_dir, "1", MODEL_FILE_NAME)
+    Utils.save_object(file_path=model_path, obj=SensorModel(preprocessor=preprocessor, model=model, threshold=0.5))
+    ModelRegistry(model_dir=model_dir).register(version="1", model_path=model_path)
+    return model_dir
+
+
+def make_batch_scoring(model_dir:str, source:LocalCollection, predictions:LocalCollection
+                      , checkpoints:LocalCollection)->BatchScoring:
+    return BatchScoring(
+        collection_name="sensor", source_collection=source, prediction_collection=predictions
+        , checkpoint_collection=checkpoints, chunk_size=CHUNK_SIZE, max_workers=2, model_dir=model_dir
+    )
+
+
+def get_probabilities(predictions:LocalCollection)->dict:
+    return {document["_id"]:document["probability"] for document in predictions.find()}
+
+
+def test_scores_every_record_with_one_unordered_bulk_write_per_chunk(model_dir, feature_columns):
+    source = LocalCollection(documents=make_records(feature_columns=feature_columns, ids=range(N_RECORDS)))
+    predictions = RecordingCollection()
+
+    artifact = make_batch_scoring(model_dir, source, predictions, LocalCollection()).run()
+
+    assert (artifact.rows_scored, artifact.chunks_scored, artifact.last_id) == (N_RECORDS, 5, str(N_RECORDS-1))
+    assert predictions.bulk_writes == [(5, False), (5, False), (5, False), (5, False), (3, False)]
+    assert sorted(get_probabilities(predictions)) == list(range(N_RECORDS))
+    assert {document["model_version"] for document in predictions.find()} == {"1"}
+
+
+def test_resumes_after_checkpoint_without_rescoring(model_dir, feature_columns):
+    records = make_records(feature_columns=feature_columns, ids=range(N_RECORDS))
+    source = LocalCollection(documents=records[:15])
+    predictions, checkpoints = RecordingCollection(), LocalCollection()
+    make_batch_scoring(model_dir, source, predictions, checkpoints).run()
+    first_scored_at = {document["_id"]:document["scored_at"] for document in predictions.find()}
+
+    source.insert_many(documents=records[15:])
+    artifact = make_batch_scoring(model_dir, source, predictions, checkpoints).run()
+
+    assert (artifact.resumed_after_id, artifact.rows_scored, artifact.last_id) == ("14", 8, str(N_RECORDS-1))
+    assert predictions.bulk_writes[3:] == [(5, False), (3, False)]
+    assert all(document["scored_at"]==first_scored_at[document["_id"]]
+               for document in predictions.find() if document["_id"]<15)
+    assert checkpoints.find_one({"_id":"sensor"})["rows_scored"] == N_RECORDS
+
+
+def test_rescoring_a_chunk_after_a_crash_is_idempotent(model_dir, feature_columns):
+    records = make_records(feature_columns=feature_columns, ids=range(N_RECORDS))
+    reference = LocalCollection()
+    make_batch_scoring(model_dir, LocalCollection(documents=records), reference, LocalCollection()).run()
+
+    source, predictions = LocalCollection(documents=records), LocalCollection()
+    checkpoints = CrashingCheckpointCollection(crash_on_write=3)
+    with pytest.raises(SensorException):
+        make_batch_scoring(model_dir, source, predictions, checkpoints).run()
+    assert checkpoints.find_one({"_id":"sensor"})["last_id"] == 9
+    assert predictions.count_documents({}) == 15
+
+    checkpoints.crash_on_write = None
+    artifact = make_batch_scoring(model_dir, source, predictions, checkpoints).run()
+
+    # the chunk written before the crash is scored again and overwrites the same predictions
+    assert (artifact.resumed_after_id, artifact.rows_scored) == ("9", 13)
+    assert predictions.count_documents({}) == N_RECORDS
+    assert get_probabilities(predictions) == get_probabilities(reference)
+
+
+def test_reset_rescores_from_the_start(model_dir, feature_columns):
+    source = LocalCollection(documents=make_records(feature_columns=feature_columns, ids=range(N_RECORDS)))
+    predictions, checkpoints = RecordingCollection(), LocalCollection()
+    make_batch_scoring(model_dir, source, predictions, checkpoints).run()
+
+    resumed = make_batch_scoring(model_dir, source, predictions, checkpoints).run()
+    reset = make_batch_scoring(model_dir, source, predictions, checkpoints).run(reset=True)
+
+    assert (resumed.rows_scored, resumed.chunks_scored) == (0, 0)
+    assert (reset.resumed_after_id, reset.rows_scored, reset.chunks_scored) == (None, N_RECORDS, 5)
+    assert len(predictions.bulk_writes) == 10
+    assert predictions.count_documents({}) == N_RECORDS
+    assert checkpoints.find_one({"_id":"sensor"})["rows_scored"] == N_RECORDS
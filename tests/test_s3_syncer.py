@@ -0,0 +1,115 @@
+import os
+import pytest
+from sensor.exceptions import SensorException
+from cloud_storage.s3_syncer import S3Sync
+from cloud_storage.local_object_store import LocalObjectStore
+
+AWS_BUCKET_URL = "s3://sensor-bucket/artifacts"
+
+
+def write_files(folder:str, contents:dict)->None:
+    for rel_path, content in contents.items():
+        file_path = os.path.join(folder, *rel_path.split("/"))
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, "w") as file:
+            file.write(content)
+
+
+class FailingObjectStore(LocalObjectStore):
+    """
+    Description: LocalObjectStore whose uploads of the given keys always fail.
+    """
+    def __init__(self, root_dir:str, failing_keys:set)->None:
+        super().__init__(root_dir=root_dir)
+        self.failing_keys = failing_keys
+
+    def upload_file(self, Filename:str, Bucket:str, Key:str, Config=None)->None:
+        if Key in self.failing_keys:
+            raise ConnectionError("upload of [{0}] failed".format(Key))
+        super().upload_file(Filename=Filename, Bucket=Bucket, Key=Key, Config=Config)
+
+
+@pytest.fixture
+def folder(tmp_path)->str:
+    folder = str(tmp_path/"folder")
+    write_files(folder=folder, contents={"a.txt":"a", "b.txt":"bb", "nested/c.txt":"ccc"})
+    return folder
+
+
+@pytest.fixture
+def store(tmp_path)->LocalObjectStore:
+    return LocalObjectStore(root_dir=str(tmp_path/"s3"))
+
+
+def test_second_upload_skips_unchanged_files(folder, store):
+    s3_sync = S3Sync(client=store)
+
+    first = s3_sync.upload_folder(folder=folder, aws_bucket_url=AWS_BUCKET_URL)
+    second = s3_sync.upload_folder(folder=folder, aws_bucket_url=AWS_BUCKET_URL)
+
+    assert (first.files_scanned, first.files_transferred, first.files_skipped) == (3, 3, 0)
+    assert first.bytes_transferred == 6
+    assert (second.files_scanned, second.files_transferred, second.files_skipped) == (3, 0, 3)
+    assert store.calls["upload_file"] == 3
+    assert os.path.exists(store.get_object_path(bucket="sensor-bucket", key="artifacts/nested/c.txt"))
+
+
+def test_modified_file_is_uploaded_alone(folder, store):
+    s3_sync = S3Sync(client=store)
+    s3_sync.upload_folder(folder=folder, aws_bucket_url=AWS_BUCKET_URL)
+
+    write_files(folder=folder, contents={"b.txt":"changed"})
+    report = s3_sync.upload_folder(folder=folder, aws_bucket_url=AWS_BUCKET_URL)
+
+    assert (report.files_transferred, report.files_skipped) == (1, 2)
+    assert store.calls["upload_file"] == 4
+    with open(store.get_object_path(bucket="sensor-bucket", key="artifacts/b.txt")) as object_file:
+        assert object_file.read() == "changed"
+
+
+def test_download_pages_through_listing(tmp_path, store):
+    source = str(tmp_path/"source")
+    write_files(folder=source, contents={f"file_{index}.txt":str(index) for index in range(5)})
+    S3Sync(client=store).upload_folder(folder=source, aws_bucket_url=AWS_BUCKET_URL)
+
+    store.page_size = 2
+    target = str(tmp_path/"target")
+    report = S3Sync(client=store).download_folder(folder=target, aws_bucket_url=AWS_BUCKET_URL)
+
+    assert store.calls["list_objects_v2"] == 3
+    assert (report.files_scanned, report.files_transferred) == (5, 5)
+    assert sorted(name for name in os.listdir(target) if name.endswith(".txt")) == [
+        f"file_{index}.txt" for index in range(5)
+    ]
+
+
+def test_download_is_incremental(tmp_path, folder, store):
+    s3_sync = S3Sync(client=store)
+    target = str(tmp_path/"target")
+    s3_sync.upload_folder(folder=folder, aws_bucket_url=AWS_BUCKET_URL)
+
+    first = s3_sync.download_folder(folder=target, aws_bucket_url=AWS_BUCKET_URL)
+    write_files(folder=folder, contents={"nested/c.txt":"changed"})
+    s3_sync.upload_folder(folder=folder, aws_bucket_url=AWS_BUCKET_URL)
+    second = s3_sync.download_folder(folder=target, aws_bucket_url=AWS_BUCKET_URL)
+
+    assert (first.files_transferred, first.files_skipped) == (3, 0)
+    assert (second.files_transferred, second.files_skipped) == (1, 2)
+    assert store.calls["download_file"] == 4
+    with open(os.path.join(target, "nested", "c.txt")) as file:
+        assert file.read() == "changed"
+
+
+def test_failed_upload_raises_and_is_left_out_of_manifest(tmp_path, folder):
+    store = FailingObjectStore(root_dir=str(tmp_path/"s3"), failing_keys={"artifacts/b.txt"})
+
+    with pytest.raises(SensorException):
+        S3Sync(client=store).upload_folder(folder=folder, aws_bucket_url=AWS_BUCKET_URL)
+
+    uploaded = S3Sync.read_manifest(folder=folder)["uploads"][AWS_BUCKET_URL]
+    assert sorted(uploaded) == ["a.txt", "nested/c.txt"]
+
+    # the next sync retries only the file that failed
+    store.failing_keys = set()
+    report = S3Sync(client=store).upload_folder(folder=folder, aws_bucket_url=AWS_BUCKET_URL)
+    assert (report.files_transferred, report.files_skipped) == (1, 2)